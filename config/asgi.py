@@ -0,0 +1,27 @@
+# ruff: noqa
+"""
+ASGI config for walkquest project.
+
+Serves the same Django application as ``config/wsgi.py``, but async views
+(the read endpoints in ``walkquest/walks/api.py``) then run on the event loop
+and only borrow a thread while the ORM is executing a query, so concurrency
+is bounded by database connections rather than by worker threads. Run it
+with an ASGI server, for example::
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --workers 2
+
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# walkquest directory.
+BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(BASE_DIR / "walkquest"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+application = get_asgi_application()
@@ -1,6 +1,9 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_process_init
+
+from walkquest.metrics import connect_celery_signals
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
@@ -15,3 +18,21 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+# Task counts and durations for the /metrics endpoint.
+connect_celery_signals()
+
+
+@worker_process_init.connect
+def close_inherited_connection_pools(**kwargs):
+    """Give each prefork child its own database pool.
+
+    A pool created in the parent before forking would share its sockets with
+    every child, so drop it and let the child open a fresh one on first use.
+    """
+    from django.db import connections
+
+    for alias in connections:
+        connection = connections[alias]
+        if getattr(connection, "pool", None) is not None:
+            connection.close_pool()
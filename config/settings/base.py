@@ -31,6 +31,29 @@ CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 4 * 60
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# Periodic tasks defined in code; DatabaseScheduler syncs them into the admin.
+CELERY_BEAT_SCHEDULE = {
+    "flush-last-active": {
+        "task": "walkquest.users.tasks.flush_last_active",
+        "schedule": 60.0,
+    },
+    "reconcile-leaderboard": {
+        "task": "walkquest.users.tasks.reconcile_leaderboard",
+        "schedule": 15 * 60.0,
+    },
+    "refresh-offline-bundles": {
+        "task": "walkquest.walks.tasks.refresh_offline_bundles",
+        "schedule": 10 * 60.0,
+    },
+    "decay-popularity": {
+        "task": "walkquest.walks.tasks.decay_popularity",
+        "schedule": 60 * 60.0,
+    },
+    "refresh-favorite-counts": {
+        "task": "walkquest.walks.tasks.refresh_favorite_counts",
+        "schedule": 24 * 60 * 60.0,
+    },
+}
 
 # User display configuration - This determines how the user is displayed in messages
 def get_user_display(user):
@@ -83,11 +106,47 @@ DATABASES["default"]["ATOMIC_REQUESTS"] = env.bool(
     default=False,
 )
 
-# Database performance optimizations
-DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # Persistent connections
-DATABASES["default"]["OPTIONS"] = {
-    "connect_timeout": 10,
-}
+
+def _psycopg_pool_available() -> bool:
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def configure_connections(database: dict) -> dict:
+    """Connection handling shared by every settings module.
+
+    With psycopg_pool installed (``psycopg[pool]``), each process keeps a
+    pool of DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE open connections. Requests
+    borrow one instead of connecting, and connections are checked before
+    being handed out and recycled after DB_POOL_MAX_LIFETIME seconds.
+    Otherwise persistent connections (CONN_MAX_AGE) with health checks are
+    used. Set DB_POOL=false to force the latter.
+    """
+    options = database.setdefault("OPTIONS", {})
+    options.setdefault("connect_timeout", 10)
+    if env.bool("DB_POOL", default=True) and _psycopg_pool_available():
+        # Django manages pooled connections itself and rejects CONN_MAX_AGE.
+        # CONN_HEALTH_CHECKS makes it pass ConnectionPool.check_connection as
+        # the pool's check; setting "check" in the options would clash with it.
+        database["CONN_MAX_AGE"] = 0
+        database["CONN_HEALTH_CHECKS"] = True
+        options["pool"] = {
+            "min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+            "max_size": env.int("DB_POOL_MAX_SIZE", default=10),
+            "timeout": env.float("DB_POOL_TIMEOUT", default=10),
+            "max_idle": env.float("DB_POOL_MAX_IDLE", default=300),
+            "max_lifetime": env.float("DB_POOL_MAX_LIFETIME", default=1800),
+        }
+    else:
+        database["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)
+        database["CONN_HEALTH_CHECKS"] = True
+    return database
+
+
+configure_connections(DATABASES["default"])
 
 # https://docs.djangoproject.com/en/stable/ref/settings/#std:setting-DEFAULT_AUTO_FIELD
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -139,6 +198,7 @@ LOCAL_APPS = [
     "walkquest.users",
     "walkquest.walks",
     "walkquest.adventures",
+    "walkquest.profiling",
     # Your stuff: custom apps go here
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
@@ -194,6 +254,8 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "walkquest.middleware.MetricsMiddleware",
+    "walkquest.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -206,8 +268,39 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "walkquest.middleware.CSRFMiddleware",  # Add our custom CSRF middleware
     "allauth.account.middleware.AccountMiddleware",
+    "walkquest.users.middleware.LastActiveMiddleware",
+    "walkquest.profiling.middleware.ProfilingMiddleware",
 ]
 
+# Fraction of requests that get a Server-Timing header and a timing log line.
+SERVER_TIMING_SAMPLE_RATE = env.float("SERVER_TIMING_SAMPLE_RATE", default=1.0)
+# Within a sampled request, a statement repeated this many times is reported
+# as a likely N+1, and any statement slower than this is reported as slow.
+N_PLUS_ONE_THRESHOLD = env.int("N_PLUS_ONE_THRESHOLD", default=5)
+SLOW_QUERY_THRESHOLD_MS = env.float("SLOW_QUERY_THRESHOLD_MS", default=200)
+# Stack sampling interval for staff-triggered profiles (?_profile=sample). Going
+# much below the interpreter switch interval (5 ms) buys few extra samples.
+PROFILING_SAMPLE_INTERVAL_MS = env.float("PROFILING_SAMPLE_INTERVAL_MS", default=5)
+
+# Prometheus metrics (/metrics). Set METRICS_DIR to a directory shared by the
+# worker processes on a host so the scrape reports all of them; it should be
+# emptied on deploy. When METRICS_TOKEN is set, scrapes must send it as a
+# bearer token; with METRICS_REQUIRE_TOKEN and no token, /metrics is a 404.
+METRICS_DIR = env.str("METRICS_DIR", default="")
+METRICS_TOKEN = env.str("METRICS_TOKEN", default="")
+METRICS_REQUIRE_TOKEN = env.bool("METRICS_REQUIRE_TOKEN", default=False)
+METRICS_CELERY_QUEUES = env.list("METRICS_CELERY_QUEUES", default=["celery"])
+
+# Async views talk to Redis through redis.asyncio. Turn on only when serving
+# through config.asgi; under WSGI each async view runs on a throwaway loop.
+CACHE_ASYNC_CLIENT = env.bool("CACHE_ASYNC_CLIENT", default=False)
+# Push auth events to open tabs over Server-Sent Events. Each open tab holds
+# a connection, so only enable this under ASGI (it needs CACHE_ASYNC_CLIENT).
+AUTH_EVENTS_STREAM = env.bool("AUTH_EVENTS_STREAM", default=CACHE_ASYNC_CLIENT)
+
+# Per-dependency timeout, in seconds, for /api/health/ready.
+HEALTH_CHECK_TIMEOUT = env.float("HEALTH_CHECK_TIMEOUT", default=1.0)
+
 # CORS settings
 # ------------------------------------------------------------------------------
 CORS_ALLOW_CREDENTIALS = True
@@ -306,6 +399,16 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 # https://docs.djangoproject.com/en/dev/ref/settings/#fixture-dirs
 FIXTURE_DIRS = (str(APPS_DIR / "fixtures"),)
 
+# SESSIONS
+# ------------------------------------------------------------------------------
+# Sessions are read from the cache (Redis in production) and written through
+# to the database, skipping saves that would not change the stored data.
+SESSION_ENGINE = "walkquest.users.sessions"
+# Signed-in users' last_active is recorded at most this often (seconds).
+LAST_ACTIVE_INTERVAL = env.int("LAST_ACTIVE_INTERVAL", default=300)
+# A favorite's weight in a walk's popularity score halves this often (hours).
+POPULARITY_HALF_LIFE_HOURS = env.int("POPULARITY_HALF_LIFE_HOURS", default=72)
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#session-cookie-httponly
@@ -477,6 +580,8 @@ STATICFILES_FINDERS = [
 
 # Maps
 MAPBOX_TOKEN = env("MAPBOX_TOKEN", default=None)
+# Local DEM GeoTIFF (e.g. SRTM, WGS84) used to build walk elevation profiles.
+WALKQUEST_DEM_PATH = env("WALKQUEST_DEM_PATH", default="")
 
 APPEND_SLASH = True
 
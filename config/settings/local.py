@@ -3,6 +3,7 @@ from .base import *  # noqa: F403
 from .base import INSTALLED_APPS
 from .base import MIDDLEWARE
 from .base import STATICFILES_FINDERS
+from .base import configure_connections
 from .base import env
 from pathlib import Path
 
@@ -24,6 +25,7 @@ DATABASES = {
     "default": env.db("DATABASE_URL"),
 }
 DATABASES["default"]["ENGINE"] = "django.contrib.gis.db.backends.postgis"
+configure_connections(DATABASES["default"])
 
 # SECURITY SETTINGS FOR LOCAL DEVELOPMENT
 # ------------------------------------------------------------------------------
@@ -2,6 +2,7 @@
 from .base import *  # noqa: F403
 from .base import DATABASES
 from .base import INSTALLED_APPS
+from .base import configure_connections
 from .base import env
 
 # GENERAL
@@ -26,6 +27,7 @@ DATABASES = {
         'PORT': env('POSTGRES_PORT', default='5432'),
     }
 }
+configure_connections(DATABASES['default'])
 
 # Share metadata and geometry caches across Gunicorn workers.
 CACHES = {
@@ -33,7 +35,8 @@ CACHES = {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": REDIS_URL,
         "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # DefaultClient plus per-request hit/miss timing (walkquest.cache).
+            "CLIENT_CLASS": "walkquest.cache.InstrumentedRedisClient",
             "SOCKET_CONNECT_TIMEOUT": 2,
             "SOCKET_TIMEOUT": 2,
             "IGNORE_EXCEPTIONS": True,
@@ -44,6 +47,12 @@ CACHES = {
     },
 }
 
+# Time a sample of requests; see walkquest.middleware.ServerTimingMiddleware.
+SERVER_TIMING_SAMPLE_RATE = env.float("SERVER_TIMING_SAMPLE_RATE", default=0.1)
+# /metrics exposes routes and queue sizes; it is disabled until a
+# METRICS_TOKEN is configured for scrapes to authenticate with.
+METRICS_REQUIRE_TOKEN = True
+
 
 # SECURITY
 # ------------------------------------------------------------------------------
@@ -71,6 +80,10 @@ SECURE_SSL_REDIRECT = True
 # STATIC & MEDIA
 # ------------------------
 STORAGES = {
+    # Offline walk bundles are written to media storage by the Celery worker.
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
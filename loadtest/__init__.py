@@ -0,0 +1,13 @@
+"""
+Local load-testing harness.
+
+Replays scripted user journeys (browse the home page, filter by category,
+search nearby, open a walk and its route, favourite it, log an adventure)
+from a pool of virtual users against a running server, then reports
+throughput and per-endpoint latency percentiles and compares them with a
+stored baseline.
+
+Run ``python -m loadtest --help`` for options. Only the standard library is
+used, so the harness runs from the project environment without extra
+dependencies.
+"""
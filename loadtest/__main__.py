@@ -0,0 +1,100 @@
+"""Command-line entry point: ``python -m loadtest``."""
+
+import argparse
+import contextlib
+import json
+import sys
+from pathlib import Path
+
+from . import database
+from . import runner
+from .report import compare
+from .report import format_report
+from .report import summarise
+from .server import LocalServer
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Replay scripted user journeys against a WalkQuest server.")
+    parser.add_argument(
+        "--base-url",
+        help="Test an already running server instead of starting gunicorn from the Procfile",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port for the local gunicorn")
+    parser.add_argument("--settings", help="DJANGO_SETTINGS_MODULE for the local gunicorn")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=10)
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between journeys")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--login-password",
+        help="Password of the synthetic-user-* accounts; enables the signed-in journeys",
+    )
+    parser.add_argument("--login-users", type=int, default=50, help="Synthetic accounts to sign in as")
+    parser.add_argument("--report", type=Path, help="Write the JSON report here")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="Allowed ratio against the baseline before a run counts as a regression",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    options = parse_args(argv)
+    credentials = None
+    if options.login_password:
+        credentials = [
+            (f"synthetic-user-{index:07d}@example.com", options.login_password)
+            for index in range(options.login_users)
+        ]
+
+    server = (
+        contextlib.nullcontext(options.base_url)
+        if options.base_url
+        else LocalServer(port=options.port, settings=options.settings)
+    )
+    with server as target:
+        base_url = target if isinstance(target, str) else target.base_url
+        before = database.snapshot()
+        recorder, elapsed = runner.run(
+            base_url,
+            users=options.users,
+            duration=options.duration,
+            ramp_up=options.ramp_up,
+            think_time=options.think_time,
+            seed=options.seed,
+            credentials=credentials,
+        )
+        after = database.snapshot()
+
+    report = summarise(recorder.samples, elapsed, database.difference(before, after))
+    print(format_report(report))  # noqa: T201
+    if options.report:
+        options.report.write_text(json.dumps(report, indent=2))
+    if options.save_baseline:
+        options.baseline.write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline saved to {options.baseline}")  # noqa: T201
+        return 0
+
+    if not options.baseline.exists():
+        print(f"\nNo baseline at {options.baseline}; run with --save-baseline to create one.")  # noqa: T201
+        return 0
+    regressions = compare(report, json.loads(options.baseline.read_text()), options.tolerance)
+    if regressions:
+        print("\nRegressions against baseline:")  # noqa: T201
+        for regression in regressions:
+            print(f"  - {regression}")  # noqa: T201
+        return 1
+    print("\nNo regressions against baseline.")  # noqa: T201
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""A minimal cookie-aware HTTP client that records per-endpoint timings."""
+
+import http.cookiejar
+import json
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+
+
+# The db entry of the server's Server-Timing header: db;dur=1.2;desc="3 queries"
+DB_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    elapsed: float
+    started: float
+    # From Server-Timing, when the server sampled this request.
+    db_queries: int | None = None
+
+
+def _db_queries(headers) -> int | None:
+    match = DB_TIMING.search(headers.get("Server-Timing", "") if headers else "")
+    return int(match.group(1)) if match else None
+
+
+class Session:
+    """One virtual user's browser: cookies, CSRF token and timings."""
+
+    def __init__(self, base_url: str, recorder, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies),
+        )
+
+    @property
+    def csrf_token(self) -> str | None:
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken":
+                return cookie.value
+        return None
+
+    def request(self, endpoint: str, method: str, path: str, params=None, payload=None, headers=None):
+        """Send a request, record it under ``endpoint`` and return ``(status, body)``.
+
+        ``endpoint`` is the name results are grouped by, e.g. ``GET /api/walks/{id}``.
+        """
+        url = f"{self.base_url}{path}"
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params)}"
+        data = None
+        request_headers = {"Accept": "application/json", **(headers or {})}
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            request_headers["Content-Type"] = "application/json"
+        if method != "GET" and self.csrf_token:
+            request_headers["X-CSRFToken"] = self.csrf_token
+            request_headers["Referer"] = self.base_url + "/"
+
+        request = urllib.request.Request(url, data=data, headers=request_headers, method=method)
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                body = response.read()
+                status = response.status
+                headers = response.headers
+        except urllib.error.HTTPError as error:
+            body = error.read()
+            status = error.code
+            headers = error.headers
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            body = b""
+            status = 0
+            headers = None
+        self.recorder.record(
+            Sample(endpoint, status, time.perf_counter() - start, started, _db_queries(headers)),
+        )
+
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+    def get(self, endpoint: str, path: str, params=None, headers=None):
+        return self.request(endpoint, "GET", path, params=params, headers=headers)
+
+    def post(self, endpoint: str, path: str, payload=None):
+        return self.request(endpoint, "POST", path, payload=payload)
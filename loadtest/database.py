@@ -0,0 +1,37 @@
+"""Database-side totals from ``pg_stat_statements``, when it is available."""
+
+import os
+
+
+def snapshot(database_url: str | None = None) -> dict | None:
+    """Return cumulative statement calls and execution time, or ``None``.
+
+    Needs psycopg, a ``DATABASE_URL`` and the pg_stat_statements extension;
+    without any of them the report simply omits database totals.
+    """
+    database_url = database_url or os.environ.get("DATABASE_URL")
+    if not database_url:
+        return None
+    try:
+        import psycopg
+    except ImportError:
+        return None
+    try:
+        with psycopg.connect(database_url, connect_timeout=5) as connection:
+            row = connection.execute(
+                "SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(total_exec_time), 0) "
+                "FROM pg_stat_statements WHERE dbid = "
+                "(SELECT oid FROM pg_database WHERE datname = current_database())",
+            ).fetchone()
+    except psycopg.Error:
+        return None
+    return {"calls": int(row[0]), "total_time_ms": float(row[1])}
+
+
+def difference(before: dict | None, after: dict | None) -> dict | None:
+    if before is None or after is None:
+        return None
+    return {
+        "queries": after["calls"] - before["calls"],
+        "query_time_ms": round(after["total_time_ms"] - before["total_time_ms"], 1),
+    }
@@ -0,0 +1,154 @@
+"""
+Scripted user journeys.
+
+Each journey is a function ``journey(session, rng, catalogue)`` that walks
+through the same requests the frontend makes for one user task. Journeys
+marked ``requires_login`` only run for virtual users that could sign in.
+"""
+
+import datetime
+from dataclasses import dataclass
+from dataclasses import field
+
+# Roughly Cornwall; used to discover walks and for map viewports.
+CORNWALL_BBOX = (-5.8, 49.9, -4.2, 50.9)
+
+
+@dataclass
+class Catalogue:
+    """What the journeys can pick from, discovered from the API at start-up."""
+
+    walks: list[dict] = field(default_factory=list)
+    categories: list[str] = field(default_factory=list)
+
+    @classmethod
+    def discover(cls, session, limit: int = 500):
+        minx, miny, maxx, maxy = CORNWALL_BBOX
+        _, page = session.get(
+            "GET /api/walks/in-bbox",
+            "/api/walks/in-bbox",
+            {"minx": minx, "miny": miny, "maxx": maxx, "maxy": maxy, "limit": limit},
+        )
+        _, tags = session.get("GET /api/tags", "/api/tags")
+        return cls(
+            walks=(page or {}).get("items", []),
+            categories=[tag["slug"] for tag in tags or [] if tag.get("type") == "category"],
+        )
+
+
+def login(session, email: str, password: str) -> bool:
+    session.get("GET /accounts/csrf/", "/accounts/csrf/")
+    status, _ = session.post(
+        "POST /_allauth/browser/v1/auth/login",
+        "/_allauth/browser/v1/auth/login",
+        {"email": email, "password": password},
+    )
+    return status == 200
+
+
+def _open_walk(session, walk):
+    session.get("GET /api/walks/{identifier}", f"/api/walks/{walk['walk_id']}")
+    session.get("GET /api/walks/{id}/geometry", f"/api/walks/{walk['id']}/geometry")
+
+
+def home_page(session, rng, catalogue):
+    """Land on the site: the page itself, then the data the SPA loads."""
+    session.get("GET /", "/", headers={"Accept": "text/html"})
+    session.get("GET /api/config", "/api/config")
+    session.get("GET /api/tags", "/api/tags")
+    session.get("GET /api/walks", "/api/walks")
+    if catalogue.walks:
+        _open_walk(session, rng.choice(catalogue.walks))
+
+
+def filter_by_category(session, rng, catalogue):
+    if not catalogue.categories:
+        return
+    category = rng.choice(catalogue.categories)
+    _, walks = session.get("GET /api/walks?categories", "/api/walks", {"categories": category})
+    if walks:
+        _open_walk(session, rng.choice(walks))
+
+
+def nearby_search(session, rng, catalogue):
+    if not catalogue.walks:
+        return
+    origin = rng.choice(catalogue.walks)
+    _, walks = session.get(
+        "GET /api/walks/nearby",
+        "/api/walks/nearby",
+        {
+            "latitude": origin["latitude"] + rng.uniform(-0.05, 0.05),
+            "longitude": origin["longitude"] + rng.uniform(-0.05, 0.05),
+            "radius": rng.choice([2000, 5000, 10000]),
+        },
+    )
+    if walks:
+        _open_walk(session, walks[0])
+
+
+def browse_map(session, rng, catalogue):
+    """Pan around the map: clustered markers, then the walks in view."""
+    minx, miny, maxx, maxy = CORNWALL_BBOX
+    for zoom in (9, 11, 13):
+        span = 1.6 / 2 ** (zoom - 9)
+        x = rng.uniform(minx, maxx - span)
+        y = rng.uniform(miny, maxy - span / 2)
+        bbox = f"{x},{y},{x + span},{y + span / 2}"
+        session.get("GET /api/walks/clusters", "/api/walks/clusters", {"bbox": bbox, "zoom": zoom})
+    session.get(
+        "GET /api/walks/in-bbox",
+        "/api/walks/in-bbox",
+        {"minx": x, "miny": y, "maxx": x + span, "maxy": y + span / 2},
+    )
+
+
+def toggle_favorite(session, rng, catalogue):
+    if not catalogue.walks:
+        return
+    walk = rng.choice(catalogue.walks)
+    _open_walk(session, walk)
+    session.post("POST /api/walks/{id}/favorite", f"/api/walks/{walk['id']}/favorite")
+
+
+def log_adventure(session, rng, catalogue):
+    if not catalogue.walks:
+        return
+    walk = rng.choice(catalogue.walks)
+    _open_walk(session, walk)
+    day = datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+    session.post(
+        "POST /api/adventures/log",
+        "/api/adventures/log",
+        {
+            "title": walk["walk_name"],
+            "description": "Load test adventure",
+            "start_date": day.isoformat(),
+            "end_date": day.isoformat(),
+            "start_time": "09:30",
+            "end_time": "13:00",
+            "difficulty_level": "NOVICE WANDERER",
+            "categories": rng.sample(catalogue.categories, min(2, len(catalogue.categories))),
+            "companion_ids": [],
+            "walk_id": walk["id"],
+        },
+    )
+    session.get("GET /api/adventures/", "/api/adventures/")
+
+
+@dataclass(frozen=True)
+class Journey:
+    name: str
+    run: object
+    weight: int
+    requires_login: bool = False
+
+
+JOURNEYS = [
+    Journey("home_page", home_page, weight=30),
+    Journey("filter_by_category", filter_by_category, weight=20),
+    Journey("nearby_search", nearby_search, weight=20),
+    Journey("browse_map", browse_map, weight=15),
+    Journey("toggle_favorite", toggle_favorite, weight=10, requires_login=True),
+    Journey("log_adventure", log_adventure, weight=5, requires_login=True),
+]
@@ -0,0 +1,110 @@
+"""Summaries of a run and comparison against a stored baseline."""
+
+import math
+from collections import defaultdict
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarise(samples, elapsed: float, database: dict | None = None) -> dict:
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    queries = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample.elapsed * 1000)
+        if sample.db_queries is not None:
+            queries[sample.endpoint].append(sample.db_queries)
+        if sample.status == 0 or sample.status >= 500:
+            errors[sample.endpoint] += 1
+
+    endpoints = {}
+    for endpoint, timings in sorted(by_endpoint.items()):
+        timings.sort()
+        endpoints[endpoint] = {
+            "requests": len(timings),
+            "errors": errors[endpoint],
+            "mean_ms": round(sum(timings) / len(timings), 1),
+            "p50_ms": round(percentile(timings, 0.50), 1),
+            "p95_ms": round(percentile(timings, 0.95), 1),
+            "p99_ms": round(percentile(timings, 0.99), 1),
+            # Mean over the requests the server sampled for Server-Timing.
+            "queries": (
+                round(sum(queries[endpoint]) / len(queries[endpoint]), 1)
+                if queries[endpoint]
+                else None
+            ),
+        }
+
+    total = len(samples)
+    return {
+        "duration_s": round(elapsed, 1),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "endpoints": endpoints,
+        "database": database,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of throughput, p95 or error counts beyond ``tolerance``."""
+    regressions = []
+    if report["throughput_rps"] * tolerance < baseline["throughput_rps"]:
+        regressions.append(
+            f"throughput {report['throughput_rps']} rps < baseline {baseline['throughput_rps']} rps",
+        )
+    for endpoint, stats in report["endpoints"].items():
+        previous = baseline["endpoints"].get(endpoint)
+        if previous is None:
+            continue
+        if stats["p95_ms"] > previous["p95_ms"] * tolerance:
+            regressions.append(
+                f"{endpoint}: p95 {stats['p95_ms']} ms > baseline {previous['p95_ms']} ms",
+            )
+        if stats["queries"] and previous.get("queries") and stats["queries"] > previous["queries"]:
+            regressions.append(
+                f"{endpoint}: {stats['queries']} queries per request (baseline {previous['queries']})",
+            )
+        if stats["errors"] > previous["errors"]:
+            regressions.append(
+                f"{endpoint}: {stats['errors']} errors (baseline {previous['errors']})",
+            )
+    base_db, current_db = baseline.get("database"), report.get("database")
+    if base_db and current_db and baseline["requests"] and report["requests"]:
+        per_request = current_db["queries"] / report["requests"]
+        baseline_per_request = base_db["queries"] / baseline["requests"]
+        if per_request > baseline_per_request * tolerance:
+            regressions.append(
+                f"{per_request:.1f} queries per request > baseline {baseline_per_request:.1f}",
+            )
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['requests']} requests in {report['duration_s']} s "
+        f"({report['throughput_rps']} req/s, {report['errors']} errors)",
+        "",
+        f"{'endpoint':<42} {'reqs':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'sql':>6}",
+    ]
+    for endpoint, stats in report["endpoints"].items():
+        lines.append(
+            f"{endpoint:<42} {stats['requests']:>6} {stats['errors']:>4} "
+            f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} "
+            f"{stats['queries'] if stats['queries'] is not None else '-':>6}",
+        )
+    database = report.get("database")
+    if database:
+        per_request = database["queries"] / report["requests"] if report["requests"] else 0
+        lines += [
+            "",
+            f"database: {database['queries']} queries ({per_request:.1f}/request), "
+            f"{database['query_time_ms']} ms total",
+        ]
+    return "\n".join(lines)
@@ -0,0 +1,77 @@
+"""Drive virtual users through the journeys on a pool of threads."""
+
+import random
+import threading
+import time
+
+from .client import Session
+from .journeys import JOURNEYS
+from .journeys import Catalogue
+from .journeys import login
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, sample) -> None:
+        with self._lock:
+            self.samples.append(sample)
+
+
+class _Discarded:
+    """Recorder for set-up requests that should not count towards results."""
+
+    def record(self, sample) -> None:
+        pass
+
+
+def run(
+    base_url: str,
+    users: int,
+    duration: float,
+    ramp_up: float = 10.0,
+    think_time: float = 1.0,
+    seed: int = 0,
+    credentials: list[tuple[str, str]] | None = None,
+) -> tuple[Recorder, float]:
+    """Run ``users`` virtual users for ``duration`` seconds.
+
+    Users start evenly over ``ramp_up`` seconds and pause for an exponentially
+    distributed think time (mean ``think_time``) between journeys. Returns the
+    recorder and the measured wall-clock time.
+    """
+    catalogue = Catalogue.discover(Session(base_url, _Discarded()))
+    if not catalogue.walks:
+        msg = "No walks found; load fixtures or run generate_synthetic_catalogue first."
+        raise RuntimeError(msg)
+
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + ramp_up + duration
+
+    def virtual_user(index: int) -> None:
+        rng = random.Random(seed * 100_003 + index)
+        time.sleep(ramp_up * index / max(users, 1))
+        session = Session(base_url, recorder)
+        logged_in = False
+        if credentials:
+            email, password = credentials[index % len(credentials)]
+            logged_in = login(session, email, password)
+        journeys = [journey for journey in JOURNEYS if logged_in or not journey.requires_login]
+        weights = [journey.weight for journey in journeys]
+        while time.monotonic() < deadline:
+            rng.choices(journeys, weights=weights)[0].run(session, rng, catalogue)
+            if think_time:
+                time.sleep(min(rng.expovariate(1 / think_time), max(0.0, deadline - time.monotonic())))
+
+    threads = [
+        threading.Thread(target=virtual_user, args=(index,), daemon=True, name=f"vu-{index}")
+        for index in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - started
@@ -0,0 +1,81 @@
+"""Start gunicorn exactly as the Procfile's ``web`` process does."""
+
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+PROCFILE = Path(__file__).resolve().parent.parent / "Procfile"
+
+
+def procfile_command(process: str = "web") -> list[str]:
+    for line in PROCFILE.read_text().splitlines():
+        name, _, command = line.partition(":")
+        if name.strip() == process:
+            return shlex.split(command)
+    msg = f"No {process!r} process in {PROCFILE}"
+    raise ValueError(msg)
+
+
+class LocalServer:
+    """A gunicorn subprocess bound to localhost for the duration of a run."""
+
+    def __init__(self, port: int = 8765, settings: str | None = None):
+        self.port = port
+        self.settings = settings
+        self.process = None
+        self.log = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        command = [*procfile_command(), "--bind", f"127.0.0.1:{self.port}"]
+        env = dict(os.environ)
+        if self.settings:
+            env["DJANGO_SETTINGS_MODULE"] = self.settings
+        # A pipe nobody reads fills up under request logging and blocks the
+        # workers, so stderr goes to a file that is only read on failure.
+        self.log = tempfile.TemporaryFile()  # noqa: SIM115
+        self.process = subprocess.Popen(  # noqa: S603
+            command,
+            cwd=PROCFILE.parent,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=self.log,
+        )
+        self._wait_until_ready()
+        return self
+
+    def _wait_until_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                self.log.seek(0)
+                stderr = self.log.read().decode(errors="replace")
+                self.log.close()
+                msg = f"gunicorn exited with {self.process.returncode}:\n{stderr}"
+                raise RuntimeError(msg)
+            try:
+                with urllib.request.urlopen(f"{self.base_url}/api/", timeout=2):  # noqa: S310
+                    return
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.5)
+        self.__exit__(None, None, None)
+        msg = f"gunicorn did not answer on {self.base_url} within {timeout:.0f}s"
+        raise RuntimeError(msg)
+
+    def __exit__(self, *exc_info):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log and not self.log.closed:
+            self.log.close()
@@ -0,0 +1,260 @@
+"""
+Fixtures for the API benchmark suite.
+
+Every benchmark runs against the walks from ``initial_walks.json`` and against
+catalogues scaled up from them (10x by default, 100x with
+``--benchmark-scales=1,10,100``). Query budgets are the same at every scale,
+so a new N+1 fails as soon as the catalogue grows.
+
+Latency and peak memory are recorded for each endpoint; pass
+``--benchmark-report=path.json`` to save them and
+``--benchmark-baseline=path.json`` to fail on latency or peak memory
+regressions against an earlier report.
+"""
+
+import ast
+import json
+import statistics
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+from django.contrib.gis.geos import GEOSGeometry
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from walkquest.walks.models import Walk
+from walkquest.walks.models import WalkCategoryTag
+from walkquest.walks.models import WalkFeatureTag
+from walkquest.walks.route_metrics import compute_route_metrics
+
+FIXTURE_PATH = (
+    Path(__file__).resolve().parents[2] / "walkquest" / "walks" / "fixtures" / "initial_walks.json"
+)
+BATCH_SIZE = 1000
+# Peak memory may also grow by this much over the tolerance before failing,
+# so endpoints that allocate only a few KiB do not fail on noise.
+MEMORY_SLACK_KIB = 64
+
+_results_key = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--benchmark-scales",
+        default="1,10",
+        help="Comma-separated catalogue multipliers to benchmark against",
+    )
+    group.addoption(
+        "--benchmark-rounds",
+        type=int,
+        default=3,
+        help="Timed rounds per endpoint (the median is reported)",
+    )
+    group.addoption("--benchmark-report", default=None, help="Write results to this JSON file")
+    group.addoption(
+        "--benchmark-baseline",
+        default=None,
+        help="Fail when latency or peak memory regresses against this earlier report",
+    )
+    group.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=1.5,
+        help="Allowed latency and peak memory ratio against the baseline",
+    )
+
+
+def pytest_configure(config):
+    config.stash[_results_key] = []
+
+
+def pytest_generate_tests(metafunc):
+    if "catalogue" in metafunc.fixturenames:
+        scales = [int(scale) for scale in metafunc.config.getoption("--benchmark-scales").split(",")]
+        metafunc.parametrize("catalogue", scales, indirect=True, scope="module", ids=lambda s: f"{s}x")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    path = session.config.getoption("--benchmark-report")
+    results = session.config.stash.get(_results_key, [])
+    if path and results:
+        Path(path).write_text(json.dumps({"results": results}, indent=2))
+
+
+def _bool(value) -> bool:
+    return str(value).lower() == "true"
+
+
+def _literal_list(value) -> list:
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = ast.literal_eval(value or "[]")
+    except (ValueError, SyntaxError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def load_catalogue(scale: int) -> list:
+    """Insert ``scale`` copies of the fixture walks; returns the walk ids.
+
+    The fixture file stores tags as lists of names, so walks are built here
+    rather than through ``loaddata``.
+    """
+    rows = [row["fields"] for row in json.loads(FIXTURE_PATH.read_text()) if row["model"] == "walks.walk"]
+    category_names = sorted({name for row in rows for name in _literal_list(row.get("related_categories"))})
+    categories = {name: WalkCategoryTag.objects.get_or_create(name=name)[0] for name in category_names}
+    features = {slug: WalkFeatureTag.objects.get_or_create(name=slug)[0] for slug in ("pub", "cafe")}
+
+    walks, category_links, feature_links = [], [], []
+    for copy in range(scale):
+        for row in rows:
+            geometry = GEOSGeometry(row["route_geometry"], srid=4326)
+            walk = Walk(
+                id=uuid.uuid4(),
+                walk_id=row["walk_id"] if copy == 0 else f"{row['walk_id']}-{copy}",
+                walk_name=row["walk_name"],
+                latitude=float(row["latitude"]),
+                longitude=float(row["longitude"]),
+                highlights=row["highlights"],
+                points_of_interest=row.get("points_of_interest") or "",
+                route_geometry=geometry,
+                os_explorer_reference=row.get("os_explorer_reference"),
+                distance=float(row.get("distance") or 0),
+                steepness_level=row["steepness_level"][:20],
+                footwear_category=row["footwear_category"][:50],
+                has_pub=_bool(row.get("has_pub")),
+                has_cafe=_bool(row.get("has_cafe")),
+                has_stiles=_bool(row.get("has_stiles")),
+                has_bus_access=_bool(row.get("has_bus_access")),
+                pubs_list=_literal_list(row.get("pubs_list")),
+                trail_considerations=row.get("trail_considerations") or "",
+                **compute_route_metrics(geometry).as_fields(),
+            )
+            walks.append(walk)
+            for name in _literal_list(row.get("related_categories")):
+                category_links.append((walk.id, categories[name].id))
+            for slug in ("pub", "cafe"):
+                if getattr(walk, f"has_{slug}"):
+                    feature_links.append((walk.id, features[slug].id))
+
+    Walk.objects.bulk_create(walks, batch_size=BATCH_SIZE)
+    for through, links, field in (
+        (Walk.categories.through, category_links, "walkcategorytag_id"),
+        (Walk.related_categories.through, category_links, "walkcategorytag_id"),
+        (Walk.features.through, feature_links, "walkfeaturetag_id"),
+    ):
+        through.objects.bulk_create(
+            [through(walk_id=walk_id, **{field: tag_id}) for walk_id, tag_id in links],
+            batch_size=BATCH_SIZE,
+        )
+    return [walk.id for walk in walks]
+
+
+@dataclass
+class Catalogue:
+    scale: int
+    walk_ids: list
+
+    @property
+    def size(self) -> int:
+        return len(self.walk_ids)
+
+
+@pytest.fixture(scope="module")
+def catalogue(request, django_db_setup, django_db_blocker):
+    """The fixture walks multiplied by the parametrised scale."""
+    with django_db_blocker.unblock():
+        walk_ids = load_catalogue(request.param)
+        yield Catalogue(scale=request.param, walk_ids=walk_ids)
+        Walk.objects.all().delete()
+        WalkCategoryTag.objects.all().delete()
+        WalkFeatureTag.objects.all().delete()
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    scale: int
+    queries: int
+    max_queries: int
+    median_ms: float
+    max_ms: float
+    peak_kib: float
+
+
+class Benchmark:
+    def __init__(self, config, scale: int):
+        self.config = config
+        self.scale = scale
+        self.rounds = config.getoption("--benchmark-rounds")
+        baseline_path = config.getoption("--benchmark-baseline")
+        self.baseline = {}
+        if baseline_path:
+            for entry in json.loads(Path(baseline_path).read_text())["results"]:
+                self.baseline[(entry["name"], entry["scale"])] = entry
+        self.tolerance = config.getoption("--benchmark-tolerance")
+
+    def __call__(self, name: str, func, *, max_queries: int):
+        """Run ``func`` cold, enforce the query budget, then time it.
+
+        Caches are cleared before every call so cached endpoints are measured
+        on their miss path. Returns the result of the first (cold) call.
+        """
+        cache.clear()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(self.rounds):
+            cache.clear()
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        outcome = BenchmarkResult(
+            name=name,
+            scale=self.scale,
+            queries=len(queries),
+            max_queries=max_queries,
+            median_ms=round(statistics.median(timings), 3),
+            max_ms=round(max(timings), 3),
+            peak_kib=round(peak / 1024, 1),
+        )
+        self.config.stash[_results_key].append(asdict(outcome))
+
+        if len(queries) > max_queries:
+            statements = "\n".join(query["sql"] for query in queries.captured_queries)
+            pytest.fail(
+                f"{name} ran {len(queries)} queries at {self.scale}x "
+                f"(budget {max_queries}):\n{statements}",
+            )
+        previous = self.baseline.get((name, self.scale))
+        if previous and outcome.median_ms > previous["median_ms"] * self.tolerance:
+            pytest.fail(
+                f"{name} at {self.scale}x took {outcome.median_ms} ms, "
+                f"baseline {previous['median_ms']} ms",
+            )
+        if previous and "peak_kib" in previous:
+            allowed = previous["peak_kib"] * self.tolerance + MEMORY_SLACK_KIB
+            if outcome.peak_kib > allowed:
+                pytest.fail(
+                    f"{name} at {self.scale}x peaked at {outcome.peak_kib} KiB, "
+                    f"baseline {previous['peak_kib']} KiB",
+                )
+        return result
+
+
+@pytest.fixture
+def benchmark(request, catalogue):
+    return Benchmark(request.config, catalogue.scale)
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+
+from walkquest.adventures.models import Achievement
+from walkquest.users.tests.factories import UserFactory
+from walkquest.walks.models import Adventure
+from walkquest.walks.models import Companion
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# Logged adventures per user per 100 catalogue walks.
+ADVENTURES_PER_100_WALKS = 10
+
+
+@pytest.fixture
+def adventurer(client, catalogue):
+    """A signed-in user whose adventure history grows with the catalogue."""
+    user = UserFactory()
+    companions = Companion.objects.bulk_create(
+        [Companion(user=user, name=f"Companion {index}") for index in range(3)],
+    )
+    count = max(1, catalogue.size * ADVENTURES_PER_100_WALKS // 100)
+    today = datetime.date(2024, 6, 1)
+    adventures = Adventure.objects.bulk_create(
+        [
+            Adventure(
+                title=f"Adventure {index}",
+                description="Benchmark adventure",
+                start_date=today,
+                end_date=today,
+                difficulty_level="NOVICE WANDERER",
+            )
+            for index in range(count)
+        ],
+    )
+    Adventure.companions.through.objects.bulk_create(
+        [
+            Adventure.companions.through(adventure_id=adventure.id, companion_id=companion.id)
+            for adventure in adventures
+            for companion in companions
+        ],
+    )
+    Achievement.objects.bulk_create(
+        [Achievement(user=user, adventure=adventure) for adventure in adventures],
+    )
+    client.force_login(user)
+    return user
+
+
+def test_list_adventures(client, benchmark, adventurer):
+    response = benchmark(
+        "GET /api/adventures/",
+        lambda: client.get("/api/adventures/"),
+        max_queries=5,
+    )
+    assert response.status_code == 200
+
+
+def test_list_companions(client, benchmark, adventurer):
+    response = benchmark(
+        "GET /api/adventures/companions/",
+        lambda: client.get("/api/adventures/companions/"),
+        max_queries=3,
+    )
+    assert len(response.json()["companions"]) == 3
+
+
+def test_log_adventure(client, benchmark, adventurer, catalogue):
+    payload = {
+        "title": "Coast path",
+        "description": "Benchmark log",
+        "start_date": "2024-06-01",
+        "end_date": "2024-06-01",
+        "start_time": "09:00",
+        "end_time": "12:30",
+        "difficulty_level": "NOVICE WANDERER",
+        "categories": ["circular-walks", "pub-walks"],
+        "companion_ids": [str(pk) for pk in adventurer.companions.values_list("id", flat=True)],
+        "walk_id": str(catalogue.walk_ids[0]),
+    }
+    response = benchmark(
+        "POST /api/adventures/log",
+        lambda: client.post("/api/adventures/log", payload, content_type="application/json"),
+        max_queries=24,
+    )
+    assert response.status_code == 201
@@ -0,0 +1,42 @@
+import pytest
+from django.test import RequestFactory
+
+from walkquest.users.tests.factories import UserFactory
+from walkquest.walks import views
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_home_page_walks(client, benchmark, catalogue):
+    # The HTMX path returns the same walk payload as the page without the
+    # Vite-built template around it.
+    response = benchmark(
+        "GET / (HX-Request)",
+        lambda: client.get("/", headers={"HX-Request": "true"}),
+        max_queries=4,
+    )
+    assert len(response.json()["data"]) == catalogue.size
+
+
+def test_home_page_walks_authenticated(client, benchmark):
+    client.force_login(UserFactory())
+    # The anonymous budget plus the session, the user and their favorite ids.
+    benchmark(
+        "GET / (HX-Request, authenticated)",
+        lambda: client.get("/", headers={"HX-Request": "true"}),
+        max_queries=7,
+    )
+
+
+def test_toggle_favorite_view(benchmark, catalogue):
+    user = UserFactory()
+    walk_id = catalogue.walk_ids[0]
+
+    def toggle():
+        request = RequestFactory().post(f"/api/walks/{walk_id}/favorite/")
+        request.user = user
+        request._dont_enforce_csrf_checks = True
+        return views.toggle_favorite(request, walk_id=walk_id)
+
+    response = benchmark("POST walks.views.toggle_favorite", toggle, max_queries=5)
+    assert response.status_code == 200
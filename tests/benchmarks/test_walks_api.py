@@ -0,0 +1,168 @@
+import math
+
+import pytest
+
+from walkquest.users.tests.factories import UserFactory
+from walkquest.walks.bundles import BundleRegion
+from walkquest.walks.bundles import write_bundle
+from walkquest.walks.elevation import encode_profile
+from walkquest.walks.models import Walk
+from walkquest.walks.models import WalkElevationProfile
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# Roughly the middle of Cornwall; covers most of the fixture walks.
+CORNWALL_BBOX = (-5.8, 49.9, -4.2, 50.9)
+
+
+def test_api_root(client, benchmark):
+    response = benchmark("GET /api/", lambda: client.get("/api/"), max_queries=0)
+    assert response.status_code == 200
+
+
+def test_list_walks(client, benchmark, catalogue):
+    response = benchmark("GET /api/walks", lambda: client.get("/api/walks"), max_queries=4)
+    assert len(response.json()) == catalogue.size
+
+
+def test_list_walks_authenticated(client, benchmark):
+    client.force_login(UserFactory())
+    response = benchmark(
+        "GET /api/walks (authenticated)",
+        lambda: client.get("/api/walks"),
+        max_queries=6,
+    )
+    assert response.status_code == 200
+
+
+def test_list_walks_filtered(client, benchmark):
+    response = benchmark(
+        "GET /api/walks?circular&max_length_km",
+        lambda: client.get("/api/walks", {"circular": "true", "max_length_km": 8}),
+        max_queries=4,
+    )
+    assert response.status_code == 200
+
+
+def test_find_nearby_walks(client, benchmark):
+    response = benchmark(
+        "GET /api/walks/nearby",
+        lambda: client.get(
+            "/api/walks/nearby",
+            {"latitude": 50.26, "longitude": -5.05, "radius": 20000},
+        ),
+        max_queries=4,
+    )
+    assert response.status_code == 200
+
+
+def test_walk_clusters(client, benchmark):
+    bbox = ",".join(str(value) for value in CORNWALL_BBOX)
+    response = benchmark(
+        "GET /api/walks/clusters",
+        lambda: client.get("/api/walks/clusters", {"bbox": bbox, "zoom": 9}),
+        max_queries=1,
+    )
+    assert response.status_code == 200
+
+
+def test_walks_in_bbox(client, benchmark):
+    minx, miny, maxx, maxy = CORNWALL_BBOX
+    response = benchmark(
+        "GET /api/walks/in-bbox",
+        lambda: client.get(
+            "/api/walks/in-bbox",
+            {"minx": minx, "miny": miny, "maxx": maxx, "maxy": maxy, "limit": 100},
+        ),
+        max_queries=1,
+    )
+    assert response.status_code == 200
+
+
+def test_get_walk(client, benchmark, catalogue):
+    walk_id = catalogue.walk_ids[0]
+    response = benchmark(
+        "GET /api/walks/{id}",
+        lambda: client.get(f"/api/walks/{walk_id}"),
+        max_queries=4,
+    )
+    assert response.status_code == 200
+
+
+def test_get_walk_by_slug(client, benchmark):
+    slug = Walk.objects.values_list("walk_id", flat=True).first()
+    response = benchmark(
+        "GET /api/walks/{slug}",
+        lambda: client.get(f"/api/walks/{slug}"),
+        max_queries=4,
+    )
+    assert response.status_code == 200
+
+
+def test_walk_geometry(client, benchmark, catalogue):
+    walk_id = catalogue.walk_ids[0]
+    response = benchmark(
+        "GET /api/walks/{id}/geometry",
+        lambda: client.get(f"/api/walks/{walk_id}/geometry"),
+        max_queries=1,
+    )
+    assert response.status_code == 200
+
+
+def test_walk_profile(client, benchmark, catalogue):
+    walk_id = catalogue.walk_ids[0]
+    # A 10 km route sampled every 10 m.
+    elevations = [50 + 40 * math.sin(index / 50) for index in range(1000)]
+    WalkElevationProfile.objects.create(
+        walk_id=walk_id,
+        sample_spacing=10.0,
+        sample_count=len(elevations),
+        samples=encode_profile(elevations),
+        min_elevation=min(elevations),
+        max_elevation=max(elevations),
+    )
+    response = benchmark(
+        "GET /api/walks/{id}/profile",
+        lambda: client.get(f"/api/walks/{walk_id}/profile"),
+        max_queries=1,
+    )
+    assert response.status_code == 200
+    assert response.json()["sample_count"] == len(elevations)
+
+
+def test_toggle_favorite(client, benchmark, catalogue):
+    client.force_login(UserFactory())
+    walk_id = catalogue.walk_ids[0]
+    response = benchmark(
+        "POST /api/walks/{id}/favorite",
+        lambda: client.post(f"/api/walks/{walk_id}/favorite", content_type="application/json"),
+        max_queries=9,
+    )
+    assert response.json()["status"] == "success"
+
+
+def test_list_tags(client, benchmark):
+    response = benchmark("GET /api/tags", lambda: client.get("/api/tags"), max_queries=2)
+    assert response.status_code == 200
+
+
+def test_config(client, benchmark):
+    response = benchmark("GET /api/config", lambda: client.get("/api/config"), max_queries=0)
+    assert response.status_code == 200
+
+
+def test_filters(client, benchmark):
+    response = benchmark("GET /api/filters", lambda: client.get("/api/filters"), max_queries=2)
+    assert response.status_code == 200
+
+
+def test_offline_bundle(client, benchmark, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    bbox = ",".join(str(value) for value in CORNWALL_BBOX)
+    write_bundle(BundleRegion.parse(bbox=bbox))
+    response = benchmark(
+        "GET /api/offline-bundles",
+        lambda: client.get("/api/offline-bundles", {"bbox": bbox}),
+        max_queries=0,
+    )
+    assert response.status_code == 200
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from walkquest import health
+
+
+@pytest.fixture(autouse=True)
+def _fresh_result(monkeypatch):
+    monkeypatch.setattr(health, "_last_result", None)
+    monkeypatch.setattr(health, "_running", {})
+
+
+@pytest.mark.django_db
+def test_ready_reports_each_dependency(client, settings, monkeypatch):
+    settings.CELERY_BROKER_URL = "memory://"
+
+    response = client.get("/api/health/ready")
+
+    assert response.status_code == 200
+    checks = response.json()["checks"]
+    assert set(checks) == {"database", "cache", "broker"}
+    assert all(check["ok"] for check in checks.values())
+    assert checks["database"]["latency_ms"] is not None
+
+
+def test_failed_dependency_makes_ready_unavailable(client, monkeypatch):
+    def broken():
+        raise ConnectionError
+
+    monkeypatch.setitem(health.CHECKS, "database", broken)
+    monkeypatch.setitem(health.CHECKS, "broker", lambda: None)
+
+    response = client.get("/api/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"] == {
+        "ok": False,
+        "latency_ms": None,
+        "error": "ConnectionError",
+    }
+    assert client.get("/api/health/live").status_code == 200
+
+
+def test_result_is_reused_briefly(monkeypatch):
+    calls = []
+    monkeypatch.setattr(health, "CHECKS", {"database": lambda: calls.append(1)})
+
+    health.check_readiness()
+    health.check_readiness()
+
+    assert len(calls) == 1
+
+
+def test_hung_check_is_not_resubmitted(settings, monkeypatch):
+    settings.HEALTH_CHECK_TIMEOUT = 0.05
+    release = threading.Event()
+    calls = []
+
+    def hung():
+        calls.append(1)
+        release.wait(5)
+
+    monkeypatch.setattr(health, "CHECKS", {"database": hung})
+    try:
+        for _ in range(3):
+            monkeypatch.setattr(health, "_last_result", None)
+            assert health.check_readiness()["status"] == "unavailable"
+        assert len(calls) == 1
+    finally:
+        release.set()
@@ -0,0 +1,89 @@
+import orjson
+import pytest
+from django.http import Http404
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from walkquest import metrics
+from walkquest.middleware import MetricsMiddleware
+from walkquest.views import metrics_view
+
+
+@pytest.fixture
+def registry(monkeypatch, settings):
+    settings.CELERY_BROKER_URL = "memory://"
+    fresh = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", fresh)
+    return fresh
+
+
+def test_requests_are_counted_and_timed(registry):
+    MetricsMiddleware(lambda request: HttpResponse(status=204))(RequestFactory().get("/nowhere"))
+
+    output = metrics.render()
+    assert 'walkquest_http_requests_total{method="GET",route="<unresolved>",status="204"} 1' in output
+    assert 'walkquest_http_request_duration_seconds_count{method="GET",route="<unresolved>"} 1' in output
+    assert 'le="+Inf"' in output
+
+
+def test_cache_lookups_are_grouped_by_family(registry):
+    metrics.record_cache_lookup("walkquest:api:tags:v1", hits=1, misses=0)
+    metrics.record_cache_lookup("walk_geometry_abc", hits=0, misses=1)
+
+    output = metrics.render()
+    assert 'walkquest_cache_requests_total{family="api",result="hit"} 1' in output
+    assert 'walkquest_cache_requests_total{family="walk_geometry",result="miss"} 1' in output
+
+
+def test_files_from_other_workers_are_summed(registry, settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    other = {
+        "counters": [["walkquest_celery_tasks_total", [["state", "SUCCESS"], ["task", "t"]], 2]],
+        "histograms": [],
+        "gauges": [],
+    }
+    (tmp_path / "1-1.json").write_bytes(orjson.dumps(other))
+    registry.inc("walkquest_celery_tasks_total", {"task": "t", "state": "SUCCESS"})
+
+    assert 'walkquest_celery_tasks_total{state="SUCCESS",task="t"} 3' in metrics.render()
+
+
+def test_gauges_from_exited_workers_are_dropped(registry, settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    snapshot = {
+        "counters": [["walkquest_celery_tasks_total", [["state", "SUCCESS"], ["task", "t"]], 2]],
+        "histograms": [],
+        "gauges": [["walkquest_db_pool_requests_waiting", [["alias", "default"]], 5]],
+    }
+    (tmp_path / "999999999-1.json").write_bytes(orjson.dumps(snapshot))
+
+    output = metrics.render()
+    assert 'walkquest_celery_tasks_total{state="SUCCESS",task="t"} 2' in output
+    assert "walkquest_db_pool_requests_waiting{" not in output
+
+
+def test_reset_forgets_inherited_counts(registry, settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    registry.inc("walkquest_celery_tasks_total", {"task": "t", "state": "SUCCESS"})
+    registry.maybe_flush(force=True)
+    assert registry.filename is not None
+
+    registry.reset()
+    # The child names its file from its own pid on its first flush.
+    assert registry.filename is None
+    assert registry.counters == {}
+
+
+def test_metrics_view_is_disabled_without_a_required_token(registry, settings):
+    settings.METRICS_TOKEN = ""
+    settings.METRICS_REQUIRE_TOKEN = True
+    with pytest.raises(Http404):
+        metrics_view(RequestFactory().get("/metrics"))
+
+    settings.METRICS_TOKEN = "scrape-secret"
+    assert metrics_view(RequestFactory().get("/metrics")).status_code == 401
+    request = RequestFactory().get(
+        "/metrics",
+        headers={"Authorization": "Bearer scrape-secret"},
+    )
+    assert metrics_view(request).status_code == 200
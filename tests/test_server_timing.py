@@ -0,0 +1,79 @@
+import re
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import TestCase
+
+from walkquest.instrumentation import current_metrics
+from walkquest.instrumentation import normalize_sql
+from walkquest.instrumentation import timed_serialization
+from walkquest.middleware import ServerTimingMiddleware
+from walkquest.querylog import top_offenders
+from walkquest.users.models import User
+from walkquest.users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+def test_server_timing_header_counts_queries(settings):
+    settings.SERVER_TIMING_SAMPLE_RATE = 1.0
+
+    def view(request):
+        User.objects.count()
+        User.objects.exists()
+        current_metrics().record_cache(0.001, hits=1)
+        with timed_serialization():
+            body = b"{}"
+        return HttpResponse(body)
+
+    response = ServerTimingMiddleware(view)(RequestFactory().get("/api/walks"))
+
+    header = response["Server-Timing"]
+    assert 'desc="2 queries"' in header
+    assert 'desc="1 hits, 0 misses"' in header
+    assert "serialize;dur=" in header
+    assert current_metrics() is None
+
+
+def test_unsampled_requests_are_untouched(settings):
+    settings.SERVER_TIMING_SAMPLE_RATE = 0
+
+    def view(request):
+        assert current_metrics() is None
+        return HttpResponse()
+
+    response = ServerTimingMiddleware(view)(RequestFactory().get("/"))
+    assert "Server-Timing" not in response
+
+
+@pytest.mark.django_db
+def test_repeated_statements_are_reported(settings):
+    settings.SERVER_TIMING_SAMPLE_RATE = 1.0
+    settings.N_PLUS_ONE_THRESHOLD = 3
+    users = UserFactory.create_batch(4)
+
+    def view(request):
+        for user in users:
+            User.objects.filter(pk=user.pk).exists()
+        return HttpResponse()
+
+    ServerTimingMiddleware(view)(RequestFactory().get("/"))
+
+    offenders = top_offenders(minutes=1)["n_plus_one"]
+    assert any(
+        offender["statements"] == 4 and "users_user" in offender["sql"] for offender in offenders
+    )
+
+
+def test_normalize_sql_collapses_literals():
+    assert normalize_sql("SELECT 1 FROM t WHERE id IN (%s, %s, %s) AND name = 'x'") == (
+        "SELECT ? FROM t WHERE id IN (...) AND name = ?"
+    )
+
+
+class AsyncServerTimingTest(TestCase):
+    async def test_async_views_count_their_queries(self):
+        with self.settings(SERVER_TIMING_SAMPLE_RATE=1.0):
+            response = await self.async_client.get("/api/walks")
+        queries = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response["Server-Timing"])
+        assert int(queries.group(1)) > 0
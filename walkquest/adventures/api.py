@@ -1,25 +1,34 @@
+import base64
+from datetime import date, datetime
+from typing import Optional
 from uuid import UUID
-from datetime import datetime, time
 import logging
-import json
-import threading
-import os
-from django.core.exceptions import ValidationError
-from django.shortcuts import get_object_or_404
+from django.db.models import Q
+from ninja import Query
 from ninja import Router
 from ninja.security import django_auth
 
-from walkquest.walks.models import Walk, Adventure
+from walkquest.walks.models import Companion
 from .models import Achievement
-from walkquest.walks.models import Companion, WalkCategoryTag
 from .schemas import (
+    AdventureBatchIn,
+    AdventureBatchOut,
+    AdventureHistoryItem,
+    AdventureHistoryOut,
     AdventureIn,
     AdventureOut,
+    AdventureStatusIn,
+    AdventureStatusOut,
     CompanionCreate,
     CompanionOut,
     CompanionList,
     ErrorResponse,
 )
+from .services import AdventureLogError
+from .services import LoggedAdventure
+from .services import log_adventures
+from .services import set_status
+from .stats import get_stats
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -119,135 +128,154 @@ def list_adventures(request):
         for adventure in adventures
     ]
 
+def _encode_cursor(achievement) -> str:
+    raw = f"{achievement.conquered_date.isoformat()}|{achievement.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    conquered, _, pk = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+    return datetime.fromisoformat(conquered), int(pk)
+
+
+@router.get(
+    "/history",
+    response={200: AdventureHistoryOut, 400: ErrorResponse},
+    summary="Page through adventure history",
+)
+def adventure_history(
+    request,
+    status: Optional[str] = Query(None, description="IN_PROGRESS, COMPLETED or ABANDONED"),
+    difficulty: Optional[str] = Query(None, description="Adventure difficulty level"),
+    date_from: Optional[date] = Query(None, description="Earliest start date"),
+    date_to: Optional[date] = Query(None, description="Latest start date"),
+    limit: int = Query(20, description="Maximum number of adventures to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """The user's adventures, newest first.
+
+    Pages are keyed on (conquered_date, id) rather than an offset, so deep
+    pages cost the same as the first. The first page also carries the
+    user's stats, which are cached until the next adventure is logged.
+    """
+    limit = max(1, min(limit, 100))
+    achievements = Achievement.objects.filter(user=request.user)
+    if status:
+        achievements = achievements.filter(status=status)
+    if difficulty:
+        achievements = achievements.filter(adventure__difficulty_level=difficulty)
+    if date_from:
+        achievements = achievements.filter(adventure__start_date__gte=date_from)
+    if date_to:
+        achievements = achievements.filter(adventure__start_date__lte=date_to)
+    if cursor:
+        try:
+            conquered, pk = _decode_cursor(cursor)
+        except ValueError:
+            return 400, ErrorResponse(message="Invalid cursor")
+        achievements = achievements.filter(
+            Q(conquered_date__lt=conquered) | Q(conquered_date=conquered, id__lt=pk),
+        )
+
+    page = list(
+        achievements.order_by("-conquered_date", "-id")
+        .with_personal_best()
+        .select_related("adventure")
+        .prefetch_related("adventure__related_categories", "adventure__companions")[: limit + 1],
+    )
+    next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
+    items = [
+        AdventureHistoryItem(
+            id=achievement.adventure.id,
+            title=achievement.adventure.title,
+            description=achievement.adventure.description,
+            start_date=achievement.adventure.start_date,
+            end_date=achievement.adventure.end_date,
+            start_time=achievement.adventure.start_time,
+            end_time=achievement.adventure.end_time,
+            difficulty_level=achievement.adventure.difficulty_level,
+            categories=[cat.slug for cat in achievement.adventure.related_categories.all()],
+            companions=[
+                CompanionOut(id=c.id, name=c.name)
+                for c in achievement.adventure.companions.all()
+            ],
+            created_at=achievement.adventure.created_at.isoformat(),
+            updated_at=achievement.adventure.updated_at.isoformat(),
+            is_public=achievement.adventure.is_public,
+            status=achievement.status,
+            conquered_date=achievement.conquered_date,
+            best_time=achievement.best_time,
+            is_personal_best=achievement.is_personal_best(),
+        )
+        for achievement in page[:limit]
+    ]
+    return 200, AdventureHistoryOut(
+        items=items,
+        next_cursor=next_cursor,
+        stats=None if cursor else get_stats(request.user.pk),
+    )
+
+
+def _adventure_out(item: LoggedAdventure) -> AdventureOut:
+    adventure = item.adventure
+    return AdventureOut(
+        id=adventure.id,
+        title=adventure.title,
+        description=adventure.description,
+        start_date=adventure.start_date,
+        end_date=adventure.end_date,
+        start_time=adventure.start_time,
+        end_time=adventure.end_time,
+        difficulty_level=adventure.difficulty_level,
+        categories=item.categories,
+        companions=[CompanionOut(id=c.id, name=c.name) for c in item.companions],
+        created_at=adventure.created_at.isoformat(),
+        updated_at=adventure.updated_at.isoformat(),
+        is_public=adventure.is_public,
+        start_location=item.entry.start_location,
+        end_location=item.entry.end_location,
+    )
+
+
 @router.post(
     "/log",
-    response={201: AdventureOut, 422: ErrorResponse},
+    response={201: AdventureOut, 404: ErrorResponse, 422: ErrorResponse},
     summary="Create an adventure log",
 )
 def create_adventure(request, data: AdventureIn):
     """Create a new adventure log."""
-    process_id = os.getpid()
-    thread_id = threading.get_ident()
-    
-    logger.info(f"[PID:{process_id}|TID:{thread_id}] Received adventure log request: {json.dumps({
-        'title': data.title,
-        'difficulty_level': data.difficulty_level,
-        'start_date': str(data.start_date),
-        'end_date': str(data.end_date),
-        'start_time': str(data.start_time),
-        'end_time': str(data.end_time),
-        'categories': data.categories,
-        'walk_id': str(data.walk_id) if data.walk_id else None,
-        'is_public': data.is_public,
-        'start_location': data.start_location,
-        'end_location': data.end_location,
-    }, default=str)}")
-    
+    logger.debug("Adventure log request: %r", data)
     try:
-        # Parse time strings if they are provided as strings
-        start_time = data.start_time
-        end_time = data.end_time
-        
-        # Handle string-formatted times (like "20:57")
-        if isinstance(start_time, str):
-            try:
-                hours, minutes = map(int, start_time.split(':'))
-                start_time = time(hour=hours, minute=minutes)
-                logger.debug(f"[PID:{process_id}|TID:{thread_id}] Parsed start_time string '{data.start_time}' to time object {start_time}")
-            except (ValueError, TypeError) as e:
-                error_msg = f"Invalid start_time format: {data.start_time}. Expected format: HH:MM"
-                logger.error(f"[PID:{process_id}|TID:{thread_id}] {error_msg}. Error: {str(e)}")
-                return 422, ErrorResponse(message=error_msg)
-        
-        if isinstance(end_time, str):
-            try:
-                hours, minutes = map(int, end_time.split(':'))
-                end_time = time(hour=hours, minute=minutes)
-                logger.debug(f"[PID:{process_id}|TID:{thread_id}] Parsed end_time string '{data.end_time}' to time object {end_time}")
-            except (ValueError, TypeError) as e:
-                error_msg = f"Invalid end_time format: {data.end_time}. Expected format: HH:MM"
-                logger.error(f"[PID:{process_id}|TID:{thread_id}] {error_msg}. Error: {str(e)}")
-                return 422, ErrorResponse(message=error_msg)
-        
-        # Create the adventure first
-        adventure = Adventure.objects.create(
-            title=data.title,
-            description=data.description,
-            start_date=data.start_date,
-            end_date=data.end_date,
-            start_time=start_time,
-            end_time=end_time,
-            difficulty_level=data.difficulty_level,
-            is_public=data.is_public,
-            start_location=data.start_location or "",
-            end_location=data.end_location or "",
-        )
-        logger.info(f"[PID:{process_id}|TID:{thread_id}] Created adventure: {adventure.id}")
-
-        # Add categories
-        if data.categories:
-            categories = WalkCategoryTag.objects.filter(slug__in=data.categories)
-            adventure.related_categories.set(categories)
-            logger.debug(f"[PID:{process_id}|TID:{thread_id}] Added categories: {[c.slug for c in categories]}")
-
-        # Add companions
-        if data.companion_ids:
-            companions = Companion.objects.filter(
-                id__in=data.companion_ids,
-                user=request.user,
-            )
-            adventure.companions.set(companions)
-            logger.debug(f"[PID:{process_id}|TID:{thread_id}] Added companions: {[str(c.id) for c in companions]}")
-
-        # Create achievement to link adventure to user
-        achievement = Achievement.objects.create(
-            user=request.user,
-            adventure=adventure,
-            visibility="PUBLIC" if data.is_public else "PRIVATE",
-        )
-        logger.info(f"[PID:{process_id}|TID:{thread_id}] Created achievement: {achievement.id}")
+        (logged,) = log_adventures(request.user, [data])
+    except AdventureLogError as e:
+        return e.status, ErrorResponse(message=str(e))
+    return 201, _adventure_out(logged)
 
-        # If walk_id is provided, update the walk to link to this adventure
-        if data.walk_id:
-            walk = get_object_or_404(Walk, id=data.walk_id)
-            walk.adventure = adventure
-            walk.save()
-            logger.info(f"[PID:{process_id}|TID:{thread_id}] Linked walk {walk.id} to adventure {adventure.id}")
 
-        response_data = AdventureOut(
-            id=adventure.id,
-            title=adventure.title,
-            description=adventure.description,
-            start_date=adventure.start_date,
-            end_date=adventure.end_date,
-            start_time=adventure.start_time,
-            end_time=adventure.end_time,
-            difficulty_level=adventure.difficulty_level,
-            categories=[cat.slug for cat in adventure.related_categories.all()],
-            companions=[
-                CompanionOut(id=c.id, name=c.name)
-                for c in adventure.companions.all()
-            ],
-            created_at=adventure.created_at.isoformat(),
-            updated_at=adventure.updated_at.isoformat(),
-            is_public=adventure.is_public,
-            start_location=adventure.start_location,
-            end_location=adventure.end_location,
-        )
-        
-        logger.info(f"[PID:{process_id}|TID:{thread_id}] Adventure log created successfully: {adventure.id}")
-        return 201, response_data
-
-    except (Walk.DoesNotExist, Adventure.DoesNotExist) as e:
-        error_msg = str(e)
-        logger.error(f"[PID:{process_id}|TID:{thread_id}] Not found error: {error_msg}")
-        return 404, ErrorResponse(message=error_msg)
-    except (ValueError, ValidationError) as e:
-        error_msg = str(e)
-        logger.error(f"[PID:{process_id}|TID:{thread_id}] Validation error: {error_msg}")
-        return 422, ErrorResponse(message=error_msg)
-    except Exception as e:
-        # Catch-all for unexpected errors
-        error_msg = f"Unexpected error: {str(e)}"
-        logger.exception(f"[PID:{process_id}|TID:{thread_id}] {error_msg}")
-        return 500, ErrorResponse(message="Server error occurred. Please try again later.")
+@router.post(
+    "/log:batch",
+    response={201: AdventureBatchOut, 404: ErrorResponse, 422: ErrorResponse},
+    summary="Create several adventure logs at once",
+)
+def create_adventures(request, data: AdventureBatchIn):
+    """Log adventures recorded offline in one request; all or none are created."""
+    logger.debug("Adventure batch log request with %d entries", len(data.adventures))
+    try:
+        logged = log_adventures(request.user, data.adventures)
+    except AdventureLogError as e:
+        return e.status, ErrorResponse(message=str(e))
+    return 201, AdventureBatchOut(adventures=[_adventure_out(item) for item in logged])
+
+
+@router.patch(
+    "/{adventure_id}/status/",
+    response={200: AdventureStatusOut, 404: ErrorResponse, 422: ErrorResponse},
+    summary="Change an adventure's status",
+)
+def update_adventure_status(request, adventure_id: UUID, data: AdventureStatusIn):
+    """Mark an adventure in progress, completed or abandoned; completion earns XP."""
+    try:
+        xp = set_status(request.user, adventure_id, data.status, data.best_time)
+    except AdventureLogError as e:
+        return e.status, ErrorResponse(message=str(e))
+    return 200, AdventureStatusOut(id=adventure_id, status=data.status, xp_awarded=xp)
@@ -1,6 +1,12 @@
+import contextlib
+
 from django.apps import AppConfig
 
 
 class AdventureConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "walkquest.adventures"
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import walkquest.adventures.signals  # noqa: F401
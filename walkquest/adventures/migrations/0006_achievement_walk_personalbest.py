@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0005_achievement_achievements_user_history_idx'),
+        ('walks', '0014_walkelevationprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='walk',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='achievements', to='walks.walk'),
+        ),
+        migrations.CreateModel(
+            name='PersonalBest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('best_time', models.FloatField(verbose_name='Best Time')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('achievement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='adventures.achievement')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to=settings.AUTH_USER_MODEL)),
+                ('walk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_bests', to='walks.walk')),
+            ],
+            options={
+                'verbose_name': 'personal best',
+                'verbose_name_plural': 'personal bests',
+                'constraints': [models.UniqueConstraint(fields=('user', 'walk'), name='unique_user_walk_personal_best')],
+            },
+        ),
+        # Link existing achievements to a walk of their adventure, then seed
+        # personal bests from them.
+        migrations.RunSQL(
+            sql="""
+                UPDATE adventures_achievement ach
+                SET walk_id = linked.walk_id
+                FROM (
+                    SELECT adventure_id, MIN(id::text)::uuid AS walk_id
+                    FROM walks_walk
+                    WHERE adventure_id IS NOT NULL
+                    GROUP BY adventure_id
+                ) linked
+                WHERE linked.adventure_id = ach.adventure_id AND ach.walk_id IS NULL;
+
+                INSERT INTO adventures_personalbest (user_id, walk_id, achievement_id, best_time, updated_at)
+                SELECT DISTINCT ON (user_id, walk_id) user_id, walk_id, id, best_time, NOW()
+                FROM adventures_achievement
+                WHERE walk_id IS NOT NULL AND best_time IS NOT NULL AND best_time > 0
+                ORDER BY user_id, walk_id, best_time, id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
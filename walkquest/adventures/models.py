@@ -3,6 +3,26 @@ from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+class AchievementQuerySet(models.QuerySet):
+    def with_personal_best(self):
+        """Annotate ``holds_personal_best`` so lists need no query per row.
+
+        Matches :meth:`Achievement.is_personal_best`, including achievements
+        without a walk.
+        """
+        # best_time__isnull keeps a NULL best_time from making the whole
+        # expression NULL, which would send is_personal_best() to the database.
+        holds = models.Exists(
+            PersonalBest.objects.filter(achievement=models.OuterRef("pk")),
+        ) | models.Q(walk__isnull=True, best_time__isnull=False, best_time__gt=0)
+        return self.annotate(
+            holds_personal_best=models.ExpressionWrapper(
+                holds,
+                output_field=models.BooleanField(),
+            ),
+        )
+
+
 class Achievement(models.Model):
     VISIBILITY_CHOICES = [
         ("PUBLIC", _("Public")),
@@ -20,6 +40,13 @@ class Achievement(models.Model):
         related_name="achievements",
     )
     adventure = models.ForeignKey("walks.Adventure", on_delete=models.CASCADE)
+    walk = models.ForeignKey(
+        "walks.Walk",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="achievements",
+    )
     conquered_date = models.DateTimeField(_("Conquered Date"), default=timezone.now)
     attempts = models.PositiveIntegerField(_("Attempts"), default=0)
     best_time = models.FloatField(_("Best Time"), null=True, blank=True)
@@ -40,17 +67,18 @@ class Achievement(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AchievementQuerySet.as_manager()
+
     def is_personal_best(self):
+        annotated = getattr(self, "holds_personal_best", None)
+        if annotated is not None:
+            return annotated
         if not self.best_time:
             return False
-        min_time = self.user.achievements.filter(
-            adventure=self.adventure,
-        ).exclude(
-            id=self.id
-        ).aggregate(
-            min_time=models.Min("best_time")
-        )["min_time"]
-        return not min_time or self.best_time <= min_time
+        if self.walk_id is None:
+            # One achievement per user and adventure, so nothing to beat.
+            return self.best_time > 0
+        return PersonalBest.objects.filter(achievement_id=self.pk).exists()
 
     @property
     def duration(self):
@@ -69,6 +97,11 @@ class Achievement(models.Model):
             models.Index(fields=["visibility"], name="achievements_visibility_idx"),
             models.Index(fields=["user", "status"], name="achievements_user_status_idx"),
             models.Index(fields=["created_at"], name="achievements_created_at_idx"),
+            # Adventure history pages: newest first, keyed on (date, id).
+            models.Index(
+                fields=["user", "-conquered_date", "-id"],
+                name="achievements_user_history_idx",
+            ),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -76,3 +109,39 @@ class Achievement(models.Model):
                 name="unique_user_adventure",
             ),
         ]
+
+
+class PersonalBest(models.Model):
+    """A user's fastest time on a walk, kept up to date as achievements change.
+
+    Maintained by ``walkquest.adventures.personal_bests``; read it instead of
+    aggregating over achievements.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="personal_bests",
+    )
+    walk = models.ForeignKey(
+        "walks.Walk",
+        on_delete=models.CASCADE,
+        related_name="personal_bests",
+    )
+    achievement = models.ForeignKey(
+        Achievement,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    best_time = models.FloatField(_("Best Time"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("personal best")
+        verbose_name_plural = _("personal bests")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "walk"],
+                name="unique_user_walk_personal_best",
+            ),
+        ]
@@ -0,0 +1,66 @@
+"""
+Incremental personal bests.
+
+``record_bests`` upserts a user's time on a walk into ``PersonalBest`` with
+``INSERT ... ON CONFLICT DO UPDATE ... WHERE`` so the row only changes when
+the new time is faster, in one statement however many achievements are
+written. ``recompute`` rebuilds one (user, walk) record after the current
+best is deleted or slowed down, which is rare.
+"""
+
+from django.db import connection
+from django.db.models import Min
+
+from .models import Achievement
+from .models import PersonalBest
+
+
+def record_bests(achievements) -> None:
+    """Offer each achievement's ``best_time`` as a personal best on its walk."""
+    # Within one statement a conflict key may only be updated once, so only
+    # the fastest time per (user, walk) is sent.
+    fastest = {}
+    for a in achievements:
+        if a.walk_id is None or not a.best_time:
+            continue
+        current = fastest.get((a.user_id, a.walk_id))
+        if current is None or a.best_time < current.best_time:
+            fastest[(a.user_id, a.walk_id)] = a
+    if not fastest:
+        return
+
+    table = connection.ops.quote_name(PersonalBest._meta.db_table)
+    values = ", ".join(["(%s, %s, %s, %s, NOW())"] * len(fastest))
+    params = [
+        value
+        for a in fastest.values()
+        for value in (a.user_id, a.walk_id, a.pk, a.best_time)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} AS pb (user_id, walk_id, achievement_id, best_time, updated_at)
+            VALUES {values}
+            ON CONFLICT (user_id, walk_id) DO UPDATE
+            SET achievement_id = EXCLUDED.achievement_id,
+                best_time = EXCLUDED.best_time,
+                updated_at = EXCLUDED.updated_at
+            WHERE EXCLUDED.best_time < pb.best_time
+            """,  # noqa: S608
+            params,
+        )
+
+
+def recompute(user_id, walk_id) -> None:
+    """Rebuild the personal best for one user and walk from their achievements."""
+    achievements = Achievement.objects.filter(user_id=user_id, walk_id=walk_id, best_time__isnull=False)
+    best = achievements.aggregate(best=Min("best_time"))["best"]
+    if best is None:
+        PersonalBest.objects.filter(user_id=user_id, walk_id=walk_id).delete()
+        return
+    achievement = achievements.filter(best_time=best).order_by("pk").first()
+    PersonalBest.objects.update_or_create(
+        user_id=user_id,
+        walk_id=walk_id,
+        defaults={"achievement": achievement, "best_time": best},
+    )
@@ -1,5 +1,5 @@
-from datetime import date, time
-from typing import List, Optional
+from datetime import date, datetime, time
+from typing import Dict, List, Optional
 from uuid import UUID
 from ninja import Schema
 
@@ -21,6 +21,7 @@ class AdventureIn(Schema):
     is_public: bool = True
     start_location: Optional[str] = None
     end_location: Optional[str] = None
+    best_time: Optional[float] = None
 
 class AdventureOut(Schema):
     id: UUID
@@ -39,6 +40,40 @@ class AdventureOut(Schema):
     start_location: Optional[str] = None
     end_location: Optional[str] = None
 
+class AdventureHistoryItem(AdventureOut):
+    status: str
+    conquered_date: datetime
+    best_time: Optional[float] = None
+    is_personal_best: bool = False
+
+class AdventureStatsOut(Schema):
+    total: int
+    by_status: Dict[str, int]
+    by_difficulty: Dict[str, int]
+    total_distance_km: float
+    current_streak_days: int
+    longest_streak_days: int
+
+class AdventureHistoryOut(Schema):
+    items: List[AdventureHistoryItem]
+    next_cursor: Optional[str] = None
+    stats: Optional[AdventureStatsOut] = None
+
+class AdventureBatchIn(Schema):
+    adventures: List[AdventureIn]
+
+class AdventureBatchOut(Schema):
+    adventures: List[AdventureOut]
+
+class AdventureStatusIn(Schema):
+    status: str
+    best_time: Optional[float] = None
+
+class AdventureStatusOut(Schema):
+    id: UUID
+    status: str
+    xp_awarded: int
+
 class ErrorResponse(Schema):
     message: str
 
@@ -0,0 +1,51 @@
+"""
+Experience points for logged and completed adventures.
+
+XP is changed with a single relative UPDATE on the user row, so concurrent
+awards never lose each other's points. The UPDATE returns the clamped total,
+which is written to the leaderboard once the change commits.
+"""
+
+from django.db import connection
+from django.db import transaction
+
+from walkquest.users.leaderboard import record_xp
+from walkquest.users.models import User
+
+DIFFICULTY_XP = {
+    "NOVICE WANDERER": 10,
+    "GREY'S PATHFINDER": 20,
+    "TRAIL RANGER": 30,
+    "WARDEN'S ASCENT": 40,
+    "MASTER WAYFARER": 50,
+}
+DEFAULT_XP = 10
+# Completing an adventure is worth twice what logging it was.
+COMPLETION_MULTIPLIER = 2
+
+
+def logging_xp(difficulty_level: str) -> int:
+    return DIFFICULTY_XP.get(difficulty_level, DEFAULT_XP)
+
+
+def completion_xp(difficulty_level: str) -> int:
+    return logging_xp(difficulty_level) * COMPLETION_MULTIPLIER
+
+
+def award_xp(user_id: int, xp: int, quests: int = 0) -> None:
+    """Add ``xp`` (and completed ``quests``) to the user; negatives are clamped at zero."""
+    if not xp and not quests:
+        return
+    table = connection.ops.quote_name(User._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET "  # noqa: S608
+            "experience_points = GREATEST(experience_points + %s, 0), "
+            "quests_completed = GREATEST(quests_completed + %s, 0) "
+            "WHERE id = %s RETURNING experience_points",
+            [xp, quests, user_id],
+        )
+        row = cursor.fetchone()
+    if row is not None:
+        total = row[0]
+        transaction.on_commit(lambda: record_xp(user_id, total), robust=True)
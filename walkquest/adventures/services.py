@@ -0,0 +1,197 @@
+"""
+Adventure logging.
+
+``log_adventures`` records one or more adventures for a user in a single
+transaction: the adventures, their category and companion links and the
+achievements are each written with one bulk INSERT, and the logged walks
+are linked with one bulk UPDATE. Lookups (walks, categories, companions)
+are done once for the whole batch before anything is written, so a bad
+entry fails the batch without leaving partial rows behind.
+"""
+
+import logging
+from collections import Counter
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from walkquest.walks.models import Adventure
+from walkquest.walks.models import Companion
+from walkquest.walks.models import Walk
+from walkquest.walks.models import WalkCategoryTag
+
+from .models import Achievement
+from .personal_bests import record_bests
+from .scoring import award_xp
+from .scoring import completion_xp
+from .scoring import logging_xp
+from .stats import invalidate_stats
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 50
+
+
+class AdventureLogError(Exception):
+    """An entry cannot be logged; ``status`` is the HTTP status to return."""
+
+    def __init__(self, message: str, status: int = 422, index: int | None = None):
+        if index is not None:
+            message = f"adventures[{index}]: {message}"
+        super().__init__(message)
+        self.status = status
+
+
+class LoggedAdventure:
+    """A created adventure with the entry, categories and companions it came from."""
+
+    def __init__(self, adventure: Adventure, entry, categories: list[str], companions: list[Companion]):
+        self.adventure = adventure
+        self.entry = entry
+        self.categories = categories
+        self.companions = companions
+
+
+def _bulk_link(field_name: str, links: list[tuple]) -> None:
+    """Insert ``(adventure_id, target_id)`` rows into a many-to-many table."""
+    field = Adventure._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = f"{field.m2m_field_name()}_id"
+    target = f"{field.m2m_reverse_field_name()}_id"
+    through.objects.bulk_create(
+        [through(**{source: adventure_id, target: target_id}) for adventure_id, target_id in links],
+    )
+
+
+def _increment_tag_counts(tag_ids: list[int]) -> None:
+    """Bulk inserts bypass tagulous, so keep its usage counts in step here."""
+    by_increment = defaultdict(list)
+    for tag_id, uses in Counter(tag_ids).items():
+        by_increment[uses].append(tag_id)
+    for uses, ids in by_increment.items():
+        WalkCategoryTag.objects.filter(pk__in=ids).update(count=F("count") + uses)
+
+
+def log_adventures(user, entries) -> list[LoggedAdventure]:
+    """Create an adventure and achievement for each of ``entries`` (``AdventureIn``)."""
+    if len(entries) > MAX_BATCH_SIZE:
+        raise AdventureLogError(f"At most {MAX_BATCH_SIZE} adventures can be logged at once")
+
+    walk_ids = {entry.walk_id for entry in entries if entry.walk_id}
+    found_walks = set(Walk.objects.filter(id__in=walk_ids).values_list("id", flat=True))
+    slugs = {slug for entry in entries for slug in entry.categories or ()}
+    tags = {tag.slug: tag for tag in WalkCategoryTag.objects.filter(slug__in=slugs)}
+    companion_ids = {pk for entry in entries for pk in entry.companion_ids or ()}
+    companions = {c.id: c for c in Companion.objects.filter(id__in=companion_ids, user=user)}
+
+    logged = []
+    for index, entry in enumerate(entries):
+        if entry.walk_id and entry.walk_id not in found_walks:
+            raise AdventureLogError(f"Walk {entry.walk_id} not found", status=404, index=index)
+        if entry.end_date < entry.start_date:
+            raise AdventureLogError("end_date is before start_date", index=index)
+        adventure = Adventure(
+            title=entry.title,
+            description=entry.description,
+            start_date=entry.start_date,
+            end_date=entry.end_date,
+            start_time=entry.start_time,
+            end_time=entry.end_time,
+            difficulty_level=entry.difficulty_level,
+            is_public=entry.is_public,
+        )
+        # Unknown slugs and other users' companions are ignored, as before.
+        logged.append(
+            LoggedAdventure(
+                adventure,
+                entry,
+                [tags[slug].slug for slug in dict.fromkeys(entry.categories or ()) if slug in tags],
+                [companions[pk] for pk in dict.fromkeys(entry.companion_ids or ()) if pk in companions],
+            ),
+        )
+
+    category_links = [
+        (item.adventure.id, tags[slug].pk) for item in logged for slug in item.categories
+    ]
+    companion_links = [
+        (item.adventure.id, companion.id) for item in logged for companion in item.companions
+    ]
+    with transaction.atomic():
+        Adventure.objects.bulk_create([item.adventure for item in logged])
+        if category_links:
+            _bulk_link("related_categories", category_links)
+            _increment_tag_counts([tag_id for _, tag_id in category_links])
+        if companion_links:
+            _bulk_link("companions", companion_links)
+        achievements = Achievement.objects.bulk_create(
+            [
+                Achievement(
+                    user=user,
+                    adventure=item.adventure,
+                    walk_id=item.entry.walk_id,
+                    best_time=item.entry.best_time,
+                    visibility="PUBLIC" if item.adventure.is_public else "PRIVATE",
+                )
+                for item in logged
+            ],
+        )
+        # bulk_create sends no post_save, so personal bests are offered here.
+        record_bests(achievements)
+        # The last adventure logged on a walk wins, as with one-by-one saves.
+        walk_links = {
+            item.entry.walk_id: Walk(id=item.entry.walk_id, adventure_id=item.adventure.id)
+            for item in logged
+            if item.entry.walk_id
+        }
+        if walk_links:
+            # bulk_update skips Walk.save(), which recomputes derived fields
+            # this change does not touch.
+            Walk.objects.bulk_update(walk_links.values(), ["adventure"])
+        award_xp(user.pk, sum(logging_xp(item.adventure.difficulty_level) for item in logged))
+        transaction.on_commit(lambda: invalidate_stats(user.pk))
+
+    logger.info("Logged %d adventure(s) for user %s", len(logged), user.pk)
+    return logged
+
+
+def set_status(user, adventure_id, status: str, best_time: float | None = None) -> int:
+    """Change the status of the user's achievement for ``adventure_id``.
+
+    Completing an adventure awards XP and counts a quest; moving it out of
+    COMPLETED takes them back. The achievement row is locked while its old
+    status is compared, so a repeated request never awards twice. Returns
+    the XP change. ``best_time`` (minutes) is recorded and offered as a
+    personal best.
+    """
+    if status not in dict(Achievement.STATUS_CHOICES):
+        raise AdventureLogError(f"Unknown status {status}")
+
+    with transaction.atomic():
+        achievement = (
+            Achievement.objects.filter(user=user, adventure_id=adventure_id)
+            .select_related("adventure")
+            .select_for_update(of=("self",))
+            .only("id", "user_id", "walk_id", "status", "best_time", "adventure__difficulty_level")
+            .first()
+        )
+        if achievement is None:
+            raise AdventureLogError("Adventure not found", status=404)
+        if best_time and (not achievement.best_time or best_time < achievement.best_time):
+            achievement.best_time = best_time
+            Achievement.objects.filter(pk=achievement.pk).update(best_time=best_time)
+            record_bests([achievement])
+        previous = achievement.status
+        if previous == status:
+            return 0
+        Achievement.objects.filter(pk=achievement.pk).update(status=status)
+
+        bonus = completion_xp(achievement.adventure.difficulty_level)
+        xp, quests = 0, 0
+        if status == "COMPLETED":
+            xp, quests = bonus, 1
+        elif previous == "COMPLETED":
+            xp, quests = -bonus, -1
+        award_xp(user.pk, xp, quests)
+        transaction.on_commit(lambda: invalidate_stats(user.pk))
+    return xp
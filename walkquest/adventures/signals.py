@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Achievement
+from .models import PersonalBest
+from .personal_bests import recompute
+from .personal_bests import record_bests
+
+
+@receiver(post_save, sender=Achievement)
+def achievement_saved_handler(sender, instance, **kwargs):
+    """Keep personal bests current for achievements saved one at a time (admin)."""
+    held = PersonalBest.objects.filter(achievement=instance).values_list("user_id", "walk_id", "best_time").first()
+    if held is not None and (held[1] != instance.walk_id or held[2] != instance.best_time):
+        # The record this achievement held changed; the best may now be another one.
+        recompute(held[0], held[1])
+    record_bests([instance])
+
+
+@receiver(post_delete, sender=Achievement)
+def achievement_deleted_handler(sender, instance, **kwargs):
+    if instance.walk_id is not None and instance.best_time:
+        recompute(instance.user_id, instance.walk_id)
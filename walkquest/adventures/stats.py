@@ -0,0 +1,91 @@
+"""
+Per-user adventure statistics.
+
+Computed with SQL aggregates over the user's achievements (the counts use
+``achievements_user_status_idx``) and cached per user until the next
+adventure is logged.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.db.models import Sum
+from django.utils import timezone
+
+from walkquest.walks.models import Adventure
+
+from .models import Achievement
+
+STATS_TTL = 60 * 60
+
+
+def stats_key(user_id) -> str:
+    return f"walkquest:adventure_stats:{user_id}"
+
+
+def invalidate_stats(user_id) -> None:
+    cache.delete(stats_key(user_id))
+
+
+def _streaks(user_id) -> tuple[int, int]:
+    """Longest and current runs of consecutive days with an adventure.
+
+    Classic gaps-and-islands: subtracting each day's rank from the day gives
+    the same value for every day in a run. The current streak is the run
+    ending today or yesterday.
+    """
+    achievements = connection.ops.quote_name(Achievement._meta.db_table)
+    adventures = connection.ops.quote_name(Adventure._meta.db_table)
+    sql = f"""
+        WITH days AS (
+            SELECT DISTINCT adv.start_date AS day
+            FROM {achievements} ach
+            JOIN {adventures} adv ON adv.id = ach.adventure_id
+            WHERE ach.user_id = %s AND ach.status <> 'ABANDONED'
+        ), runs AS (
+            SELECT COUNT(*) AS length, MAX(day) AS last_day
+            FROM (SELECT day, day - (ROW_NUMBER() OVER (ORDER BY day))::int AS run FROM days) ranked
+            GROUP BY run
+        )
+        SELECT COALESCE(MAX(length), 0), COALESCE(MAX(length) FILTER (WHERE last_day >= %s), 0)
+        FROM runs
+    """  # noqa: S608
+    yesterday = timezone.localdate() - timedelta(days=1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, yesterday])
+        longest, current = cursor.fetchone()
+    return longest, current
+
+
+def compute_stats(user_id) -> dict:
+    achievements = Achievement.objects.filter(user_id=user_id)
+    by_status = dict(
+        achievements.order_by().values_list("status").annotate(count=Count("id")),
+    )
+    by_difficulty = dict(
+        achievements.order_by()
+        .values_list("adventure__difficulty_level")
+        .annotate(count=Count("id")),
+    )
+    distance = achievements.exclude(status="ABANDONED").aggregate(
+        total=Sum("adventure__walks__distance"),
+    )["total"]
+    longest, current = _streaks(user_id)
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_difficulty": by_difficulty,
+        "total_distance_km": round(distance or 0.0, 2),
+        "current_streak_days": current,
+        "longest_streak_days": longest,
+    }
+
+
+def get_stats(user_id) -> dict:
+    stats = cache.get(stats_key(user_id))
+    if stats is None:
+        stats = compute_stats(user_id)
+        cache.set(stats_key(user_id), stats, STATS_TTL)
+    return stats
@@ -1,2 +1,178 @@
+from django.core.cache import cache
+from django.test import TestCase
 
-# Create your tests here.
+from walkquest.users.tests.factories import UserFactory
+from walkquest.walks.models import Adventure
+from walkquest.walks.models import Companion
+from walkquest.walks.models import Walk
+from walkquest.walks.synthetic import SyntheticCatalogue
+
+from .models import Achievement
+from .models import PersonalBest
+
+
+class AdventureLogApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        SyntheticCatalogue(seed=5, batch_size=10).create_walks(2)
+        self.walks = list(Walk.objects.order_by("walk_id"))
+        self.user = UserFactory()
+        self.companion = Companion.objects.create(user=self.user, name="Bramble")
+        self.client.force_login(self.user)
+
+    def entry(self, walk, **overrides):
+        return {
+            "title": f"Walked {walk.walk_name}",
+            "description": "A fine day out.",
+            "start_date": "2024-05-01",
+            "end_date": "2024-05-01",
+            "start_time": "09:30",
+            "end_time": "12:15",
+            "difficulty_level": "TRAIL RANGER",
+            "categories": [],
+            "companion_ids": [str(self.companion.id)],
+            "walk_id": str(walk.id),
+            **overrides,
+        }
+
+    def test_batch_logs_every_adventure(self):
+        response = self.client.post(
+            "/api/adventures/log:batch",
+            {"adventures": [self.entry(walk) for walk in self.walks]},
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        assert len(response.json()["adventures"]) == 2
+        assert Achievement.objects.filter(user=self.user).count() == 2
+        assert self.companion.adventures.count() == 2
+        for walk in self.walks:
+            walk.refresh_from_db()
+            assert walk.adventure is not None
+
+    def test_batch_is_all_or_nothing(self):
+        bad = self.entry(self.walks[1], walk_id="00000000-0000-0000-0000-000000000000")
+        response = self.client.post(
+            "/api/adventures/log:batch",
+            {"adventures": [self.entry(self.walks[0]), bad]},
+            content_type="application/json",
+        )
+        assert response.status_code == 404
+        assert "adventures[1]" in response.json()["message"]
+        assert not Adventure.objects.exists()
+
+    def test_single_log(self):
+        response = self.client.post(
+            "/api/adventures/log",
+            self.entry(self.walks[0]),
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        assert response.json()["companions"][0]["name"] == "Bramble"
+
+    def test_history_pages_and_stats(self):
+        self.client.post(
+            "/api/adventures/log:batch",
+            {
+                "adventures": [
+                    self.entry(self.walks[0], start_date="2024-05-01", end_date="2024-05-01"),
+                    self.entry(self.walks[1], start_date="2024-05-02", end_date="2024-05-02"),
+                    self.entry(self.walks[0], start_date="2024-05-04", end_date="2024-05-04"),
+                ],
+            },
+            content_type="application/json",
+        )
+
+        first = self.client.get("/api/adventures/history", {"limit": 2}).json()
+        assert len(first["items"]) == 2
+        assert first["stats"]["total"] == 3
+        assert first["stats"]["longest_streak_days"] == 2
+        assert first["stats"]["by_difficulty"] == {"TRAIL RANGER": 3}
+
+        second = self.client.get(
+            "/api/adventures/history",
+            {"limit": 2, "cursor": first["next_cursor"]},
+        ).json()
+        assert len(second["items"]) == 1
+        assert second["next_cursor"] is None
+        assert second["stats"] is None
+        seen = {item["id"] for item in first["items"] + second["items"]}
+        assert len(seen) == 3
+
+    def test_stats_are_invalidated_by_new_logs(self):
+        assert self.client.get("/api/adventures/history").json()["stats"]["total"] == 0
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/adventures/log",
+                self.entry(self.walks[0]),
+                content_type="application/json",
+            )
+        assert self.client.get("/api/adventures/history").json()["stats"]["total"] == 1
+
+    def test_completing_awards_xp_once(self):
+        response = self.client.post(
+            "/api/adventures/log",
+            self.entry(self.walks[0]),
+            content_type="application/json",
+        )
+        adventure_id = response.json()["id"]
+        self.user.refresh_from_db()
+        assert self.user.experience_points == 30
+
+        for _ in range(2):
+            response = self.client.patch(
+                f"/api/adventures/{adventure_id}/status/",
+                {"status": "COMPLETED"},
+                content_type="application/json",
+            )
+        assert response.json()["xp_awarded"] == 0
+        self.user.refresh_from_db()
+        assert self.user.experience_points == 90
+        assert self.user.quests_completed == 1
+
+    def test_personal_best_is_maintained_on_write(self):
+        self.client.post(
+            "/api/adventures/log:batch",
+            {
+                "adventures": [
+                    self.entry(self.walks[0], best_time=55.0),
+                    self.entry(self.walks[0], best_time=48.5),
+                    self.entry(self.walks[1], best_time=70.0),
+                ],
+            },
+            content_type="application/json",
+        )
+        best = PersonalBest.objects.get(user=self.user, walk=self.walks[0])
+        assert best.best_time == 48.5
+
+        items = self.client.get("/api/adventures/history").json()["items"]
+        flags = sorted((item["best_time"], item["is_personal_best"]) for item in items)
+        assert flags == [(48.5, True), (55.0, False), (70.0, True)]
+
+        best.achievement.delete()
+        assert PersonalBest.objects.get(user=self.user, walk=self.walks[0]).best_time == 55.0
+
+    def test_annotation_matches_the_method(self):
+        self.client.post(
+            "/api/adventures/log:batch",
+            {
+                "adventures": [
+                    self.entry(self.walks[0], best_time=55.0),
+                    self.entry(self.walks[0], best_time=48.5),
+                ],
+            },
+            content_type="application/json",
+        )
+        for best_time in (30.0, None):
+            adventure = Adventure.objects.create(
+                title="Off the map",
+                description="No walk to beat.",
+                start_date="2024-05-01",
+                end_date="2024-05-01",
+                difficulty_level="TRAIL RANGER",
+            )
+            Achievement.objects.create(user=self.user, adventure=adventure, best_time=best_time)
+
+        achievements = Achievement.objects.filter(user=self.user).order_by("pk")
+        annotated = [a.is_personal_best() for a in achievements.with_personal_best()]
+        assert annotated == [a.is_personal_best() for a in achievements]
+        assert annotated == [False, True, True, False]
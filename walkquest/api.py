@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 
 from django.http import HttpRequest, JsonResponse
 from django.views import View
@@ -8,6 +8,10 @@ from allauth.headless.contrib.ninja.security import x_session_token_auth
 from walkquest.walks.models import Walk
 from walkquest.walks.api import api as walks_router, ORJSONParser, ORJSONRenderer
 from walkquest.adventures.api import router as adventures_router
+from walkquest.users.context import get_user_context
+from walkquest.users import leaderboard
+from walkquest.users import preferences as user_preferences
+from .health import check_readiness
 from .schemas import ConfigOut, TagOut, WalkOut
 
 # Create a router for the main API
@@ -18,6 +22,20 @@ router = Router()
 def health_check(request):
     return {"status": "ok"}
 
+
+@router.get("/health/live")
+def liveness_check(request):
+    """Liveness: the process is serving requests. Dependencies are not checked,
+    so a slow database never gets healthy workers restarted."""
+    return {"status": "ok"}
+
+
+@router.get("/health/ready", response={200: Dict[str, Any], 503: Dict[str, Any]})
+def readiness_check(request):
+    """Readiness: database, cache and broker reachable, with per-check latency."""
+    result = check_readiness()
+    return (200 if result["status"] == "ok" else 503), result
+
 # Create the API instance and add the router to it
 api_instance = NinjaAPI(
     title="Main API",
@@ -40,12 +58,23 @@ class UserSchema(Schema):
     email: str
     username: str
     is_authenticated: bool
+    favorites_version: int = 0
 
 class PreferencesSchema(Schema):
+    theme: Literal["system", "light", "dark"] = "system"
+    language: str = "en"
+    notifications: bool = True
+    mapStyle: str = "streets"
+    units: Literal["metric", "imperial"] = "metric"
     dark_mode: bool = False
     map_style: str = "streets-v11"
 
 class PreferenceUpdateSchema(Schema):
+    theme: Optional[Literal["system", "light", "dark"]] = None
+    language: Optional[str] = None
+    notifications: Optional[bool] = None
+    mapStyle: Optional[str] = None
+    units: Optional[Literal["metric", "imperial"]] = None
     dark_mode: Optional[bool] = None
     map_style: Optional[str] = None
 
@@ -53,43 +82,50 @@ class PreferenceUpdateSchema(Schema):
 @api_instance.get("/user", response=UserSchema, auth=[x_session_token_auth])
 def get_current_user(request: HttpRequest) -> Dict[str, Any]:
     """Get current user information"""
-    if request.user.is_authenticated:
-        return {
-            "id": request.user.id,
-            "email": request.user.email,
-            "username": request.user.username,
-            "is_authenticated": True
-        }
-    return {
-        "id": None,
-        "email": "",
-        "username": "",
-        "is_authenticated": False
-    }
+    context = get_user_context(request)
+    return {**context.as_user_dict(), "favorites_version": context.favorites_version}
 
 @api_instance.get("/preferences", response=PreferencesSchema, auth=[x_session_token_auth])
 def get_preferences(request: HttpRequest) -> Dict[str, Any]:
     """Get user preferences"""
-    if not request.user.is_authenticated:
-        return PreferencesSchema().dict() 
-    
-    # Replace with actual preference retrieval logic
-    return {
-        "dark_mode": False,  # Replace with user preference
-        "map_style": "streets-v11"  # Replace with user preference
-    }
+    return user_preferences.with_defaults(get_user_context(request).preferences)
 
 @api_instance.patch("/preferences", response=PreferencesSchema, auth=[x_session_token_auth])
 def update_preferences(request: HttpRequest, data: PreferenceUpdateSchema) -> Dict[str, Any]:
     """Update user preferences"""
-    if not request.user.is_authenticated:
-        return PreferencesSchema().dict()
-    
-    # Replace with actual preference update logic
-    return {
-        "dark_mode": data.dark_mode if data.dark_mode is not None else False,
-        "map_style": data.map_style if data.map_style is not None else "streets-v11"
-    }
+    context = get_user_context(request)
+    if not context.is_authenticated:
+        return user_preferences.with_defaults({})
+    # Only the keys sent are merged into the stored preferences.
+    changes = data.dict(exclude_unset=True, exclude_none=True)
+    return user_preferences.update_preferences(context.id, changes)
+
+class LeaderboardEntrySchema(Schema):
+    rank: int
+    user_id: int
+    username: str
+    name: str
+    experience_points: int
+
+class LeaderboardRankSchema(Schema):
+    rank: Optional[int] = None
+    experience_points: int = 0
+
+
+@api_instance.get("/leaderboard", response={200: List[LeaderboardEntrySchema], 401: Dict[str, str]})
+def get_leaderboard(request: HttpRequest, limit: int = 10):
+    """Top users by experience points; signed-in users only, as it lists names"""
+    if not get_user_context(request).is_authenticated:
+        return 401, {"error": "Authentication required"}
+    return 200, leaderboard.top(max(1, min(limit, 100)))
+
+@api_instance.get("/leaderboard/me", response=LeaderboardRankSchema, auth=[x_session_token_auth])
+def get_my_rank(request: HttpRequest) -> Dict[str, Any]:
+    """The current user's leaderboard position"""
+    context = get_user_context(request)
+    if not context.is_authenticated:
+        return {}
+    return leaderboard.rank(context.id) or {}
 
 # Add UserAPI class for direct API endpoint
 class UserAPI(View):
@@ -97,16 +133,4 @@ class UserAPI(View):
     
     def get(self, request):
         """Get current user information"""
-        if request.user.is_authenticated:
-            return JsonResponse({
-                "id": request.user.id,
-                "email": request.user.email,
-                "username": request.user.username,
-                "is_authenticated": True
-            })
-        return JsonResponse({
-            "id": None,
-            "email": "",
-            "username": "",
-            "is_authenticated": False
-        })
+        return JsonResponse(get_user_context(request).as_user_dict())
@@ -0,0 +1,150 @@
+"""
+django_redis client that reports cache activity to request instrumentation.
+
+Configured through ``CACHES["default"]["OPTIONS"]["CLIENT_CLASS"]``. Hits and
+misses always feed the Prometheus cache metrics; timings are only taken
+inside a sampled request.
+
+``aget_json``/``aset_json`` give async views a cache that talks to Redis
+through ``redis.asyncio`` instead of borrowing a thread for each call.
+"""
+
+import asyncio
+import time
+import weakref
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django_redis.client import DefaultClient
+from redis import asyncio as aioredis
+
+from walkquest.instrumentation import current_metrics
+from walkquest.metrics import record_cache_lookup
+
+_MISSING = object()
+
+
+class InstrumentedRedisClient(DefaultClient):
+    def get(self, key, default=None, version=None, client=None):
+        metrics = current_metrics()
+        start = time.perf_counter()
+        value = super().get(key, default=_MISSING, version=version, client=client)
+        hit = value is not _MISSING
+        record_cache_lookup(str(key), hits=int(hit), misses=int(not hit))
+        if metrics is not None:
+            metrics.record_cache(time.perf_counter() - start, hits=int(hit), misses=int(not hit))
+        return value if hit else default
+
+    def get_many(self, keys, version=None, client=None):
+        metrics = current_metrics()
+        keys = list(keys)
+        start = time.perf_counter()
+        values = super().get_many(keys, version=version, client=client)
+        for key in keys:
+            hit = key in values
+            record_cache_lookup(str(key), hits=int(hit), misses=int(not hit))
+        if metrics is not None:
+            metrics.record_cache(
+                time.perf_counter() - start,
+                hits=len(values),
+                misses=len(keys) - len(values),
+            )
+        return values
+
+    def _timed(self, method, *args, **kwargs):
+        metrics = current_metrics()
+        if metrics is None:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            metrics.record_cache(time.perf_counter() - start)
+
+    # add() and set_many() are implemented on top of set(), so they are
+    # counted through it.
+    def set(self, *args, **kwargs):
+        return self._timed(super().set, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._timed(super().delete, *args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        return self._timed(super().delete_many, *args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        return self._timed(super().incr, *args, **kwargs)
+
+
+def redis_connection(alias: str = "default"):
+    """The raw Redis client behind a django_redis cache, or ``None``.
+
+    Lets features use Redis data structures in production while falling back
+    to something simpler under the local-memory cache used in development.
+    """
+    try:
+        from django_redis import get_redis_connection
+    except ImportError:
+        return None
+    try:
+        return get_redis_connection(alias)
+    except NotImplementedError:
+        return None
+
+
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def async_redis_connection(alias: str = "default"):
+    """A ``redis.asyncio`` client for the cache's Redis server, or ``None``.
+
+    Only used when ``CACHE_ASYNC_CLIENT`` is on, i.e. when served through
+    ``config.asgi``. Clients are bound to the event loop they were created
+    on, so one is kept per loop; under WSGI every async view gets a fresh
+    loop, which would mean a new connection per request.
+    """
+    config = settings.CACHES[alias]
+    if not settings.CACHE_ASYNC_CLIENT or not config["BACKEND"].startswith("django_redis"):
+        return None
+    location = config["LOCATION"]
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = aioredis.Redis.from_url(
+            location[0] if isinstance(location, list | tuple) else location,
+        )
+    return client
+
+
+async def aget_json(key: str):
+    """Fetch a JSON value without tying up a thread; ``None`` when missing.
+
+    Values are stored as orjson bytes under the cache's key prefix, so they
+    are only shared with other callers of :func:`aget_json`/:func:`aset_json`.
+    """
+    metrics = current_metrics()
+    start = time.perf_counter()
+    client = async_redis_connection()
+    if client is None:
+        value = await cache.aget(key)
+    else:
+        raw = await client.get(cache.make_key(key))
+        value = None if raw is None else orjson.loads(raw)
+    hit = value is not None
+    record_cache_lookup(key, hits=int(hit), misses=int(not hit))
+    if metrics is not None:
+        metrics.record_cache(time.perf_counter() - start, hits=int(hit), misses=int(not hit))
+    return value
+
+
+async def aset_json(key: str, value, timeout: int) -> None:
+    metrics = current_metrics()
+    start = time.perf_counter()
+    client = async_redis_connection()
+    if client is None:
+        await cache.aset(key, value, timeout)
+    else:
+        await client.set(cache.make_key(key), orjson.dumps(value), ex=timeout)
+    if metrics is not None:
+        metrics.record_cache(time.perf_counter() - start)
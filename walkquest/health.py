@@ -0,0 +1,138 @@
+"""
+Readiness checks for the load balancer.
+
+``check_readiness`` probes Postgres, the Redis cache and the Celery broker
+concurrently, each bounded by ``HEALTH_CHECK_TIMEOUT``, and reports how long
+each took. The result is reused for ``CACHE_SECONDS`` so a burst of probes
+(several load balancers, many workers) costs the dependencies one round of
+checks per process per second. Only one round runs at a time; concurrent
+callers wait for it rather than starting their own.
+
+A check still running from an earlier round (a hung dependency) is waited on
+again instead of being resubmitted, so a hang never ties up more than one
+executor thread per check and the other checks keep their threads.
+"""
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.utils import load_backend
+
+from walkquest.cache import redis_connection
+
+logger = logging.getLogger(__name__)
+
+CACHE_SECONDS = 1.0
+
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="health")
+_lock = threading.Lock()
+_last_result: tuple[float, dict] | None = None
+# Futures of checks that had not finished when their round gave up.
+_running: dict[str, Future] = {}
+
+
+def _timeout() -> float:
+    return getattr(settings, "HEALTH_CHECK_TIMEOUT", 1.0)
+
+
+def _probe_connection():
+    """A one-off, unpooled connection whose connect and statements time out quickly."""
+    settings_dict = connections["default"].settings_dict
+    options = {key: value for key, value in settings_dict["OPTIONS"].items() if key != "pool"}
+    # libpq counts whole seconds and treats anything below 2 as 2.
+    options["connect_timeout"] = max(2, math.ceil(_timeout()))
+    backend = load_backend(settings_dict["ENGINE"])
+    return backend.DatabaseWrapper({**settings_dict, "OPTIONS": options}, "default")
+
+
+def check_database() -> None:
+    connection = _probe_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SET statement_timeout = %s", [int(_timeout() * 1000)])
+            cursor.execute("SELECT 1")
+    finally:
+        connection.close()
+
+
+def check_cache() -> None:
+    client = redis_connection()
+    if client is not None:
+        client.ping()
+    else:
+        cache.get("walkquest:health")
+
+
+def check_broker() -> None:
+    broker = getattr(settings, "CELERY_BROKER_URL", "") or ""
+    if not broker.startswith(("redis://", "rediss://")):
+        return
+    import redis
+
+    client = redis.Redis.from_url(
+        broker,
+        socket_timeout=_timeout(),
+        socket_connect_timeout=_timeout(),
+    )
+    try:
+        client.ping()
+    finally:
+        client.close()
+
+
+CHECKS = {
+    "database": check_database,
+    "cache": check_cache,
+    "broker": check_broker,
+}
+
+
+def _timed(check) -> float:
+    start = time.perf_counter()
+    check()
+    return time.perf_counter() - start
+
+
+def _run_checks() -> dict:
+    timeout = _timeout()
+    futures = {}
+    for name, check in CHECKS.items():
+        running = _running.pop(name, None)
+        futures[name] = running if running is not None and not running.done() else _executor.submit(_timed, check)
+    deadline = time.monotonic() + timeout
+    checks = {}
+    for name, future in futures.items():
+        try:
+            duration = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            _running[name] = future
+            checks[name] = {"ok": False, "latency_ms": None, "error": f"timed out after {timeout}s"}
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Readiness check %s failed", name, exc_info=True)
+            checks[name] = {"ok": False, "latency_ms": None, "error": exc.__class__.__name__}
+        else:
+            checks[name] = {"ok": True, "latency_ms": round(duration * 1000, 2)}
+    return {
+        "status": "ok" if all(check["ok"] for check in checks.values()) else "unavailable",
+        "checks": checks,
+    }
+
+
+def check_readiness() -> dict:
+    """Dependency status, at most ``CACHE_SECONDS`` old."""
+    global _last_result  # noqa: PLW0603
+    with _lock:
+        now = time.monotonic()
+        if _last_result is not None and now - _last_result[0] < CACHE_SECONDS:
+            return _last_result[1]
+        result = _run_checks()
+        _last_result = (time.monotonic(), result)
+        return result
@@ -0,0 +1,179 @@
+"""
+Per-request timing of database, cache and serialization work.
+
+``ServerTimingMiddleware`` activates a :class:`RequestMetrics` for each
+sampled request. The database wrapper, the instrumented Redis cache client
+and the API renderer add to it through :func:`current_metrics`, which is a
+context variable lookup and returns ``None`` outside a sampled request, so
+unsampled requests pay almost nothing.
+
+Each statement is also fingerprinted (literals and ``IN`` lists collapsed)
+so repeated identical statements within one request, the signature of an
+N+1, can be flagged along with the line of project code that issued them.
+Slow statements keep their origin too.
+"""
+
+import hashlib
+import re
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+
+from django.conf import settings
+
+# Frames under the walkquest package count as "our" code when locating origins.
+PACKAGE_ROOT = Path(__file__).resolve().parent
+PROJECT_ROOT = str(PACKAGE_ROOT)
+_THIS_FILE = str(Path(__file__).resolve())
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?|NULL)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse literals and ``IN`` lists so equivalent statements compare equal."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def query_origin() -> str | None:
+    """``path:line in function`` of the innermost project frame issuing a query."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename.startswith(PROJECT_ROOT) and filename != _THIS_FILE:
+            return f"{Path(filename).relative_to(PACKAGE_ROOT.parent).as_posix()}:{frame.lineno} in {frame.name}"
+    return None
+
+
+@dataclass
+class QueryStats:
+    sql: str
+    count: int = 0
+    time: float = 0.0
+    origin: str | None = None
+
+
+_current: ContextVar["RequestMetrics | None"] = ContextVar("walkquest_request_metrics", default=None)
+
+
+@dataclass
+class RequestMetrics:
+    db_queries: int = 0
+    db_time: float = 0.0
+    cache_calls: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_time: float = 0.0
+    serialize_time: float = 0.0
+    queries: dict[str, QueryStats] = field(default_factory=dict)
+    slow_queries: list[dict] = field(default_factory=list)
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook counting, timing and fingerprinting SQL."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_time += duration
+            self.db_queries += 1
+            self._record_statement(sql, duration)
+
+    def _record_statement(self, sql: str, duration: float) -> None:
+        key = fingerprint(sql)
+        stats = self.queries.get(key)
+        if stats is None:
+            stats = self.queries[key] = QueryStats(sql=normalize_sql(sql))
+        stats.count += 1
+        stats.time += duration
+        # Walking the stack is the expensive part, so only do it once the
+        # statement looks like an N+1, or when it is slow.
+        if stats.count == settings.N_PLUS_ONE_THRESHOLD:
+            stats.origin = query_origin()
+        if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            self.slow_queries.append(
+                {
+                    "fingerprint": key,
+                    "sql": stats.sql,
+                    "duration_ms": round(duration * 1000, 2),
+                    "origin": query_origin(),
+                },
+            )
+
+    def repeated_queries(self) -> dict[str, QueryStats]:
+        """Statements run at least ``N_PLUS_ONE_THRESHOLD`` times in this request."""
+        return {
+            key: stats
+            for key, stats in self.queries.items()
+            if stats.count >= settings.N_PLUS_ONE_THRESHOLD
+        }
+
+    def record_cache(self, duration: float, hits: int = 0, misses: int = 0) -> None:
+        self.cache_calls += 1
+        self.cache_hits += hits
+        self.cache_misses += misses
+        self.cache_time += duration
+
+    def server_timing(self, total: float) -> str:
+        """Format the metrics as a ``Server-Timing`` header value."""
+        return ", ".join(
+            [
+                f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+                f'cache;dur={self.cache_time * 1000:.1f};desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+                f"serialize;dur={self.serialize_time * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ],
+        )
+
+    def as_log_fields(self) -> dict:
+        return {
+            "db_queries": self.db_queries,
+            "db_ms": round(self.db_time * 1000, 2),
+            "cache_calls": self.cache_calls,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_ms": round(self.cache_time * 1000, 2),
+            "serialize_ms": round(self.serialize_time * 1000, 2),
+            "repeated_queries": len(self.repeated_queries()),
+            "slow_queries": len(self.slow_queries),
+        }
+
+
+def current_metrics() -> RequestMetrics | None:
+    return _current.get()
+
+
+@contextmanager
+def collect_metrics():
+    """Make a fresh :class:`RequestMetrics` current for the enclosed block."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed_serialization():
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_time += time.perf_counter() - start
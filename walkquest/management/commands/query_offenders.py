@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from walkquest.querylog import top_offenders
+
+
+class Command(BaseCommand):
+    help = "Show the worst N+1 and slow-query offenders recorded recently"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutes", type=int, default=60)
+        parser.add_argument("--limit", type=int, default=10)
+
+    def handle(self, *args, **options):
+        report = top_offenders(minutes=options["minutes"], limit=options["limit"])
+        titles = {
+            "n_plus_one": "Repeated statements (likely N+1)",
+            "slow": "Slow statements",
+        }
+        for kind, offenders in report.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{titles[kind]}, last {options['minutes']} minutes",
+            ))
+            if not offenders:
+                self.stdout.write("  none recorded")
+            for offender in offenders:
+                self.stdout.write(
+                    f"  {offender['statements']:>7} statements  {offender['total_ms']:>10.1f} ms  "
+                    f"{offender['route']}",
+                )
+                self.stdout.write(f"      from {offender.get('origin') or 'unknown'}")
+                self.stdout.write(f"      {offender.get('sql', '')[:160]}")
@@ -0,0 +1,286 @@
+"""
+Prometheus metrics that aggregate across worker processes.
+
+Each gunicorn worker (and Celery worker process) keeps its counters and
+histograms in memory and, when ``METRICS_DIR`` is set, writes them to its own
+file in that directory at most once per ``FLUSH_INTERVAL``. ``render()`` sums
+every file in the directory, so whichever worker answers the scrape reports
+the totals for the whole host. Files are named by pid and first-flush time,
+so a restarted worker never overwrites the counts of the one it replaced,
+and forked children (Celery's prefork pool) start from zero under their own
+name. Counters and histograms of exited workers keep being summed so totals
+never go backwards, but gauges are only taken from workers still running;
+clear the directory on deploy.
+
+Without ``METRICS_DIR`` (local development) only the answering process's
+own numbers are reported.
+
+The text exposition format is written by hand to avoid a dependency on
+``prometheus_client``; only counters, gauges and histograms are needed.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Cache key families reported separately in the hit ratio metrics.
+CACHE_FAMILIES = (
+    ("walkquest:api:", "api"),
+    ("walk_geometry_", "walk_geometry"),
+    ("walks_home_", "walks_home"),
+)
+
+METRICS = {
+    "walkquest_http_requests_total": ("counter", "HTTP requests by route and status"),
+    "walkquest_http_request_duration_seconds": ("histogram", "HTTP request latency by route"),
+    "walkquest_cache_requests_total": ("counter", "Cache lookups by key family and result"),
+    "walkquest_celery_tasks_total": ("counter", "Celery tasks run, by task and state"),
+    "walkquest_celery_task_duration_seconds": ("histogram", "Celery task run time"),
+    "walkquest_db_pool_connections": ("gauge", "Database pool connections by state"),
+    "walkquest_db_pool_requests_waiting": ("gauge", "Clients waiting for a pooled connection"),
+    "walkquest_db_pool_wait_seconds": ("gauge", "Total time clients have waited for a pooled connection"),
+    "walkquest_db_pool_connections_lost": ("gauge", "Pooled connections found broken and replaced"),
+    "walkquest_celery_queue_length": ("gauge", "Messages waiting in each Celery queue"),
+}
+
+
+def cache_family(key: str) -> str:
+    for prefix, family in CACHE_FAMILIES:
+        if key.startswith(prefix):
+            return family
+    return "other"
+
+
+class Registry:
+    """This process's metrics; thread-safe for gunicorn's threaded workers."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Start from zero; run in forked children, which must not report the parent's counts."""
+        self.lock = threading.Lock()
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, list] = {}
+        self.gauges: dict[tuple, float] = {}
+        self.last_flush = 0.0
+        # Named on first flush, so it is the pid of the process that writes it.
+        self.filename: str | None = None
+
+    def inc(self, name: str, labels: dict, amount: float = 1) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def set_gauge(self, name: str, labels: dict, value: float) -> None:
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "histograms": [
+                    [name, labels, list(buckets), total, count]
+                    for (name, labels), (buckets, total, count) in self.histograms.items()
+                ],
+                "gauges": [[name, labels, value] for (name, labels), value in self.gauges.items()],
+            }
+
+    def maybe_flush(self, force: bool = False) -> None:
+        directory = getattr(settings, "METRICS_DIR", None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_flush < FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+        _record_pool_usage(self)
+        if self.filename is None:
+            self.filename = f"{os.getpid()}-{int(time.time() * 1000)}.json"
+        path = Path(directory) / self.filename
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_bytes(orjson.dumps(self.snapshot()))
+            tmp.replace(path)
+        except OSError:
+            logger.exception("Could not write metrics to %s", path)
+
+
+registry = Registry()
+atexit.register(registry.maybe_flush, force=True)
+# config.celery_app imports this module in the prefork master.
+os.register_at_fork(after_in_child=lambda: registry.reset())
+
+
+def _record_pool_usage(target: Registry) -> None:
+    for alias in connections:
+        # connection.pool is only set when OPTIONS["pool"] is configured.
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        size = stats.get("pool_size", 0)
+        available = stats.get("pool_available", 0)
+        target.set_gauge("walkquest_db_pool_connections", {"alias": alias, "state": "idle"}, available)
+        target.set_gauge("walkquest_db_pool_connections", {"alias": alias, "state": "busy"}, size - available)
+        target.set_gauge("walkquest_db_pool_requests_waiting", {"alias": alias}, stats.get("requests_waiting", 0))
+        target.set_gauge("walkquest_db_pool_wait_seconds", {"alias": alias}, stats.get("requests_wait_ms", 0) / 1000)
+        target.set_gauge("walkquest_db_pool_connections_lost", {"alias": alias}, stats.get("connections_lost", 0))
+
+
+def record_cache_lookup(key: str, hits: int, misses: int) -> None:
+    family = cache_family(key)
+    if hits:
+        registry.inc("walkquest_cache_requests_total", {"family": family, "result": "hit"}, hits)
+    if misses:
+        registry.inc("walkquest_cache_requests_total", {"family": family, "result": "miss"}, misses)
+
+
+def _process_alive(filename: str) -> bool:
+    try:
+        os.kill(int(filename.partition("-")[0]), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _snapshots() -> list[dict]:
+    directory = getattr(settings, "METRICS_DIR", None)
+    if not directory:
+        _record_pool_usage(registry)
+        return [registry.snapshot()]
+    registry.maybe_flush(force=True)
+    snapshots = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            snapshot = orjson.loads(path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            # A file being replaced mid-read is picked up on the next scrape.
+            continue
+        if not _process_alive(path.stem):
+            # An exited worker's pool gauges describe connections that are gone.
+            snapshot["gauges"] = []
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def _queue_lengths() -> dict[str, int]:
+    broker = getattr(settings, "CELERY_BROKER_URL", "") or ""
+    if not broker.startswith(("redis://", "rediss://")):
+        return {}
+    import redis
+
+    queues = getattr(settings, "METRICS_CELERY_QUEUES", ["celery"])
+    try:
+        client = redis.Redis.from_url(broker, socket_timeout=1)
+        with client.pipeline(transaction=False) as pipe:
+            for queue in queues:
+                pipe.llen(queue)
+            return dict(zip(queues, pipe.execute(), strict=True))
+    except redis.RedisError:
+        logger.warning("Could not read Celery queue lengths", exc_info=True)
+        return {}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    counters: dict[tuple, float] = {}
+    histograms: dict[tuple, list] = {}
+    gauges: dict[tuple, float] = {}
+    for snapshot in _snapshots():
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total, count in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets, strict=True)]
+            merged[1] += total
+            merged[2] += count
+        for name, labels, value in snapshot["gauges"]:
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + value
+    for queue, length in _queue_lengths().items():
+        gauges[("walkquest_celery_queue_length", (("queue", queue),))] = length
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, value in zip(BUCKETS, buckets, strict=True):
+                    lines.append(f"{name}_bucket{_format_labels((*labels, ('le', bound)))} {value}")
+                lines.append(f"{name}_bucket{_format_labels((*labels, ('le', '+Inf')))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        else:
+            values = counters if kind == "counter" else gauges
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+_task_starts: dict[str, float] = {}
+
+
+def _task_prerun(task_id=None, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    start = _task_starts.pop(task_id, None)
+    name = getattr(task, "name", "unknown")
+    registry.inc("walkquest_celery_tasks_total", {"task": name, "state": state or "UNKNOWN"})
+    if start is not None:
+        registry.observe("walkquest_celery_task_duration_seconds", {"task": name}, time.perf_counter() - start)
+    registry.maybe_flush()
+
+
+def connect_celery_signals() -> None:
+    """Record task counts and durations; called from ``config.celery_app``."""
+    from celery.signals import task_postrun
+    from celery.signals import task_prerun
+
+    task_prerun.connect(_task_prerun, weak=False)
+    task_postrun.connect(_task_postrun, weak=False)
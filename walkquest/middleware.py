@@ -1,10 +1,46 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+import orjson
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
 from django.middleware.csrf import get_token
 
-class CSRFMiddleware:
+from walkquest import metrics as prometheus
+from walkquest import querylog
+from walkquest.instrumentation import collect_metrics
+
+request_logger = logging.getLogger("walkquest.requests")
+
+
+class AsyncCapableMiddleware:
+    """Base for middleware that runs natively under both WSGI and ASGI.
+
+    Subclasses implement ``__call__`` for WSGI and ``__acall__`` for ASGI;
+    unlike ``MiddlewareMixin`` hooks, neither costs a thread hop under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self._is_async = True
+        else:
+            self._is_async = False
+
 
+class CSRFMiddleware(AsyncCapableMiddleware):
     def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
         # Force CSRF cookie to be set by getting the token early
         get_token(request)
         
@@ -14,4 +50,117 @@ class CSRFMiddleware:
         # This helps with AJAX requests and frontend frameworks
         response['X-CSRFToken'] = get_token(request)
         
-        return response
\ No newline at end of file
+        return response
+
+    async def __acall__(self, request):
+        get_token(request)
+        response = await self.get_response(request)
+        response['X-CSRFToken'] = get_token(request)
+        return response
+
+class ServerTimingMiddleware(AsyncCapableMiddleware):
+    """Report SQL, cache and serialization time for a sample of requests.
+
+    Sampled responses get a ``Server-Timing`` header (shown in the browser's
+    network panel) and one structured ``walkquest.requests`` log line.
+    Repeated (N+1) and slow statements are also tallied in the query log;
+    see ``manage.py query_offenders``.
+
+    Database connections are per thread, so under ASGI the query wrappers
+    are installed from inside the thread-sensitive executor that runs the
+    request's ORM calls, not on the event loop thread.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, "SERVER_TIMING_SAMPLE_RATE", 1.0)
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1 or (
+            self.sample_rate > 0 and random.random() < self.sample_rate  # noqa: S311
+        )
+
+    @staticmethod
+    def _wrap_connections(metrics) -> ExitStack:
+        """Install the query wrapper on the calling thread's connections."""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(metrics.query_wrapper))
+        return stack
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with collect_metrics() as metrics, self._wrap_connections(metrics):
+            response = self.get_response(request)
+        return self._report(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        with collect_metrics() as metrics:
+            stack = await sync_to_async(self._wrap_connections)(metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return await sync_to_async(self._report)(request, response, metrics, time.perf_counter() - start)
+
+    def _report(self, request, response, metrics, total):
+        response["Server-Timing"] = metrics.server_timing(total)
+        match = getattr(request, "resolver_match", None)
+        querylog.record(match.route if match else None, metrics)
+        request_logger.info(
+            orjson.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "route": match.route if match else None,
+                    "status": response.status_code,
+                    "duration_ms": round(total * 1000, 2),
+                    **metrics.as_log_fields(),
+                },
+            ).decode(),
+        )
+        return response
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Count every request and time it, labelled by its URL pattern.
+
+    Labels use the matched route (``api/walks/<identifier>``) rather than the
+    path so the number of series stays bounded.
+    """
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self._record(request, response, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self._record(request, response, time.perf_counter() - start)
+
+    def _record(self, request, response, duration):
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "<unresolved>"
+        prometheus.registry.inc(
+            "walkquest_http_requests_total",
+            {"method": request.method, "route": route, "status": str(response.status_code)},
+        )
+        prometheus.registry.observe(
+            "walkquest_http_request_duration_seconds",
+            {"method": request.method, "route": route},
+            duration,
+        )
+        prometheus.registry.maybe_flush()
+        return response
@@ -0,0 +1,61 @@
+from django.contrib import admin
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
+from unfold.admin import ModelAdmin
+
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "path",
+        "mode",
+        "status_code",
+        "duration_ms",
+        "user",
+        "download_link",
+    )
+    list_filter = ("mode", "created_at")
+    search_fields = ("path", "route")
+    readonly_fields = [field.name for field in RequestProfile._meta.fields] + ["download_link"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="profiling_requestprofile_download",
+            ),
+            *super().get_urls(),
+        ]
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return self.admin_site.login(request)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        return FileResponse(
+            profile.data.open("rb"),
+            as_attachment=True,
+            filename=profile.data.name.rsplit("/", 1)[-1],
+        )
+
+    @admin.display(description=_("Download"))
+    def download_link(self, obj):
+        if not obj.data:
+            return "-"
+        label = _("flame graph") if obj.mode == RequestProfile.Mode.SAMPLE else _("pstats")
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse("admin:profiling_requestprofile_download", args=[obj.pk]),
+            label,
+        )
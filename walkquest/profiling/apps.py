@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ProfilingConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "walkquest.profiling"
+    verbose_name = "Profiling"
@@ -0,0 +1,102 @@
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from walkquest.middleware import AsyncCapableMiddleware
+
+from .models import RequestProfile
+from .profilers import CProfiler
+from .profilers import StackSampler
+
+logger = logging.getLogger(__name__)
+
+QUERY_PARAM = "_profile"
+HEADER = "X-Profile"
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """Profile a single request when a staff member asks for it.
+
+    Add ``?_profile=sample`` (or ``cprofile``) to any URL, or send the
+    ``X-Profile`` header, while signed in as staff. The profile is stored as a
+    :class:`RequestProfile` and can be downloaded from the admin; the response
+    carries its id in ``X-Profile-Id``. Must come after
+    ``AuthenticationMiddleware``.
+
+    Under ASGI both profilers only see the event loop thread, so a profile
+    covers async views alone. A sync view runs in a worker thread that
+    neither profiler watches, and its profile holds none of the view's own
+    work; profile sync views under WSGI instead. Other requests running on
+    the same event loop also appear in an async view's profile.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.interval = getattr(settings, "PROFILING_SAMPLE_INTERVAL_MS", 5) / 1000
+
+    def _requested_mode(self, request):
+        mode = request.GET.get(QUERY_PARAM) or request.headers.get(HEADER)
+        if mode and mode not in RequestProfile.Mode.values:
+            mode = RequestProfile.Mode.SAMPLE
+        return mode
+
+    def _profiler(self, mode):
+        if mode == RequestProfile.Mode.CPROFILE:
+            return CProfiler()
+        return StackSampler(self.interval)
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        mode = self._requested_mode(request)
+        if not mode or not getattr(request, "user", None) or not request.user.is_staff:
+            return self.get_response(request)
+
+        profiler = self._profiler(mode)
+        start = time.perf_counter()
+        with profiler:
+            response = self.get_response(request)
+        return self._store(request, response, mode, profiler, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        mode = self._requested_mode(request)
+        if not mode or not hasattr(request, "auser") or not (await request.auser()).is_staff:
+            return await self.get_response(request)
+
+        profiler = self._profiler(mode)
+        start = time.perf_counter()
+        with profiler:
+            response = await self.get_response(request)
+        return await sync_to_async(self._store)(
+            request, response, mode, profiler, time.perf_counter() - start,
+        )
+
+    def _store(self, request, response, mode, profiler, duration):
+        try:
+            profile = self._save(request, response, mode, profiler, duration)
+        except Exception:
+            # A failed profile must never cost the staff member their response.
+            logger.exception("Could not store profile for %s", request.path)
+            return response
+        response["X-Profile-Id"] = str(profile.pk)
+        return response
+
+    def _save(self, request, response, mode, profiler, duration):
+        match = getattr(request, "resolver_match", None)
+        profile = RequestProfile(
+            user=request.user,
+            mode=mode,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            route=(match.route if match else "")[:255],
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 2),
+            sample_count=profiler.sample_count,
+        )
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{mode}.{profiler.extension}"
+        profile.data.save(name, ContentFile(profiler.output()), save=False)
+        profile.save()
+        return profile
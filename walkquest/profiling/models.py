@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class RequestProfile(models.Model):
+    """A single request profiled on demand by a staff member."""
+
+    class Mode(models.TextChoices):
+        SAMPLE = "sample", _("Stack sampling (flame graph)")
+        CPROFILE = "cprofile", _("cProfile (pstats)")
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    mode = models.CharField(max_length=10, choices=Mode.choices)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    route = models.CharField(max_length=255, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    sample_count = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Stacks captured (sampling mode only)"),
+    )
+    data = models.FileField(
+        upload_to="profiles/%Y/%m/",
+        help_text=_("Folded stacks for flame graph tools, or a pstats dump"),
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = _("request profile")
+        verbose_name_plural = _("request profiles")
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.get_mode_display()})"
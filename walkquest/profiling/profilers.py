@@ -0,0 +1,88 @@
+"""
+Profilers used to wrap a single request.
+
+``StackSampler`` is a pyinstrument-style statistical profiler: a background
+thread records the profiled thread's stack every ``interval`` seconds and the
+result is written as "folded" stacks (``frame;frame;frame count`` per line),
+which flamegraph.pl, speedscope and Inferno all read directly. Sampling keeps
+the overhead low enough to profile real traffic.
+
+``CProfiler`` wraps :mod:`cProfile` for exact call counts at the cost of
+noticeably slowing the request down; its output is a pstats dump for
+snakeviz or ``python -m pstats``.
+"""
+
+import cProfile
+import io
+import marshal
+import sys
+import threading
+from collections import Counter
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{code.co_qualname}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    extension = "folded"
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.stacks.values())
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="walkquest-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)  # noqa: SLF001
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def output(self) -> bytes:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()).encode()
+
+
+class CProfiler:
+    extension = "prof"
+    sample_count = 0
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def output(self) -> bytes:
+        # Same format as Profile.dump_stats(), without a temporary file.
+        self.profile.create_stats()
+        buffer = io.BytesIO()
+        marshal.dump(self.profile.stats, buffer)
+        return buffer.getvalue()
@@ -0,0 +1,51 @@
+import tempfile
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import TestCase
+from django.test import override_settings
+
+from walkquest.users.tests.factories import UserFactory
+
+from .middleware import ProfilingMiddleware
+from .models import RequestProfile
+
+
+def busy_view(request):
+    sum(i * i for i in range(200_000))
+    return HttpResponse("ok")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PROFILING_SAMPLE_INTERVAL_MS=1)
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.middleware = ProfilingMiddleware(busy_view)
+        self.factory = RequestFactory()
+
+    def _request(self, user, **params):
+        request = self.factory.get("/", params)
+        request.user = user
+        return request
+
+    def test_ignored_for_non_staff(self):
+        for user in (AnonymousUser(), UserFactory(is_staff=False)):
+            response = self.middleware(self._request(user, _profile="sample"))
+            assert "X-Profile-Id" not in response
+        assert not RequestProfile.objects.exists()
+
+    def test_sampling_profile_is_stored(self):
+        response = self.middleware(self._request(UserFactory(is_staff=True), _profile="sample"))
+
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        assert profile.mode == RequestProfile.Mode.SAMPLE
+        assert profile.data.name.endswith(".folded")
+        with profile.data.open("rb") as handle:
+            assert b"busy_view" in handle.read()
+
+    def test_cprofile_profile_is_stored(self):
+        response = self.middleware(self._request(UserFactory(is_staff=True), _profile="cprofile"))
+
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        assert profile.data.name.endswith(".prof")
+        assert profile.status_code == 200
@@ -0,0 +1,159 @@
+"""
+Rolling store of N+1 and slow-query reports.
+
+Sampled requests that issued repeated or slow statements are tallied into
+per-minute Redis hashes keyed by ``route|fingerprint``, with the normalised
+SQL and its origin kept alongside. Buckets expire after
+``RETENTION_MINUTES``, so the store never grows beyond a couple of hours of
+data. Without Redis (local development) an in-process store is used; it only
+sees the requests handled by that process.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from collections import defaultdict
+
+import orjson
+
+from walkquest.cache import redis_connection
+
+logger = logging.getLogger("walkquest.queries")
+
+KEY_PREFIX = "walkquest:querylog"
+RETENTION_MINUTES = 120
+KINDS = ("n_plus_one", "slow")
+
+_local_lock = threading.Lock()
+# minute -> kind -> Counter of "route|fingerprint"; plus fingerprint details.
+_local_buckets: dict[int, dict[str, Counter]] = {}
+_local_time: dict[int, Counter] = {}
+_local_details: dict[str, dict] = {}
+
+
+def _minute(timestamp: float | None = None) -> int:
+    return int((timestamp or time.time()) // 60)
+
+
+def _bucket_key(minute: int, kind: str) -> str:
+    return f"{KEY_PREFIX}:{minute}:{kind}"
+
+
+def record(route: str | None, metrics) -> None:
+    """Tally a request's repeated and slow statements, if it had any."""
+    repeated = metrics.repeated_queries()
+    if not repeated and not metrics.slow_queries:
+        return
+    route = route or "<unresolved>"
+
+    entries = []  # (kind, fingerprint, statement count, ms, details)
+    for key, stats in repeated.items():
+        logger.warning(
+            "Possible N+1 on %s: %d x %s (from %s)",
+            route,
+            stats.count,
+            stats.sql[:200],
+            stats.origin,
+        )
+        entries.append(
+            ("n_plus_one", key, stats.count, stats.time * 1000, {"sql": stats.sql, "origin": stats.origin}),
+        )
+    for slow in metrics.slow_queries:
+        logger.warning(
+            "Slow query on %s: %.1f ms %s (from %s)",
+            route,
+            slow["duration_ms"],
+            slow["sql"][:200],
+            slow["origin"],
+        )
+        entries.append(
+            ("slow", slow["fingerprint"], 1, slow["duration_ms"], {"sql": slow["sql"], "origin": slow["origin"]}),
+        )
+
+    minute = _minute()
+    redis = redis_connection()
+    if redis is None:
+        _record_local(minute, route, entries)
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for kind, key, count, duration_ms, details in entries:
+            field = f"{route}|{key}"
+            bucket = _bucket_key(minute, kind)
+            pipe.hincrby(bucket, field, count)
+            pipe.hincrbyfloat(f"{bucket}:ms", field, duration_ms)
+            pipe.expire(bucket, RETENTION_MINUTES * 60)
+            pipe.expire(f"{bucket}:ms", RETENTION_MINUTES * 60)
+            pipe.hset(f"{KEY_PREFIX}:details", key, orjson.dumps(details))
+        pipe.expire(f"{KEY_PREFIX}:details", RETENTION_MINUTES * 60)
+        pipe.execute()
+    except Exception:
+        # Reporting must never break the request it is reporting on.
+        logger.exception("Could not record query report")
+
+
+def _record_local(minute: int, route: str, entries) -> None:
+    with _local_lock:
+        oldest = minute - RETENTION_MINUTES
+        for stale in [bucket for bucket in _local_buckets if bucket < oldest]:
+            del _local_buckets[stale]
+            del _local_time[stale]
+        buckets = _local_buckets.setdefault(minute, {kind: Counter() for kind in KINDS})
+        times = _local_time.setdefault(minute, Counter())
+        for kind, key, count, duration_ms, details in entries:
+            buckets[kind][f"{route}|{key}"] += count
+            times[f"{kind}|{route}|{key}"] += duration_ms
+            _local_details[key] = details
+
+
+def top_offenders(minutes: int = 60, limit: int = 20) -> dict[str, list[dict]]:
+    """Aggregate the last ``minutes`` of reports, worst first, per kind."""
+    now = _minute()
+    window = range(now - minutes + 1, now + 1)
+    counts = {kind: Counter() for kind in KINDS}
+    times = {kind: Counter() for kind in KINDS}
+    details: dict[str, dict] = {}
+
+    redis = redis_connection()
+    if redis is None:
+        with _local_lock:
+            for minute in window:
+                for kind in KINDS:
+                    counts[kind].update(_local_buckets.get(minute, {}).get(kind, {}))
+                for field, value in _local_time.get(minute, {}).items():
+                    kind, _, rest = field.partition("|")
+                    times[kind][rest] += value
+            details = dict(_local_details)
+    else:
+        pipe = redis.pipeline(transaction=False)
+        for minute in window:
+            for kind in KINDS:
+                pipe.hgetall(_bucket_key(minute, kind))
+                pipe.hgetall(f"{_bucket_key(minute, kind)}:ms")
+        results = iter(pipe.execute())
+        for _ in window:
+            for kind in KINDS:
+                for field, value in next(results).items():
+                    counts[kind][field.decode()] += int(value)
+                for field, value in next(results).items():
+                    times[kind][field.decode()] += float(value)
+        details = {
+            key.decode(): orjson.loads(value)
+            for key, value in redis.hgetall(f"{KEY_PREFIX}:details").items()
+        }
+
+    report = defaultdict(list)
+    for kind in KINDS:
+        for field, count in counts[kind].most_common(limit):
+            route, _, key = field.partition("|")
+            report[kind].append(
+                {
+                    "route": route,
+                    "fingerprint": key,
+                    "statements": count,
+                    "total_ms": round(times[kind][field], 1),
+                    **details.get(key, {}),
+                },
+            )
+    return {kind: report[kind] for kind in KINDS}
@@ -5,6 +5,7 @@ import { useSnackbar } from '../composables/useSnackbar';
 // Environment configuration
 const IS_PRODUCTION = process.env.NODE_ENV === 'production';
 const AUTH_POLL_INTERVAL = 30000; // 30s default polling interval
+const AUTH_STREAM_FALLBACK_INTERVAL = 300000; // 5 min when the event stream is open
 const SESSION_IDLE_TIMEOUT = 30 * 60 * 1000; // 30 min idle timeout
 
 export const useAuthStore = defineStore('auth', {
@@ -15,6 +16,7 @@ export const useAuthStore = defineStore('auth', {
     error: null,
     redirectPath: null,
     pollingInterval: null,
+    eventSource: null,
     lastEventId: null,
     loginError: null,
     signupError: null,
@@ -477,6 +479,17 @@ export const useAuthStore = defineStore('auth', {
     startPolling() {
       if (this.pollingInterval) return;
       
+      // With the event stream the server announces auth changes, so polling
+      // only needs to catch what the stream might have missed.
+      const streamUrl = window.djangoAllAuth?.authEventsStreamUrl;
+      if (streamUrl && window.EventSource && !this.eventSource) {
+        this.eventSource = new EventSource(streamUrl, { withCredentials: true });
+        this.eventSource.addEventListener('auth', () => this.checkAuth());
+        this.pollingInterval = setInterval(() => this.checkAuth(), AUTH_STREAM_FALLBACK_INTERVAL);
+        document.addEventListener('visibilitychange', this.handleVisibilityChange);
+        return;
+      }
+      
       let pollCount = 0;
       const maxPollInterval = 300000; // 5 minutes max
       let currentInterval = AUTH_POLL_INTERVAL;
@@ -508,6 +521,10 @@ export const useAuthStore = defineStore('auth', {
         clearInterval(this.pollingInterval);
         this.pollingInterval = null;
       }
+      if (this.eventSource) {
+        this.eventSource.close();
+        this.eventSource = null;
+      }
       document.removeEventListener('visibilitychange', this.handleVisibilityChange);
     },
     
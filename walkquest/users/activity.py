@@ -0,0 +1,86 @@
+"""
+Throttled ``User.last_active`` tracking.
+
+``record_activity`` notes a user as active at most once per
+``LAST_ACTIVE_INTERVAL`` seconds. With Redis the timestamps are collected in
+a hash that ``flush_last_active`` (a Celery beat task) writes back in one
+batched UPDATE. Without Redis there is no store shared with the worker (the
+local-memory cache is per process), so each timestamp is handed to the
+``record_last_active`` task once the request commits. Either way requests
+never write the user row themselves.
+"""
+
+import threading
+import time
+from datetime import UTC
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from walkquest.cache import redis_connection
+
+from .models import User
+
+PENDING_KEY = "walkquest:last_active:pending"
+FLUSH_BATCH_SIZE = 500
+
+# Per-process memo so most requests skip even the cache round trip.
+_next_allowed: dict[int, float] = {}
+_lock = threading.Lock()
+
+
+def _interval() -> int:
+    return getattr(settings, "LAST_ACTIVE_INTERVAL", 300)
+
+
+def activity_due(user_id: int) -> bool:
+    """Cheap in-process check; ``False`` means this process recorded it recently."""
+    with _lock:
+        return _next_allowed.get(user_id, 0) <= time.time()
+
+
+def record_activity(user_id: int) -> None:
+    now = time.time()
+    with _lock:
+        if _next_allowed.get(user_id, 0) > now:
+            return
+        if len(_next_allowed) > 10_000:
+            _next_allowed.clear()
+        _next_allowed[user_id] = now + _interval()
+
+    # Other processes may have recorded the user within the interval.
+    if not cache.add(f"walkquest:last_active:throttle:{user_id}", 1, _interval()):
+        return
+    redis = redis_connection()
+    if redis is None:
+        from .tasks import record_last_active
+
+        timestamp = int(now)
+        transaction.on_commit(lambda: record_last_active.delay(user_id, timestamp))
+        return
+    redis.hset(PENDING_KEY, user_id, int(now))
+
+
+def write_last_active(user_id: int, timestamp: int) -> int:
+    """Store one timestamp unless a later one is already recorded."""
+    last_active = datetime.fromtimestamp(timestamp, tz=UTC)
+    return User.objects.filter(pk=user_id, last_active__lt=last_active).update(last_active=last_active)
+
+
+def flush_last_active() -> int:
+    """Write timestamps collected in Redis to the database; returns the users updated."""
+    redis = redis_connection()
+    if redis is None:
+        return 0
+    pipe = redis.pipeline(transaction=True)
+    pipe.hgetall(PENDING_KEY)
+    pipe.delete(PENDING_KEY)
+    pending, _ = pipe.execute()
+    users = [
+        User(pk=int(user_id), last_active=datetime.fromtimestamp(int(timestamp), tz=UTC))
+        for user_id, timestamp in pending.items()
+    ]
+    User.objects.bulk_update(users, ["last_active"], batch_size=FLUSH_BATCH_SIZE)
+    return len(users)
@@ -0,0 +1,182 @@
+"""
+Per-request user context for API views.
+
+``get_user_context`` returns the signed-in user's id, names, email,
+preferences and favorites version without loading the ``User`` row on every
+request. The context is cached per user for ``CONTEXT_TTL`` seconds and
+rebuilt with a single query on a miss. It is validated against the session
+the same way ``django.contrib.auth.get_user`` does (backend and session auth
+hash), so a password change still signs other sessions out.
+
+Cached contexts are tagged with a per-user context version, which
+``invalidate_user_context`` bumps once the change commits. A context read
+under an older version is ignored, and the loader won't cache a row if the
+version moved while it was querying, so a request racing an update can't
+put the old row back in the cache.
+
+The favorites version is a counter bumped whenever the user's favorites
+change, for clients and caches that key favorite-dependent data on it.
+"""
+
+from dataclasses import dataclass
+from dataclasses import field
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth import HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import empty
+
+from .models import User
+
+CONTEXT_TTL = 60 * 5
+
+
+@dataclass(frozen=True)
+class UserContext:
+    id: int | None = None
+    username: str = ""
+    email: str = ""
+    name: str = ""
+    preferences: dict = field(default_factory=dict)
+    favorites_version: int = 0
+    session_auth_hash: str = field(default="", repr=False)
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.id is not None
+
+    def as_user_dict(self) -> dict:
+        """The user payload shared by ``/api/user`` and ``auth_events``."""
+        return {
+            "id": self.id,
+            "email": self.email,
+            "username": self.username,
+            "is_authenticated": self.is_authenticated,
+        }
+
+
+ANONYMOUS = UserContext()
+
+
+def context_key(user_id) -> str:
+    return f"walkquest:user_context:{user_id}"
+
+
+def favorites_version_key(user_id) -> str:
+    return f"walkquest:favorites_version:{user_id}"
+
+
+def context_version_key(user_id) -> str:
+    return f"walkquest:user_context_version:{user_id}"
+
+
+def _bump(key) -> None:
+    # incr is atomic in Redis; add() seeds the counter the first time.
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def invalidate_user_context(user_id) -> None:
+    """Expire the cached context once the current transaction commits."""
+    # Bumping before the commit would let a concurrent request cache the
+    # old row under the new version.
+    transaction.on_commit(lambda: _bump(context_version_key(user_id)))
+
+
+def favorites_version(user_id) -> int:
+    return cache.get(favorites_version_key(user_id), 0)
+
+
+def bump_favorites_version(user_id) -> None:
+    _bump(favorites_version_key(user_id))
+
+
+def _fields_from_user(user) -> dict:
+    return {
+        "id": user.pk,
+        "username": user.username,
+        "email": user.email,
+        "name": user.name,
+        "preferences": user.preferences or {},
+        "session_auth_hash": user.get_session_auth_hash(),
+    }
+
+
+def _load_fields(user_id) -> dict | None:
+    cached = cache.get_many(
+        [
+            context_key(user_id),
+            context_version_key(user_id),
+            favorites_version_key(user_id),
+        ],
+    )
+    context_version = cached.get(context_version_key(user_id), 0)
+    version = cached.get(favorites_version_key(user_id), 0)
+    entry = cached.get(context_key(user_id))
+    if entry is not None and entry["version"] == context_version:
+        return {**entry["fields"], "favorites_version": version}
+
+    user = (
+        User.objects.filter(pk=user_id, is_active=True)
+        .only("id", "username", "email", "name", "preferences", "password")
+        .first()
+    )
+    if user is None:
+        return None
+    fields = _fields_from_user(user)
+    if cache.get(context_version_key(user_id), 0) == context_version:
+        entry = {"version": context_version, "fields": fields}
+        cache.set(context_key(user_id), entry, CONTEXT_TTL)
+    return {**fields, "favorites_version": version}
+
+
+def _from_session(request) -> UserContext | None:
+    """Context for the session's user, or ``None`` to defer to ``request.user``."""
+    session = getattr(request, "session", None)
+    if session is None:
+        return ANONYMOUS
+    user_id = session.get(SESSION_KEY)
+    if user_id is None:
+        return ANONYMOUS
+    if session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    fields = _load_fields(user_id)
+    if fields is None:
+        return None
+    if not constant_time_compare(session.get(HASH_SESSION_KEY, ""), fields["session_auth_hash"]):
+        # Possibly signed with a fallback secret key; let Django decide.
+        return None
+    return UserContext(**fields)
+
+
+def get_user_context(request) -> UserContext:
+    """The requesting user's context, memoised on the request."""
+    context = getattr(request, "_user_context", None)
+    if context is not None:
+        return context
+
+    # AuthenticationMiddleware sets a lazy request.user; token auth replaces
+    # it with a loaded user. Only go through the session while nothing has
+    # been loaded yet.
+    user = getattr(request, "user", None)
+    context = None
+    if user is None or getattr(user, "_wrapped", None) is empty:
+        context = _from_session(request)
+    if context is None:
+        # request.user is already loaded (token auth) or the session needs
+        # Django's full checks; build the context from it.
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            context = ANONYMOUS
+        else:
+            version = favorites_version(user.pk)
+            context = UserContext(**_fields_from_user(user), favorites_version=version)
+    request._user_context = context
+    return context
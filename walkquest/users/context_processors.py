@@ -5,4 +5,5 @@ def allauth_settings(request):
     """Expose some settings from django-allauth in templates."""
     return {
         "ACCOUNT_ALLOW_REGISTRATION": settings.ACCOUNT_ALLOW_REGISTRATION,
+        "AUTH_EVENTS_STREAM": settings.AUTH_EVENTS_STREAM,
     }
@@ -0,0 +1,107 @@
+"""
+Per-user queue of auth events for the Vue app.
+
+Events raised by the allauth signal handlers are appended to a short Redis
+list per user and announced on a pub/sub channel. ``auth_events`` drains the
+list when the app polls; ``auth_event_stream`` forwards the announcements as
+Server-Sent Events, prompting the app to poll only when something happened.
+Neither touches the session, so idle tabs no longer cause session writes.
+
+Without Redis (local development with the memory cache) events fall back to
+the session as before.
+"""
+
+import asyncio
+
+import orjson
+
+from walkquest.cache import async_redis_connection
+from walkquest.cache import redis_connection
+
+SESSION_KEY = "auth_events"
+# Undelivered events expire; a tab that has been closed for an hour does not
+# need to hear about a login on another device.
+EVENT_TTL = 60 * 60
+MAX_EVENTS = 20
+STREAM_SECONDS = 300
+HEARTBEAT_SECONDS = 15
+
+
+def queue_key(user_id) -> str:
+    return f"walkquest:auth_events:{user_id}"
+
+
+def channel(user_id) -> str:
+    return f"walkquest:auth_events:live:{user_id}"
+
+
+def push_event(request, user, event: dict, *, queue: bool = True) -> None:
+    """Record ``event`` for ``user``'s open tabs.
+
+    ``queue=False`` only announces it: used for logout, after which the tab
+    is anonymous and could never drain the user's queue.
+    """
+    redis = redis_connection()
+    if redis is None or user is None or user.pk is None:
+        if queue:
+            events = request.session.get(SESSION_KEY) or []
+            events.append(event)
+            request.session[SESSION_KEY] = events[-MAX_EVENTS:]
+        return
+
+    payload = orjson.dumps(event)
+    pipe = redis.pipeline(transaction=False)
+    if queue:
+        pipe.rpush(queue_key(user.pk), payload)
+        pipe.ltrim(queue_key(user.pk), -MAX_EVENTS, -1)
+        pipe.expire(queue_key(user.pk), EVENT_TTL)
+    pipe.publish(channel(user.pk), payload)
+    pipe.execute()
+
+
+def pop_events(request, user_id=None) -> list[dict]:
+    """Drain pending events; the session is only written if it held some.
+
+    Pass ``user_id`` when it is already known to avoid loading ``request.user``.
+    """
+    if user_id is None and request.user.is_authenticated:
+        user_id = request.user.pk
+    events = []
+    if request.session.get(SESSION_KEY):
+        events.extend(request.session.pop(SESSION_KEY))
+
+    redis = redis_connection()
+    if redis is not None and user_id is not None:
+        pipe = redis.pipeline(transaction=True)
+        pipe.lrange(queue_key(user_id), 0, -1)
+        pipe.delete(queue_key(user_id))
+        raw, _ = pipe.execute()
+        events.extend(orjson.loads(item) for item in raw)
+    return events
+
+
+async def stream_events(user_id):
+    """Server-Sent Events for ``user_id``'s channel, with keep-alives.
+
+    Ends after ``STREAM_SECONDS``; ``EventSource`` reconnects on its own, which
+    also spreads long-lived connections across workers after a deploy.
+    """
+    client = async_redis_connection()
+    pubsub = client.pubsub()
+    await pubsub.subscribe(channel(user_id))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_SECONDS
+    try:
+        yield "retry: 5000\n\n"
+        while loop.time() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=HEARTBEAT_SECONDS,
+            )
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: auth\ndata: {message['data'].decode()}\n\n"
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
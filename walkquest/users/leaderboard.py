@@ -0,0 +1,173 @@
+"""
+XP leaderboard.
+
+The database is the source of truth for ``User.experience_points``; a Redis
+sorted set mirrors it so top-N and rank lookups are O(log n) rather than a
+scan of the users table. After each XP change commits, the user's new total
+(as returned by the UPDATE) is written with ZADD, which is idempotent and
+cannot drift from the clamped database value. ``reconcile`` (a Celery beat
+task) rebuilds the set from the database to repair any drift, e.g. from
+changes made in the admin; users whose XP changed while it was rebuilding
+are re-read once the rebuilt set is swapped in, so their updates survive.
+
+Without Redis, or while it is failing, the same queries run against the
+``experience_points`` index; a write that fails is left for ``reconcile``.
+"""
+
+import logging
+
+from redis import RedisError
+
+from walkquest.cache import redis_connection
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_KEY = "walkquest:leaderboard:xp"
+# Users whose XP changed since the current (or last) reconcile started.
+TOUCHED_KEY = "walkquest:leaderboard:touched"
+TOUCHED_TTL = 60 * 60
+RECONCILE_BATCH_SIZE = 5000
+
+
+def _set_scores(pipe, scores) -> None:
+    for user_id, xp in scores:
+        if xp > 0:
+            pipe.zadd(LEADERBOARD_KEY, {user_id: xp})
+        else:
+            pipe.zrem(LEADERBOARD_KEY, user_id)
+
+
+def record_xp(user_id: int, experience_points: int) -> None:
+    """Store a user's XP total that has already been committed to the database."""
+    redis = redis_connection()
+    if redis is None:
+        return
+    pipe = redis.pipeline(transaction=False)
+    _set_scores(pipe, [(user_id, experience_points)])
+    pipe.sadd(TOUCHED_KEY, user_id)
+    pipe.expire(TOUCHED_KEY, TOUCHED_TTL)
+    try:
+        pipe.execute()
+    except RedisError:
+        # reconcile() rebuilds the set from the database, so this only lags.
+        logger.warning(
+            "Could not record XP for user %s on the leaderboard",
+            user_id,
+            exc_info=True,
+        )
+
+
+def _with_names(scores: list[tuple[int, int]], first_rank: int = 1) -> list[dict]:
+    names = {
+        row["id"]: row
+        for row in User.objects.filter(pk__in=[user_id for user_id, _ in scores]).values(
+            "id",
+            "username",
+            "name",
+        )
+    }
+    return [
+        {
+            "rank": first_rank + index,
+            "user_id": user_id,
+            "username": names[user_id]["username"],
+            "name": names[user_id]["name"],
+            "experience_points": score,
+        }
+        for index, (user_id, score) in enumerate(scores)
+        if user_id in names
+    ]
+
+
+def _top_from_database(limit: int) -> list[tuple[int, int]]:
+    return list(
+        User.objects.filter(experience_points__gt=0)
+        .order_by("-experience_points", "id")
+        .values_list("id", "experience_points")[:limit],
+    )
+
+
+def top(limit: int = 10) -> list[dict]:
+    redis = redis_connection()
+    if redis is None:
+        return _with_names(_top_from_database(limit))
+    try:
+        members = redis.zrevrange(LEADERBOARD_KEY, 0, limit - 1, withscores=True)
+    except RedisError:
+        logger.warning("Reading the XP leaderboard from the database", exc_info=True)
+        return _with_names(_top_from_database(limit))
+    return _with_names([(int(member), int(score)) for member, score in members])
+
+
+def _rank_from_database(user_id: int) -> dict | None:
+    xp = User.objects.filter(pk=user_id).values_list("experience_points", flat=True).first()
+    if not xp:
+        return None
+    ahead = User.objects.filter(experience_points__gt=xp).count()
+    return {"rank": ahead + 1, "experience_points": xp}
+
+
+def rank(user_id: int) -> dict | None:
+    """The user's 1-based rank and XP, or ``None`` if they have no XP yet."""
+    redis = redis_connection()
+    if redis is None:
+        return _rank_from_database(user_id)
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.zrevrank(LEADERBOARD_KEY, user_id)
+    pipe.zscore(LEADERBOARD_KEY, user_id)
+    try:
+        position, score = pipe.execute()
+    except RedisError:
+        logger.warning("Reading the XP leaderboard from the database", exc_info=True)
+        return _rank_from_database(user_id)
+    if position is None:
+        return None
+    return {"rank": position + 1, "experience_points": int(score)}
+
+
+def reconcile() -> int:
+    """Rebuild the sorted set from the database; returns the users ranked."""
+    redis = redis_connection()
+    if redis is None:
+        return 0
+    staging = f"{LEADERBOARD_KEY}:rebuild"
+    # Cleared before the snapshot is read: anyone recorded from here on may
+    # be missing from (or stale in) the rebuilt set.
+    redis.delete(staging, TOUCHED_KEY)
+    count = 0
+    batch = {}
+    rows = User.objects.filter(experience_points__gt=0).values_list("id", "experience_points")
+    for user_id, xp in rows.iterator(chunk_size=RECONCILE_BATCH_SIZE):
+        batch[user_id] = xp
+        if len(batch) >= RECONCILE_BATCH_SIZE:
+            redis.zadd(staging, batch)
+            count += len(batch)
+            batch = {}
+    if batch:
+        redis.zadd(staging, batch)
+        count += len(batch)
+    if count:
+        # RENAME swaps the rebuilt set in atomically; readers never see it half built.
+        redis.rename(staging, LEADERBOARD_KEY)
+    else:
+        redis.delete(LEADERBOARD_KEY)
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.smembers(TOUCHED_KEY)
+    pipe.delete(TOUCHED_KEY)
+    touched, _ = pipe.execute()
+    if touched:
+        pipe = redis.pipeline(transaction=False)
+        _set_scores(
+            pipe,
+            User.objects.filter(pk__in=[int(user_id) for user_id in touched]).values_list(
+                "id",
+                "experience_points",
+            ),
+        )
+        pipe.execute()
+    logger.info("Reconciled XP leaderboard with %d users", count)
+    return count
@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import SESSION_KEY
+
+from walkquest.middleware import AsyncCapableMiddleware
+
+from .activity import activity_due
+from .activity import record_activity
+
+
+class LastActiveMiddleware(AsyncCapableMiddleware):
+    """Record signed-in users as active, throttled by ``LAST_ACTIVE_INTERVAL``.
+
+    Reads the user id from the session rather than ``request.user`` so it
+    never loads the user row itself.
+    """
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user_id = request.session.get(SESSION_KEY) if hasattr(request, "session") else None
+        if user_id is not None:
+            record_activity(int(user_id))
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user_id = await request.session.aget(SESSION_KEY) if hasattr(request, "session") else None
+        if user_id is not None and activity_due(int(user_id)):
+            await sync_to_async(record_activity)(int(user_id))
+        return response
@@ -0,0 +1,17 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_preferences'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='last_active',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Last Active'),
+        ),
+    ]
@@ -6,6 +6,7 @@ from django.db.models import DateTimeField
 from django.db.models import JSONField
 from django.db.models import PositiveIntegerField
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -24,7 +25,8 @@ class User(AbstractUser):
         _("Experience Points"), default=0, db_index=True,
     )
     quests_completed = PositiveIntegerField(_("Completed Quests"), default=0)
-    last_active = DateTimeField(_("Last Active"), auto_now=True)
+    # Updated in batches by walkquest.users.activity, not on every save.
+    last_active = DateTimeField(_("Last Active"), default=timezone.now)
     preferences = JSONField(
         default=dict,
         encoder=DjangoJSONEncoder,
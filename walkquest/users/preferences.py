@@ -0,0 +1,51 @@
+"""
+Stored user preferences.
+
+Reads go through the cached user context (``walkquest.users.context``), so
+serving preferences on SPA boot normally costs no query. Updates merge the
+changed keys into ``User.preferences`` with Postgres' ``jsonb ||`` in a
+single UPDATE ... RETURNING and then expire the cached context once the
+update commits, so concurrent updates to different keys never overwrite
+each other.
+"""
+
+from django.db import connection
+
+from .context import invalidate_user_context
+from .models import User
+
+DEFAULT_PREFERENCES = {
+    "theme": "system",
+    "language": "en",
+    "notifications": True,
+    "mapStyle": "streets",
+    "units": "metric",
+    "dark_mode": False,
+    "map_style": "streets-v11",
+}
+
+
+def with_defaults(preferences: dict) -> dict:
+    return {**DEFAULT_PREFERENCES, **(preferences or {})}
+
+
+def update_preferences(user_id: int, changes: dict) -> dict:
+    """Merge ``changes`` into the stored preferences and return the result."""
+    field = User._meta.get_field("preferences")
+    if not changes:
+        stored = User.objects.filter(pk=user_id).values_list("preferences", flat=True).first()
+        return with_defaults(stored)
+
+    table = connection.ops.quote_name(User._meta.db_table)
+    column = connection.ops.quote_name(field.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {column} = COALESCE({column}, '{{}}'::jsonb) || %s::jsonb "  # noqa: S608
+            f"WHERE id = %s RETURNING {column}",
+            [field.get_prep_value(changes), user_id],
+        )
+        row = cursor.fetchone()
+    invalidate_user_context(user_id)
+    if row is None:
+        return with_defaults({})
+    return with_defaults(field.from_db_value(row[0], None, connection))
@@ -0,0 +1,56 @@
+"""
+Session engine: ``cached_db`` that skips saves which would change nothing.
+
+Reads come from the cache; a save writes through to both the cache and the
+database. Many hot paths mark the session modified while writing back the
+value it already had, so ``save`` compares the serialized payload with what
+was loaded and does nothing when they match. Unchanged sessions are still
+saved once every ``REFRESH_INTERVAL`` so their expiry keeps moving for
+active users.
+
+Enable with ``SESSION_ENGINE = "walkquest.users.sessions"``.
+"""
+
+import hashlib
+import time
+
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+from .events import MAX_EVENTS
+from .events import SESSION_KEY as AUTH_EVENTS_KEY
+
+SAVED_AT_KEY = "_walkquest_saved_at"
+REFRESH_INTERVAL = 60 * 60 * 24
+
+
+class SessionStore(CachedDBStore):
+    _loaded_digest = None
+
+    def _digest(self, data: dict) -> bytes:
+        payload = {key: value for key, value in data.items() if key != SAVED_AT_KEY}
+        return hashlib.blake2b(self.serializer().dumps(payload), digest_size=16).digest()
+
+    def load(self):
+        data = super().load()
+        self._loaded_digest = self._digest(data)
+        return data
+
+    def _is_unchanged(self) -> bool:
+        session = getattr(self, "_session_cache", None)
+        if self._loaded_digest is None or session is None:
+            return False
+        if time.time() - session.get(SAVED_AT_KEY, 0) > REFRESH_INTERVAL:
+            return False
+        return self._digest(session) == self._loaded_digest
+
+    def save(self, must_create=False):
+        if self.session_key is not None and not must_create and self._is_unchanged():
+            return
+        session = self._get_session(no_load=must_create)
+        # Events are normally drained from Redis; this bounds the fallback.
+        events = session.get(AUTH_EVENTS_KEY)
+        if events and len(events) > MAX_EVENTS:
+            session[AUTH_EVENTS_KEY] = events[-MAX_EVENTS:]
+        session[SAVED_AT_KEY] = int(time.time())
+        super().save(must_create=must_create)
+        self._loaded_digest = self._digest(session)
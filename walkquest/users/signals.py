@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib import messages
 from allauth.account.signals import (
@@ -13,16 +14,22 @@ from allauth.account.signals import (
     email_removed,
 )
 
+from .context import invalidate_user_context
+from .events import push_event
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def user_saved_handler(sender, instance, **kwargs):
+    """Drop the cached user context so the next request reloads it."""
+    invalidate_user_context(instance.pk)
+
 
 def push_auth_state_to_frontend(request, event_type, user=None, message=None, **kwargs):
-    """Adds auth state update to the session and shows a snackbar message."""
+    """Queues an auth event for the user's open tabs and shows a snackbar message."""
     if not request or not hasattr(request, "session"):
         return
 
-    # Store auth event in session
-    if not request.session.get("auth_events"):
-        request.session["auth_events"] = []
-    
     # Build event data
     event_data = {
         "event": event_type,
@@ -38,9 +45,8 @@ def push_auth_state_to_frontend(request, event_type, user=None, message=None, **
             "name": getattr(user, "name", ""),
         }
 
-    # Add the event to the session
-    request.session["auth_events"].append(event_data)
-    request.session.modified = True
+    # The session is anonymous after logout, so that event is only announced
+    push_event(request, user, event_data, queue=event_type != "logout")
 
     # Show snackbar message if provided
     if message:
@@ -1,5 +1,8 @@
 from celery import shared_task
 
+from .activity import flush_last_active as flush_pending_last_active
+from .activity import write_last_active
+from .leaderboard import reconcile
 from .models import User
 
 
@@ -7,3 +10,21 @@ from .models import User
 def get_users_count():
     """A pointless Celery task to demonstrate usage."""
     return User.objects.count()
+
+
+@shared_task()
+def flush_last_active():
+    """Write throttled last_active timestamps collected in Redis."""
+    return flush_pending_last_active()
+
+
+@shared_task()
+def record_last_active(user_id, timestamp):
+    """Write one user's last_active when there is no Redis to collect it in."""
+    return write_last_active(user_id, timestamp)
+
+
+@shared_task()
+def reconcile_leaderboard():
+    """Rebuild the Redis XP leaderboard from the users table."""
+    return reconcile()
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth import HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from walkquest.users import activity
+from walkquest.users import tasks
+from walkquest.users.context import bump_favorites_version
+from walkquest.users.context import get_user_context
+from walkquest.users.models import User
+from walkquest.users.sessions import SessionStore
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    activity._next_allowed.clear()
+
+
+def session_request(rf, user):
+    request = rf.get("/api/user")
+    request.session = SessionStore()
+    request.session[SESSION_KEY] = str(user.pk)
+    request.session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+    request.session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    request.user = SimpleLazyObject(lambda: pytest.fail("request.user was loaded"))
+    return request
+
+
+def test_context_is_cached_per_user(rf, user, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        context = get_user_context(session_request(rf, user))
+    assert context.id == user.pk
+    assert context.username == user.username
+
+    with django_assert_num_queries(0):
+        assert get_user_context(session_request(rf, user)) == context
+
+
+def test_saving_user_invalidates_context(rf, user, django_capture_on_commit_callbacks):
+    get_user_context(session_request(rf, user))
+    user.name = "Renamed Walker"
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+
+    assert get_user_context(session_request(rf, user)).name == "Renamed Walker"
+
+
+def test_favorites_version_is_bumped(rf, user):
+    assert get_user_context(session_request(rf, user)).favorites_version == 0
+    bump_favorites_version(user.pk)
+    bump_favorites_version(user.pk)
+
+    assert get_user_context(session_request(rf, user)).favorites_version == 2
+
+
+def test_anonymous_request(rf):
+    request = rf.get("/api/user")
+    request.session = SessionStore()
+    request.user = AnonymousUser()
+
+    assert get_user_context(request).as_user_dict()["is_authenticated"] is False
+
+
+def test_record_activity_is_throttled(
+    user,
+    monkeypatch,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    earlier = user.date_joined - timedelta(days=1)
+    User.objects.filter(pk=user.pk).update(last_active=earlier)
+    monkeypatch.setattr(tasks.record_last_active, "delay", tasks.record_last_active)
+
+    # The queued write runs on commit, outside the request's query budget.
+    with django_capture_on_commit_callbacks(execute=True) as callbacks, django_assert_num_queries(0):
+        activity.record_activity(user.pk)
+        activity.record_activity(user.pk)
+
+    assert len(callbacks) == 1
+    user.refresh_from_db()
+    assert user.last_active > earlier
@@ -0,0 +1,44 @@
+import pytest
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.test import RequestFactory
+from django.urls import reverse
+
+from walkquest.users.events import pop_events
+from walkquest.users.events import push_event
+from walkquest.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def session_request(rf: RequestFactory, user: User):
+    request = rf.get("/")
+    SessionMiddleware(lambda r: None).process_request(request)
+    request.user = user
+    return request
+
+
+def test_events_are_drained_once(user: User, rf: RequestFactory):
+    request = session_request(rf, user)
+    push_event(request, user, {"event": "login"})
+
+    assert pop_events(request) == [{"event": "login"}]
+    assert request.session.modified
+    assert pop_events(request) == []
+
+
+def test_idle_poll_does_not_write_session(user: User, rf: RequestFactory):
+    request = session_request(rf, user)
+    request.session["email_verification_needed"] = True
+    request.session.save()
+    request.session.modified = False
+
+    assert pop_events(request) == []
+    assert not request.session.modified
+
+
+def test_stream_is_unavailable_without_async_redis(client, user: User):
+    client.force_login(user)
+
+    response = client.get(reverse("users:auth_event_stream"))
+
+    assert response.status_code == 204
@@ -0,0 +1,56 @@
+from unittest import mock
+
+import pytest
+from redis import RedisError
+
+from walkquest.adventures.scoring import award_xp
+from walkquest.users import leaderboard
+from walkquest.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_top_and_rank_without_redis():
+    low = UserFactory(experience_points=10)
+    high = UserFactory(experience_points=90)
+    UserFactory(experience_points=0)
+
+    assert [entry["user_id"] for entry in leaderboard.top(5)] == [high.pk, low.pk]
+    assert leaderboard.rank(low.pk) == {"rank": 2, "experience_points": 10}
+
+
+def test_redis_errors_fall_back_to_the_database():
+    low = UserFactory(experience_points=10)
+    high = UserFactory(experience_points=90)
+    redis = mock.Mock()
+    redis.zrevrange.side_effect = RedisError
+    redis.pipeline.return_value.execute.side_effect = RedisError
+
+    with mock.patch.object(leaderboard, "redis_connection", return_value=redis):
+        assert [entry["user_id"] for entry in leaderboard.top(5)] == [high.pk, low.pk]
+        assert leaderboard.rank(low.pk) == {"rank": 2, "experience_points": 10}
+        leaderboard.record_xp(low.pk, 20)
+
+
+def test_users_without_xp_are_unranked(user):
+    user.experience_points = 0
+    user.save()
+
+    assert leaderboard.rank(user.pk) is None
+
+
+def test_award_xp_clamps_at_zero(user):
+    user.experience_points = 10
+    user.save()
+
+    award_xp(user.pk, -25)
+
+    user.refresh_from_db()
+    assert user.experience_points == 0
+
+
+def test_leaderboard_requires_sign_in(client, user):
+    assert client.get("/api/leaderboard").status_code == 401
+
+    client.force_login(user)
+    assert client.get("/api/leaderboard").status_code == 200
@@ -0,0 +1,49 @@
+import pytest
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth import HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+
+from walkquest.users.context import get_user_context
+from walkquest.users.preferences import DEFAULT_PREFERENCES
+from walkquest.users.preferences import update_preferences
+from walkquest.users.sessions import SessionStore
+
+pytestmark = pytest.mark.django_db
+
+
+def test_update_merges_keys(user, django_assert_num_queries):
+    user.preferences = {"theme": "dark"}
+    user.save()
+
+    with django_assert_num_queries(1):
+        merged = update_preferences(user.pk, {"units": "imperial"})
+
+    assert merged["theme"] == "dark"
+    assert merged["units"] == "imperial"
+    assert merged["language"] == DEFAULT_PREFERENCES["language"]
+    user.refresh_from_db()
+    assert user.preferences == {"theme": "dark", "units": "imperial"}
+
+
+def context_preferences(rf, user):
+    request = rf.get("/api/preferences")
+    request.session = SessionStore()
+    request.session[SESSION_KEY] = str(user.pk)
+    request.session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+    request.session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    return get_user_context(request).preferences
+
+
+def test_update_invalidates_cached_context_on_commit(
+    rf,
+    user,
+    django_capture_on_commit_callbacks,
+):
+    assert "theme" not in context_preferences(rf, user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        update_preferences(user.pk, {"theme": "light"})
+        # Until the update commits, other requests keep the cached context.
+        assert "theme" not in context_preferences(rf, user)
+
+    assert context_preferences(rf, user)["theme"] == "light"
@@ -0,0 +1,34 @@
+import pytest
+from django.contrib.sessions.models import Session
+
+from walkquest.users.sessions import SessionStore
+
+pytestmark = pytest.mark.django_db
+
+
+def stored(session_key):
+    return Session.objects.get(session_key=session_key).session_data
+
+
+def test_unchanged_session_is_not_saved():
+    session = SessionStore()
+    session["email_verification_needed"] = False
+    session.save()
+    data = stored(session.session_key)
+
+    reloaded = SessionStore(session.session_key)
+    reloaded["email_verification_needed"] = False
+    reloaded.save()
+    assert stored(session.session_key) == data
+
+    reloaded["email_verification_needed"] = True
+    reloaded.save()
+    assert SessionStore(session.session_key)["email_verification_needed"] is True
+
+
+def test_auth_events_are_capped():
+    session = SessionStore()
+    session["auth_events"] = [{"event": "login"}] * 100
+    session.save()
+
+    assert len(SessionStore(session.session_key)["auth_events"]) == 20
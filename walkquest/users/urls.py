@@ -8,6 +8,7 @@ from walkquest.users.views import (
     CustomEmailVerificationSentView,
     CustomEmailVerificationView,
     auth_events,
+    auth_event_stream,
     login_page,
     signup_page,
 )
@@ -21,6 +22,7 @@ urlpatterns = [
     path("confirmation-email/", CustomEmailVerificationSentView.as_view(), name="account_email_verification_sent"),
     path("confirm-email/<str:key>/", CustomEmailVerificationView.as_view(), name="account_confirm_email"),
     path("api/auth-events/", auth_events, name="auth_events"),
+    path("api/auth-events/stream/", auth_event_stream, name="auth_event_stream"),
     path("api/login/", view=handle_login, name="api_login"),
     path("api/logout/", view=handle_logout, name="api_logout"),
     path("api/signup/", view=handle_signup, name="api_signup"),
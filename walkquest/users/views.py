@@ -8,12 +8,15 @@ from allauth.account.views import EmailVerificationSentView
 from allauth.account.views import ConfirmEmailView
 from allauth.account.views import LoginView
 from allauth.account.views import SignupView
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.db.models import QuerySet
+from django.http import HttpResponse
 from django.http import JsonResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
@@ -23,6 +26,12 @@ from django.views.generic import DetailView
 from django.views.generic import RedirectView
 from django.views.generic import UpdateView
 
+from walkquest.cache import async_redis_connection
+
+from .context import get_user_context
+from .events import pop_events
+from .events import stream_events
+
 User = get_user_model()
 
 
@@ -159,26 +168,27 @@ def auth_events(request):
     
     This helps keep the Vue app in sync with the server-side authentication state.
     """
-    events = request.session.get('auth_events', [])
+    # Built from the session and a cached per-user entry, so polling does
+    # not load the user row.
+    context = get_user_context(request)
+    # Only writes the session when it actually held events, so idle polling
+    # stays read-only.
+    events = pop_events(request, context.id)
     csrf_token = request.META.get('CSRF_COOKIE')
     session_token = request.session.get('allauth_session_token')
     
-    # Clear the events after reading them
-    request.session['auth_events'] = []
-    request.session.modified = True
-    
     # Format response according to allauth headless API structure
     response = {
         'meta': {
-            'is_authenticated': request.user.is_authenticated,
+            'is_authenticated': context.is_authenticated,
             'csrf_token': csrf_token
         },
         'data': {
             'user': {
-                'email': request.user.email,
-                'username': getattr(request.user, 'username', ''),
-                'name': getattr(request.user, 'name', ''),
-            } if request.user.is_authenticated else None
+                'email': context.email,
+                'username': context.username,
+                'name': context.name,
+            } if context.is_authenticated else None
         },
         'status': 200,
         'events': events
@@ -198,16 +208,16 @@ def auth_events(request):
     if request.session.get('email_verification_needed', False):
         email_verification_needed = True
     # Then, if the user is authenticated, check their email verification status
-    elif request.user.is_authenticated:
+    elif context.is_authenticated:
         try:
             # Check if the user has any verified email addresses
             from allauth.account.models import EmailAddress
-            email_verified = EmailAddress.objects.filter(user=request.user, verified=True).exists()
+            email_verified = EmailAddress.objects.filter(user_id=context.id, verified=True).exists()
             email_verification_needed = not email_verified
             
-            # Update the session flag based on our check
-            request.session['email_verification_needed'] = email_verification_needed
-            request.session.modified = True
+            # Update the session flag only when it changes
+            if request.session.get('email_verification_needed') != email_verification_needed:
+                request.session['email_verification_needed'] = email_verification_needed
         except Exception as e:
             print(f"Error checking email verification status: {str(e)}")
             import traceback
@@ -236,6 +246,25 @@ def auth_events(request):
     return JsonResponse(response)
 
 
+async def auth_event_stream(request):
+    """
+    Server-Sent Events announcing new auth events for the signed-in user.
+
+    The Vue app re-checks ``auth_events`` when one arrives instead of polling
+    on a timer. Responds 204 (which stops ``EventSource`` reconnecting) for
+    anonymous users or when the stream is unavailable, and the app keeps
+    polling instead.
+    """
+    user = await request.auser()
+    if not user.is_authenticated or not settings.AUTH_EVENTS_STREAM or async_redis_connection() is None:
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(stream_events(user.pk), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # Simple view to render the login page with CSRF token
 def login_page(request):
     """
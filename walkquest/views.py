@@ -10,6 +10,8 @@ import json
 from django.utils.html import escapejs
 from .walks.models import Walk
 from django.shortcuts import get_object_or_404
+from django.utils.crypto import constant_time_compare
+from .metrics import render as render_metrics
 
 WALK_NOT_FOUND_MESSAGE = "The requested walk could not be found"
 
@@ -82,4 +84,17 @@ def csrf_token_view(request):
 
 def email_confirmed_view(request):
     """Custom view for displaying email confirmation success"""
-    return render(request, "account/email_confirmed.html")
\ No newline at end of file
+    return render(request, "account/email_confirmed.html")
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; requires ``METRICS_TOKEN`` as a bearer token when set.
+
+    With ``METRICS_REQUIRE_TOKEN`` (production) and no token configured, the
+    endpoint is disabled.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token and getattr(settings, "METRICS_REQUIRE_TOKEN", False):
+        raise Http404
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
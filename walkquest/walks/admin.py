@@ -120,6 +120,7 @@ class WalkAdmin(GISModelAdmin, TagModelAdmin):
     list_filter = (
         ("steepness_level", ChoicesDropdownFilter),
         ("footwear_category", ChoicesDropdownFilter),
+        "is_loop",
     )
     
     # Make sure these fields exist in your model
@@ -4,18 +4,22 @@ from typing import Optional
 from uuid import UUID
 
 import orjson
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib.gis.geos import Polygon
 from django.core.cache import cache
-from django.db import transaction
+from django.db.models import BooleanField
 from django.db.models import Count
-from django.db.models import Exists
+from django.db.models import ExpressionWrapper
 from django.db.models import FloatField
-from django.db.models import OuterRef
+from django.db.models import Q
 from django.db.models import Value
 from django.db.models.expressions import RawSQL
+from django.http import Http404
 from django.http import HttpRequest
+from django.http import HttpResponse
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404
 from ninja import Path
 from ninja import Query
 from ninja import Router
@@ -24,15 +28,39 @@ from ninja.parser import Parser
 from ninja.renderers import BaseRenderer
 
 from walkquest.adventures.api import router as adventures_router
-
+from walkquest.cache import aget_json
+from walkquest.cache import aset_json
+from walkquest.instrumentation import timed_serialization
+from walkquest.users.context import favorites_version
+from walkquest.users.context import get_user_context
+
+from . import favorites
+from .bundles import MAX_BUILT_REGIONS
+from .bundles import BundleRegion
+from .bundles import built_region_count
+from .bundles import describe_bundle
+from .bundles import load_manifest
+from .bundles import mark_requested
+from .clustering import get_cluster_index
+from .elevation import decode_deltas
+from .geo import parse_bbox
+from .geo import validate_bbox
 from .models import Adventure
 from .models import Companion
 from .models import Walk
 from .models import WalkCategoryTag
+from .models import WalkElevationProfile
 from .models import WalkFeatureTag
+from .schemas import ClusterMarkerSchema
 from .schemas import ConfigSchema
+from .schemas import ElevationProfileSchema
+from .schemas import FavoritesBatchSchema
+from .schemas import FavoritesSchema
+from .schemas import OfflineBundleSchema
 from .schemas import TagResponseSchema
+from .schemas import WalkCardPageSchema
 from .schemas import WalkOutSchema
+from .tasks import build_offline_bundle
 
 
 # Define custom ORJSONParser
@@ -46,24 +74,48 @@ class ORJSONRenderer(BaseRenderer):
     media_type = "application/json"
 
     def render(self, request, data, *, response_status):
-        return orjson.dumps(data)
+        with timed_serialization():
+            return orjson.dumps(data)
 
 
 # Create a Router for walks API endpoints
 api = Router()
 
+WALK_SORTS = ("popular",)
+# sort=popular is always paged so it can stop early along its index.
+POPULAR_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
 METADATA_CACHE_TIMEOUT = 60 * 15
 
 
-def get_cached_metadata(key, factory):
-    """Return shared, short-lived metadata without caching request-specific data."""
-    value = cache.get(key)
+async def get_cached_metadata(key, factory):
+    """Return shared, short-lived metadata without caching request-specific data.
+
+    ``factory`` is synchronous and runs in a worker thread on a cache miss.
+    """
+    value = await aget_json(key)
     if value is None:
-        value = factory()
-        cache.set(key, value, METADATA_CACHE_TIMEOUT)
+        value = await sync_to_async(factory)()
+        await aset_json(key, value, METADATA_CACHE_TIMEOUT)
     return value
 
 
+async def favorite_annotation(request):
+    """``is_favorite`` for the requesting user, or ``False`` when anonymous.
+
+    Matches against the user's cached favorite ids instead of probing the
+    through table for every row.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return Value(False)
+    walk_ids = await sync_to_async(favorites.favorite_ids)(user.pk)
+    if not walk_ids:
+        return Value(False)
+    return ExpressionWrapper(Q(pk__in=walk_ids), output_field=BooleanField())
+
+
 @api.get("/", response=dict)
 def api_root(request):
     """API root endpoint that returns available endpoints"""
@@ -71,18 +123,31 @@ def api_root(request):
         "version": "1.0.0",
         "endpoints": {
             "walks": "/walks",
+            "walk_clusters": "/walks/clusters",
+            "walks_in_bbox": "/walks/in-bbox",
             "walk_detail": "/walks/{id}",
             "walk_geometry": "/walks/{id}/geometry",
+            "walk_profile": "/walks/{id}/profile",
             "walk_favorite": "/walks/{id}/favorite",
             "filters": "/filters",
             "tags": "/tags",
             "config": "/config",
+            "offline_bundles": "/offline-bundles",
         },
     }
 
 
-@api.get("/walks", response=List[WalkOutSchema])
-def list_walks(
+def filter_by_route_metrics(walks, circular=None, max_length_km=None):
+    """Filter on the precomputed route metrics (indexed is_loop/route_length)."""
+    if circular is not None:
+        walks = walks.filter(is_loop=circular)
+    if max_length_km is not None:
+        walks = walks.filter(route_length__lte=max_length_km * 1000)
+    return walks
+
+
+@api.get("/walks", response={200: List[WalkOutSchema], 400: dict})
+async def list_walks(
     request: HttpRequest,
     search: Optional[str] = None,
     categories: Optional[str] = None,
@@ -90,39 +155,48 @@ def list_walks(
     difficulty: Optional[str] = None,
     has_bus_access: Optional[bool] = None,  # renamed parameter
     has_stiles: Optional[bool] = None,
+    circular: Optional[bool] = None,
+    max_length_km: Optional[float] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = Query(None, description="Maximum number of walks to return"),
 ):
-    """List walks with optional filtering"""
+    """List walks with optional filtering; ``sort=popular`` ranks by popularity"""
+    if sort is not None and sort not in WALK_SORTS:
+        return 400, {"error": f"Unknown sort {sort!r}; expected one of: {', '.join(WALK_SORTS)}"}
     try:
         walks = Walk.objects.prefetch_related(
             "features", "categories", "related_categories"
-        ).annotate(
-            is_favorite=Exists(
-                Walk.favorites.through.objects.filter(
-                    walk_id=OuterRef("pk"), user=request.user
-                )
-            )
-            if request.user.is_authenticated
-            else Value(False)
-        )
+        ).annotate(is_favorite=await favorite_annotation(request))
         if search:
             walks = walks.filter(walk_name__icontains=search)
+        # Many-to-many filters are semi-joins, so a walk matching several
+        # tags still appears once without a DISTINCT over every row.
         if categories:
-            walks = walks.filter(categories__slug__in=categories.split(","))
+            walks = walks.filter(
+                pk__in=Walk.objects.filter(categories__slug__in=categories.split(",")).values("pk"),
+            )
         if features:
-            walks = walks.filter(features__slug__in=features.split(","))
+            walks = walks.filter(
+                pk__in=Walk.objects.filter(features__slug__in=features.split(",")).values("pk"),
+            )
         if difficulty:
             walks = walks.filter(steepness_level=difficulty)
         if has_stiles is not None:
             walks = walks.filter(has_stiles=has_stiles)
         if has_bus_access is not None:  # updated filtering
             walks = walks.filter(has_bus_access=has_bus_access)
+        walks = filter_by_route_metrics(walks, circular, max_length_km)
 
-        # A walk can match multiple many-to-many filters. Keep the response
-        # one-row-per-walk while retaining the existing unpaginated API.
-        walks = walks.distinct()
+        if sort == "popular":
+            # ORDER BY ... LIMIT walks walks_walk_popularity_idx and stops
+            # after one page instead of counting favorites per request.
+            walks = walks.order_by("-popularity_score", "id")
+            limit = limit or POPULAR_PAGE_SIZE
+        if limit:
+            walks = walks[: max(1, min(limit, MAX_PAGE_SIZE))]
 
         walk_list = []
-        for walk in walks:
+        async for walk in walks:
             # Format points_of_interest as a list by splitting on semicolons and stripping whitespace
             formatted_pubs = []
             # ...existing code for walk conversion...
@@ -137,6 +211,7 @@ def list_walks(
                     has_pub=walk.has_pub,
                     has_cafe=walk.has_cafe,
                     is_favorite=walk.is_favorite,
+                    favorites_count=walk.favorites_count,
                     features=[
                         {"name": f.name, "slug": f.slug} for f in walk.features.all()
                     ],
@@ -173,12 +248,14 @@ def list_walks(
 
 
 @api.get("/walks/nearby", response=List[WalkOutSchema])
-def find_nearby_walks(
+async def find_nearby_walks(
     request,
     latitude: float = Query(..., description="Latitude of the center point"),
     longitude: float = Query(..., description="Longitude of the center point"),
     radius: float = Query(5000, description="Search radius in meters"),
     limit: int = Query(50, description="Maximum number of results to return"),
+    circular: Optional[bool] = Query(None, description="Only circular (or linear) walks"),
+    max_length_km: Optional[float] = Query(None, description="Maximum route length in km"),
 ):
     """Find walks near a specific location using efficient spatial queries"""
     try:
@@ -210,14 +287,18 @@ def find_nearby_walks(
             )))
         """
 
-        walks = (
+        walks = filter_by_route_metrics(
             Walk.objects.filter(
                 latitude__gte=min_lat,
                 latitude__lte=max_lat,
                 longitude__gte=min_lng,
                 longitude__lte=max_lng,
-            )
-            .annotate(
+            ),
+            circular,
+            max_length_km,
+        )
+        walks = (
+            walks.annotate(
                 nearby_distance=RawSQL(  # noqa: S611 - SQL uses only bound coordinates
                     distance_sql,
                     (latitude, latitude, longitude),
@@ -227,20 +308,12 @@ def find_nearby_walks(
             .filter(nearby_distance__lte=radius)
             .order_by("nearby_distance")
             .prefetch_related("features", "categories", "related_categories")
-            .annotate(
-                is_favorite=Exists(
-                    Walk.favorites.through.objects.filter(
-                        walk_id=OuterRef("pk"), user=request.user
-                    )
-                )
-                if request.user.is_authenticated
-                else Value(False)
-            )
+            .annotate(is_favorite=await favorite_annotation(request))
         )
 
         # Calculate exact distances and prepare response
         results = []
-        for walk in walks:
+        async for walk in walks:
             try:
                 walk_out = WalkOutSchema(
                         id=walk.id,
@@ -252,6 +325,7 @@ def find_nearby_walks(
                         has_pub=walk.has_pub,
                         has_cafe=walk.has_cafe,
                         is_favorite=walk.is_favorite,
+                        favorites_count=walk.favorites_count,
                         features=[
                             {"name": f.name, "slug": f.slug}
                             for f in walk.features.all()
@@ -294,8 +368,74 @@ def find_nearby_walks(
         return []
 
 
+@api.get("/walks/clusters", response={200: List[ClusterMarkerSchema], 400: dict})
+def list_walk_clusters(
+    request: HttpRequest,
+    bbox: str = Query(..., description="minx,miny,maxx,maxy of the viewport"),
+    zoom: float = Query(..., description="Current map zoom level"),
+):
+    """Pre-clustered walk markers for the current map viewport.
+
+    The response grows with what is on screen rather than with the catalogue:
+    nearby walks are merged into clusters carrying a count and the zoom at
+    which they split apart.
+    """
+    try:
+        viewport = parse_bbox(bbox)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    zoom = max(0.0, min(zoom, 22.0))
+    return 200, get_cluster_index().query(viewport, zoom)
+
+
+WALK_CARD_FIELDS = (
+    "id",
+    "walk_id",
+    "walk_name",
+    "distance",
+    "latitude",
+    "longitude",
+    "steepness_level",
+    "has_pub",
+    "has_cafe",
+)
+
+
+@api.get("/walks/in-bbox", response={200: WalkCardPageSchema, 400: dict})
+async def list_walks_in_bbox(
+    request: HttpRequest,
+    minx: float = Query(..., description="Western longitude of the viewport"),
+    miny: float = Query(..., description="Southern latitude of the viewport"),
+    maxx: float = Query(..., description="Eastern longitude of the viewport"),
+    maxy: float = Query(..., description="Northern latitude of the viewport"),
+    limit: int = Query(100, description="Maximum number of rows to return"),
+    cursor: Optional[UUID] = Query(None, description="next_cursor from the previous page"),
+):
+    """Compact walk cards for every route crossing the map viewport.
+
+    Matches on the route geometry (through its GiST index) rather than the
+    start point, so a walk that passes through the view is included even when
+    it starts outside it. Pages are keyed on the walk id.
+    """
+    try:
+        viewport = validate_bbox(minx, miny, maxx, maxy)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    limit = max(1, min(limit, 500))
+
+    walks = Walk.objects.filter(
+        route_geometry__intersects=Polygon.from_bbox(viewport),
+    ).order_by("id")
+    if cursor:
+        walks = walks.filter(id__gt=cursor)
+
+    rows = [row async for row in walks.values(*WALK_CARD_FIELDS)[: limit + 1]]
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return 200, {"items": rows[:limit], "next_cursor": next_cursor}
+
+
 @api.get("/walks/{identifier}", response=WalkOutSchema)
-def get_walk(request: HttpRequest, identifier: str):
+async def get_walk(request: HttpRequest, identifier: str):
     """Get a single walk by ID or slug"""
     try:
         # Try UUID first
@@ -305,19 +445,11 @@ def get_walk(request: HttpRequest, identifier: str):
             lookup = {"walk_id": identifier}
 
         walk = (
-            Walk.objects.prefetch_related(
+            await Walk.objects.prefetch_related(
                 "features", "categories", "related_categories"
             )
-            .annotate(
-                is_favorite=Exists(
-                    Walk.favorites.through.objects.filter(
-                        walk_id=OuterRef("pk"), user=request.user
-                    )
-                )
-                if request.user.is_authenticated
-                else Value(False)
-            )
-            .get(**lookup)
+            .annotate(is_favorite=await favorite_annotation(request))
+            .aget(**lookup)
         )
 
         return WalkOutSchema(
@@ -330,6 +462,7 @@ def get_walk(request: HttpRequest, identifier: str):
             has_pub=walk.has_pub,
             has_cafe=walk.has_cafe,
             is_favorite=walk.is_favorite,
+            favorites_count=walk.favorites_count,
             features=[{"name": f.name, "slug": f.slug} for f in walk.features.all()],
             categories=[{"name": c.name, "slug": c.slug} for c in walk.categories.all()],
             related_categories=[
@@ -368,25 +501,43 @@ def get_walk(request: HttpRequest, identifier: str):
 @api.post("/walks/{id}/favorite")
 def toggle_favorite(request: HttpRequest, id: UUID):
     """Toggle favorite status for a walk"""
-    if not request.user.is_authenticated:
+    context = get_user_context(request)
+    if not context.is_authenticated:
         return {"status": "error", "message": "Authentication required"}
 
-    with transaction.atomic():
-        walk = get_object_or_404(Walk.objects.select_for_update(), id=id)
-        through = Walk.favorites.through
-        favorite, created = through.objects.get_or_create(
-            walk_id=walk.id,
-            user_id=request.user.id,
-        )
-        if created:
-            is_favorite = True
-        else:
-            favorite.delete()
-            is_favorite = False
+    try:
+        is_favorite = favorites.toggle_favorite(context.id, id)
+    except Walk.DoesNotExist:
+        raise Http404("Walk not found")
 
     return {"status": "success", "walk_id": str(id), "is_favorite": is_favorite}
 
 
+@api.get("/me/favorites", response={200: FavoritesSchema, 401: dict})
+def list_my_favorites(request: HttpRequest):
+    """The signed-in user's favorite walk ids, served from their cached set."""
+    context = get_user_context(request)
+    if not context.is_authenticated:
+        return 401, {"error": "Authentication required"}
+    return 200, {
+        "walk_ids": sorted(favorites.favorite_ids(context.id)),
+        "version": context.favorites_version,
+    }
+
+
+@api.post("/me/favorites:batch", response={200: FavoritesSchema, 400: dict, 401: dict})
+def update_my_favorites(request: HttpRequest, data: FavoritesBatchSchema):
+    """Add and remove several favorites in one request."""
+    context = get_user_context(request)
+    if not context.is_authenticated:
+        return 401, {"error": "Authentication required"}
+    try:
+        walk_ids = favorites.update_favorites(context.id, add=data.add, remove=data.remove)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    return 200, {"walk_ids": sorted(walk_ids), "version": favorites_version(context.id)}
+
+
 class TagResponseSchema(Schema):
     name: str
     slug: str
@@ -403,7 +554,7 @@ class MarkerSchema(Schema):
 
 # List tags
 @api.get("/tags", response=List[TagResponseSchema])
-def list_tags(request):
+async def list_tags(request):
     """Get all walk tags with usage counts"""
     def build_tags():
         tags = []
@@ -449,13 +600,13 @@ def list_tags(request):
 
         return tags
 
-    return get_cached_metadata("walkquest:api:tags:v1", build_tags)
+    return await get_cached_metadata("walkquest:api:tags:v1", build_tags)
 
 
 @api.get("/config", response=ConfigSchema)
-def get_config(request):
+async def get_config(request):
     """Get application configuration"""
-    return get_cached_metadata(
+    return await get_cached_metadata(
         "walkquest:api:config:v1",
         lambda: {
             "mapboxToken": settings.MAPBOX_TOKEN,
@@ -475,9 +626,9 @@ def get_config(request):
 
 
 @api.get("/filters")
-def get_filters(request):
+async def get_filters(request):
     """Get available filter options"""
-    return get_cached_metadata(
+    return await get_cached_metadata(
         "walkquest:api:filters:v1",
         lambda: {
             "difficulties": [choice[0] for choice in Walk.DIFFICULTY_CHOICES],
@@ -495,10 +646,10 @@ class GeometrySchema(Schema):
 
 
 @api.get("/walks/{id}/geometry", response=GeometrySchema)
-def get_walk_geometry(request: HttpRequest, id: UUID):
+async def get_walk_geometry(request: HttpRequest, id: UUID):
     """Get GeoJSON geometry for a walk route"""
     try:
-        walk = get_object_or_404(
+        walk = await aget_object_or_404(
             Walk.objects.only("id", "walk_name", "distance", "route_geometry"), id=id
         )
 
@@ -524,6 +675,92 @@ def get_walk_geometry(request: HttpRequest, id: UUID):
         return JsonResponse({"error": "Failed to fetch route geometry"}, status=404)
 
 
+@api.get("/walks/{id}/profile", response={200: ElevationProfileSchema, 404: dict})
+async def get_walk_profile(
+    request: HttpRequest,
+    id: UUID,
+    format: str = Query("json", description="'json' for deltas, 'binary' for raw varints"),
+):
+    """Elevation profile for a walk.
+
+    Elevations are delta-encoded decimetres: the first value is the starting
+    elevation and each following one the change from the previous sample.
+    ``format=binary`` returns the stored zigzag varints unchanged.
+    """
+    profile = await WalkElevationProfile.objects.filter(walk_id=id).afirst()
+    if profile is None:
+        return 404, {"error": "No elevation profile for this walk"}
+
+    if format == "binary":
+        response = HttpResponse(bytes(profile.samples), content_type="application/octet-stream")
+        response["X-Sample-Spacing"] = str(profile.sample_spacing)
+        response["X-Sample-Count"] = str(profile.sample_count)
+        response["X-Total-Ascent"] = str(profile.total_ascent)
+        response["X-Total-Descent"] = str(profile.total_descent)
+        response["Cache-Control"] = "public, max-age=86400"
+        return response
+
+    return 200, {
+        "walk_id": str(id),
+        "sample_spacing": profile.sample_spacing,
+        "sample_count": profile.sample_count,
+        "total_ascent": profile.total_ascent,
+        "total_descent": profile.total_descent,
+        "min_elevation": profile.min_elevation,
+        "max_elevation": profile.max_elevation,
+        "deltas": decode_deltas(bytes(profile.samples)),
+    }
+
+
+BUNDLE_BUILD_LOCK_TIMEOUT = 60 * 5
+
+
+@api.get(
+    "/offline-bundles",
+    response={200: OfflineBundleSchema, 202: dict, 400: dict, 401: dict, 503: dict},
+)
+def get_offline_bundle(
+    request: HttpRequest,
+    bbox: Optional[str] = Query(None, description="minx,miny,maxx,maxy in WGS84"),
+    category: Optional[str] = Query(None, description="Category slug"),
+    since: Optional[str] = Query(None, description="Bundle version the client holds"),
+):
+    """Locate the latest offline bundle for a region.
+
+    Returns download URLs for the full bundle and, when the client holds
+    one of the retained older versions, a delta from it. The bounding box
+    is snapped outward to the bundle grid. Regions that have never been
+    built are queued on the Celery worker for signed-in users and reported
+    as 202.
+    """
+    try:
+        region = BundleRegion.parse(bbox=bbox, category=category)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+
+    manifest = load_manifest(region)
+    if manifest is None or manifest["latest"] is None:
+        if not get_user_context(request).is_authenticated:
+            return 401, {"error": "Authentication required"}
+        if (
+            region.category
+            and not WalkCategoryTag.objects.filter(slug=region.category).exists()
+        ):
+            return 400, {"error": f"Unknown category: {region.category}"}
+        if built_region_count() >= MAX_BUILT_REGIONS:
+            return 503, {"error": "Too many offline regions; try again later"}
+        mark_requested(region)
+        if cache.add(
+            f"walkquest:bundles:building:{region.key}", 1, BUNDLE_BUILD_LOCK_TIMEOUT
+        ):
+            build_offline_bundle.delay(**region.as_query())
+        return 202, {"status": "building", "region": region.key}
+
+    mark_requested(region)
+
+    return 200, describe_bundle(region, manifest, since=since)
+
+
 def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance in meters using Haversine formula"""
     R = 6371000  # Radius of Earth in meters
@@ -1,3 +1,5 @@
+import contextlib
+
 from django.apps import AppConfig
 
 
@@ -5,3 +7,7 @@ class WalksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "walkquest.walks"
     verbose_name = "Walks"
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import walkquest.walks.signals  # noqa: F401
@@ -0,0 +1,420 @@
+"""
+Offline region bundles.
+
+A bundle is a single gzip-compressed JSON document containing everything the
+walk browser needs to work without a signal for one region: compact walk
+cards, simplified route geometries, tags and filter options. Bundles are
+content-addressed, so rebuilding an unchanged region is a no-op, and each new
+version is stored alongside a delta from every retained older version so
+clients that already hold a bundle only download what changed, however many
+versions behind they are.
+
+Built regions are refreshed by the ``refresh_offline_bundles`` beat job once
+walks have changed (saved or deleted) since the region was last built.
+
+Bounding boxes are snapped outward to a fixed grid so nearby requests share
+a region, at most ``MAX_BUILT_REGIONS`` are kept, and a region nobody has
+asked for in ``REGION_IDLE_SECONDS`` is deleted by the refresh job instead
+of being rebuilt.
+
+Storage layout (relative to the default storage backend)::
+
+    offline_bundles/<region>/manifest.json
+    offline_bundles/<region>/<version>.json.gz
+    offline_bundles/<region>/<from>..<to>.delta.json.gz
+"""
+
+import gzip
+import hashlib
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime
+
+import orjson
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .geo import parse_bbox
+from .models import Walk
+from .models import WalkCategoryTag
+from .models import WalkFeatureTag
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_STORAGE_PREFIX = "offline_bundles"
+# Roughly 10 m at Cornish latitudes; plenty for drawing a route on a phone.
+SIMPLIFY_TOLERANCE = 0.0001
+# Five decimal places is ~1 m precision and keeps the JSON small.
+COORDINATE_PRECISION = 5
+# Older versions (and the deltas leading from them) are pruned from storage.
+RETAINED_VERSIONS = 5
+# Deleting a walk leaves no updated_at behind, so deletions are noted here.
+WALKS_DELETED_KEY = "walkquest:bundles:walks_deleted_at"
+# Bounding boxes snap outward to a 0.1 degree grid (about 7 x 11 km here).
+GRID_CELLS_PER_DEGREE = 10
+MAX_BUILT_REGIONS = 100
+REGION_IDLE_SECONDS = 30 * 24 * 60 * 60
+
+
+def snap_bbox(bbox: tuple[float, float, float, float]) -> tuple[float, ...]:
+    """Grow ``bbox`` to the enclosing grid cells."""
+    # Rounding first keeps values already on the grid (-5.2 * 10) from
+    # landing a cell away through float error.
+    cells = [round(value * GRID_CELLS_PER_DEGREE, 6) for value in bbox]
+    minx, miny = math.floor(cells[0]), math.floor(cells[1])
+    maxx = max(math.ceil(cells[2]), minx + 1)
+    maxy = max(math.ceil(cells[3]), miny + 1)
+    return tuple(value / GRID_CELLS_PER_DEGREE for value in (minx, miny, maxx, maxy))
+
+
+@dataclass(frozen=True)
+class BundleRegion:
+    """The area an offline bundle covers: a bounding box, a category, or both."""
+
+    bbox: tuple[float, float, float, float] | None = None
+    category: str | None = None
+
+    @classmethod
+    def parse(cls, bbox: str | None = None, category: str | None = None):
+        """Build a region from the ``minx,miny,maxx,maxy`` query-string form."""
+        parsed_bbox = None
+        if bbox:
+            parsed_bbox = snap_bbox(parse_bbox(bbox))
+        return cls(bbox=parsed_bbox, category=slugify(category) if category else None)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Inverse of :meth:`as_dict`, for regions read back from a manifest."""
+        return cls(bbox=tuple(data["bbox"]) if data["bbox"] else None, category=data["category"])
+
+    @property
+    def key(self) -> str:
+        """Stable, storage-safe identifier for the region."""
+        parts = []
+        if self.category:
+            parts.append(f"category-{self.category}")
+        if self.bbox:
+            parts.append("bbox-" + "_".join(f"{value:.4f}" for value in self.bbox))
+        return "--".join(parts) or "all"
+
+    def as_dict(self) -> dict:
+        return {"bbox": list(self.bbox) if self.bbox else None, "category": self.category}
+
+    def as_query(self) -> dict:
+        """Inverse of :meth:`parse`, for handing the region to a task."""
+        bbox = ",".join(str(value) for value in self.bbox) if self.bbox else None
+        return {"bbox": bbox, "category": self.category}
+
+
+def _region_path(region: BundleRegion, filename: str) -> str:
+    return f"{BUNDLE_STORAGE_PREFIX}/{region.key}/{filename}"
+
+
+def _bundle_path(region: BundleRegion, version: str) -> str:
+    return _region_path(region, f"{version}.json.gz")
+
+
+def _delta_path(region: BundleRegion, from_version: str, to_version: str) -> str:
+    return _region_path(region, f"{from_version}..{to_version}.delta.json.gz")
+
+
+def _round_coords(coords):
+    if coords and isinstance(coords[0], (int, float)):
+        return [round(value, COORDINATE_PRECISION) for value in coords]
+    return [_round_coords(part) for part in coords]
+
+
+def simplify_geometry(geometry) -> dict | None:
+    """Return a simplified, coordinate-rounded GeoJSON geometry."""
+    if not geometry:
+        return None
+    simplified = geometry.simplify(SIMPLIFY_TOLERANCE, preserve_topology=True)
+    if simplified.empty:
+        simplified = geometry
+    return {
+        "type": simplified.geom_type,
+        "coordinates": _round_coords(simplified.coords),
+    }
+
+
+def bundle_queryset(region: BundleRegion):
+    walks = Walk.objects.prefetch_related("features", "categories").order_by("id")
+    if region.category:
+        walks = walks.filter(categories__slug=region.category)
+    if region.bbox:
+        walks = walks.filter(route_geometry__intersects=Polygon.from_bbox(region.bbox))
+    return walks.distinct()
+
+
+def serialize_walk_card(walk: Walk) -> dict:
+    """Compact representation of a walk for offline use."""
+    return {
+        "id": str(walk.id),
+        "walk_id": walk.walk_id,
+        "walk_name": walk.walk_name,
+        "distance": float(walk.distance) if walk.distance else None,
+        "latitude": float(walk.latitude),
+        "longitude": float(walk.longitude),
+        "steepness_level": walk.steepness_level,
+        "footwear_category": walk.footwear_category,
+        "highlights": walk.highlights,
+        "has_pub": bool(walk.has_pub),
+        "has_cafe": bool(walk.has_cafe),
+        "has_bus_access": bool(walk.has_bus_access),
+        "has_stiles": bool(walk.has_stiles),
+        "features": [feature.slug for feature in walk.features.all()],
+        "categories": [category.slug for category in walk.categories.all()],
+        "geometry": simplify_geometry(walk.route_geometry),
+    }
+
+
+def build_bundle_payload(region: BundleRegion) -> dict:
+    """Collect the bundle contents and derive a content-addressed version."""
+    walks = {
+        card["id"]: card
+        for card in (serialize_walk_card(walk) for walk in bundle_queryset(region))
+    }
+    tags = [
+        {"name": tag["name"], "slug": tag["slug"], "type": "category"}
+        for tag in WalkCategoryTag.objects.annotate(walk_count=Count("categorized_walks"))
+        .filter(walk_count__gt=0)
+        .order_by("slug")
+        .values("name", "slug")
+    ] + [
+        {"name": tag["name"], "slug": tag["slug"], "type": "feature"}
+        for tag in WalkFeatureTag.objects.annotate(walk_count=Count("walks"))
+        .filter(walk_count__gt=0)
+        .order_by("slug")
+        .values("name", "slug")
+    ]
+    filters = {
+        "difficulties": [choice[0] for choice in Walk.DIFFICULTY_CHOICES],
+        "footwear": [choice[0] for choice in Walk.FOOTWEAR_CHOICES],
+    }
+    content = {"walks": walks, "tags": tags, "filters": filters}
+    version = hashlib.sha256(
+        orjson.dumps(content, option=orjson.OPT_SORT_KEYS),
+    ).hexdigest()[:16]
+    return {
+        "format": BUNDLE_FORMAT_VERSION,
+        "region": region.as_dict(),
+        "version": version,
+        "generated_at": timezone.now().isoformat(),
+        **content,
+    }
+
+
+def compute_delta(old_walks: dict, new_walks: dict) -> dict:
+    """Return the walks added or changed, and the ids removed, between versions."""
+    return {
+        "upserted": {
+            walk_id: card
+            for walk_id, card in new_walks.items()
+            if old_walks.get(walk_id) != card
+        },
+        "removed": sorted(set(old_walks) - set(new_walks)),
+    }
+
+
+def _write_gzip_json(path: str, data: dict) -> int:
+    payload = gzip.compress(orjson.dumps(data), compresslevel=9)
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(payload))
+    return len(payload)
+
+
+def _read_gzip_json(path: str) -> dict:
+    with default_storage.open(path, "rb") as handle:
+        return orjson.loads(gzip.decompress(handle.read()))
+
+
+def load_manifest(region: BundleRegion) -> dict | None:
+    path = _region_path(region, "manifest.json")
+    if not default_storage.exists(path):
+        return None
+    with default_storage.open(path, "rb") as handle:
+        return orjson.loads(handle.read())
+
+
+def _save_manifest(region: BundleRegion, manifest: dict) -> None:
+    path = _region_path(region, "manifest.json")
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(orjson.dumps(manifest)))
+
+
+def write_bundle(region: BundleRegion) -> dict:
+    """Build the bundle for ``region`` and store it with deltas from older ones.
+
+    Returns the region manifest. Rebuilding an unchanged region only records
+    when it was checked.
+    """
+    payload = build_bundle_payload(region)
+    version = payload["version"]
+    manifest = load_manifest(region) or {
+        "region": region.as_dict(),
+        "latest": None,
+        "versions": [],
+        "deltas": {},
+    }
+    if manifest["latest"] == version:
+        manifest["built_at"] = payload["generated_at"]
+        _save_manifest(region, manifest)
+        logger.info("Offline bundle %s is up to date (%s)", region.key, version)
+        return manifest
+
+    size = _write_gzip_json(_bundle_path(region, version), payload)
+    manifest["versions"] = [
+        entry for entry in manifest["versions"] if entry["version"] != version
+    ] + [
+        {
+            "version": version,
+            "generated_at": payload["generated_at"],
+            "walk_count": len(payload["walks"]),
+            "size": size,
+        },
+    ]
+    # Drop the oldest versions; the deltas from them are replaced below.
+    for entry in manifest["versions"][:-RETAINED_VERSIONS]:
+        default_storage.delete(_bundle_path(region, entry["version"]))
+    manifest["versions"] = manifest["versions"][-RETAINED_VERSIONS:]
+
+    # Deltas only ever lead to the latest version, so replace them all with
+    # one from each retained older version.
+    for from_version, to_version in manifest["deltas"].items():
+        default_storage.delete(_delta_path(region, from_version, to_version))
+    manifest["deltas"] = {}
+    for entry in manifest["versions"][:-1]:
+        old_version = entry["version"]
+        if not default_storage.exists(_bundle_path(region, old_version)):
+            continue
+        old_walks = _read_gzip_json(_bundle_path(region, old_version))["walks"]
+        _write_gzip_json(
+            _delta_path(region, old_version, version),
+            {
+                "format": BUNDLE_FORMAT_VERSION,
+                "from_version": old_version,
+                "to_version": version,
+                "tags": payload["tags"],
+                "filters": payload["filters"],
+                **compute_delta(old_walks, payload["walks"]),
+            },
+        )
+        manifest["deltas"][old_version] = version
+
+    manifest["latest"] = version
+    manifest["built_at"] = payload["generated_at"]
+    _save_manifest(region, manifest)
+    logger.info(
+        "Built offline bundle %s version %s (%d walks, %d bytes)",
+        region.key,
+        version,
+        len(payload["walks"]),
+        size,
+    )
+    return manifest
+
+
+def mark_walks_deleted() -> None:
+    cache.set(WALKS_DELETED_KEY, timezone.now().isoformat(), None)
+
+
+def walks_changed_at() -> datetime | None:
+    """When a walk was last saved or deleted, if ever."""
+    changed = Walk.objects.aggregate(latest=Max("updated_at"))["latest"]
+    deleted = cache.get(WALKS_DELETED_KEY)
+    if deleted:
+        deleted = datetime.fromisoformat(deleted)
+        changed = max(changed, deleted) if changed else deleted
+    return changed
+
+
+def _requested_key(region: BundleRegion) -> str:
+    return f"walkquest:bundles:requested:{region.key}"
+
+
+def mark_requested(region: BundleRegion) -> None:
+    """Keep ``region`` from being pruned for another ``REGION_IDLE_SECONDS``."""
+    cache.set(_requested_key(region), 1, REGION_IDLE_SECONDS)
+
+
+def _region_keys() -> list[str]:
+    try:
+        return default_storage.listdir(BUNDLE_STORAGE_PREFIX)[0]
+    except FileNotFoundError:
+        return []
+
+
+def built_region_count() -> int:
+    # Deleted regions can leave an empty directory behind, so count manifests.
+    return sum(
+        default_storage.exists(f"{BUNDLE_STORAGE_PREFIX}/{key}/manifest.json")
+        for key in _region_keys()
+    )
+
+
+def delete_region(region: BundleRegion) -> None:
+    directory = f"{BUNDLE_STORAGE_PREFIX}/{region.key}"
+    try:
+        filenames = default_storage.listdir(directory)[1]
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        default_storage.delete(f"{directory}/{filename}")
+
+
+def built_regions() -> list[BundleRegion]:
+    regions = []
+    for key in _region_keys():
+        path = f"{BUNDLE_STORAGE_PREFIX}/{key}/manifest.json"
+        if default_storage.exists(path):
+            with default_storage.open(path, "rb") as handle:
+                regions.append(BundleRegion.from_dict(orjson.loads(handle.read())["region"]))
+    return regions
+
+
+def stale_regions() -> list[BundleRegion]:
+    """Built regions whose walks may have changed since they were built.
+
+    Regions nobody has requested for ``REGION_IDLE_SECONDS`` are deleted
+    rather than returned.
+    """
+    changed = walks_changed_at()
+    stale = []
+    for region in built_regions():
+        if cache.get(_requested_key(region)) is None:
+            logger.info("Deleting idle offline bundle region %s", region.key)
+            delete_region(region)
+            continue
+        if changed is None:
+            continue
+        manifest = load_manifest(region)
+        # Manifests written before built_at was recorded count as stale.
+        built_at = manifest.get("built_at")
+        if built_at and datetime.fromisoformat(built_at) >= changed:
+            continue
+        stale.append(region)
+    return stale
+
+
+def describe_bundle(region: BundleRegion, manifest: dict, since: str | None = None) -> dict:
+    """Public view of a manifest: download URLs for the latest bundle and delta."""
+    latest = manifest["latest"]
+    response = {
+        "region": manifest["region"],
+        "version": latest,
+        "url": default_storage.url(_bundle_path(region, latest)),
+        "delta_url": None,
+    }
+    if since and since != latest and manifest["deltas"].get(since) == latest:
+        response["delta_url"] = default_storage.url(_delta_path(region, since, latest))
+    return response
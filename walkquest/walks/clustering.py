@@ -0,0 +1,201 @@
+"""
+Server-side marker clustering for the walk map.
+
+Walk start points are projected to Web Mercator and bucketed into a grid whose
+cells are ``CLUSTER_RADIUS`` pixels wide at each zoom level. Because the cell
+size halves with every zoom, each level is built from the one above it by
+merging the four child cells, so the whole hierarchy is built in a single pass
+over the points (the same idea as supercluster, with a grid instead of a KD
+tree).
+
+The index lives in process memory and is shared by every request handled by a
+worker. A version token in the shared cache is bumped whenever a walk changes;
+each worker compares it on access and rebuilds lazily, so gunicorn workers
+converge without any cross-process messaging.
+"""
+
+import math
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .models import Walk
+
+TILE_SIZE = 256
+CLUSTER_RADIUS = 60
+MAX_ZOOM = 16
+INDEX_VERSION_KEY = "walkquest:walks:clusters:version"
+
+
+def _project(longitude: float, latitude: float) -> tuple[float, float]:
+    """Project WGS84 degrees to normalised Web Mercator coordinates (0..1)."""
+    sin = math.sin(math.radians(max(min(latitude, 85.05112878), -85.05112878)))
+    x = longitude / 360 + 0.5
+    y = 0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi
+    return x, y
+
+
+def _unproject(x: float, y: float) -> tuple[float, float]:
+    longitude = (x - 0.5) * 360
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return longitude, latitude
+
+
+def _cell_size(zoom: int) -> float:
+    return CLUSTER_RADIUS / (TILE_SIZE * 2**zoom)
+
+
+class ClusterIndex:
+    """Hierarchical grid clusters of walk start points for zooms 0..MAX_ZOOM.
+
+    Each level maps a grid cell to ``[count, sum_x, sum_y, id, walk_id]``; the
+    id fields are only meaningful when the cell holds a single walk.
+    """
+
+    def __init__(self, points):
+        self.levels: list[dict] = [{} for _ in range(MAX_ZOOM + 1)]
+        # Individual points per finest cell, for zooms beyond MAX_ZOOM.
+        self.cell_points: dict[tuple[int, int], list] = {}
+        finest = self.levels[MAX_ZOOM]
+        size = _cell_size(MAX_ZOOM)
+        for walk_pk, walk_id, longitude, latitude in points:
+            x, y = _project(longitude, latitude)
+            cell = (int(x / size), int(y / size))
+            self.cell_points.setdefault(cell, []).append((x, y, str(walk_pk), walk_id))
+            entry = finest.get(cell)
+            if entry is None:
+                finest[cell] = [1, x, y, str(walk_pk), walk_id]
+            else:
+                entry[0] += 1
+                entry[1] += x
+                entry[2] += y
+
+        for zoom in range(MAX_ZOOM - 1, -1, -1):
+            parent_level = self.levels[zoom]
+            for (cx, cy), (count, sx, sy, walk_pk, walk_id) in self.levels[zoom + 1].items():
+                cell = (cx // 2, cy // 2)
+                entry = parent_level.get(cell)
+                if entry is None:
+                    parent_level[cell] = [count, sx, sy, walk_pk, walk_id]
+                else:
+                    entry[0] += count
+                    entry[1] += sx
+                    entry[2] += sy
+
+    def _expansion_zoom(self, zoom: int, cell: tuple[int, int]) -> int:
+        """Zoom at which a cluster first splits into several markers."""
+        descendants = {cell}
+        for child_zoom in range(zoom + 1, MAX_ZOOM + 1):
+            level = self.levels[child_zoom]
+            descendants = {
+                (x * 2 + dx, y * 2 + dy)
+                for x, y in descendants
+                for dx in (0, 1)
+                for dy in (0, 1)
+                if (x * 2 + dx, y * 2 + dy) in level
+            }
+            if len(descendants) > 1:
+                return child_zoom
+        # Walks sharing a start cell even at MAX_ZOOM are returned as
+        # individual markers beyond it.
+        return MAX_ZOOM + 1
+
+    @staticmethod
+    def _cells_in_view(level: dict, size: float, x0, y0, x1, y1):
+        """Yield the populated cells of ``level`` overlapping the view.
+
+        Walks the cell range when the viewport is small, otherwise scans the
+        level, so the cost is bounded by whichever is smaller.
+        """
+        first_x, last_x = int(x0 / size), int(x1 / size)
+        first_y, last_y = int(y0 / size), int(y1 / size)
+        span = (last_x - first_x + 1) * (last_y - first_y + 1)
+        if span <= len(level):
+            for cx in range(first_x, last_x + 1):
+                for cy in range(first_y, last_y + 1):
+                    if (cx, cy) in level:
+                        yield (cx, cy), level[(cx, cy)]
+        else:
+            for cell, value in level.items():
+                if first_x <= cell[0] <= last_x and first_y <= cell[1] <= last_y:
+                    yield cell, value
+
+    def query(self, bbox: tuple[float, float, float, float], zoom: float) -> list[dict]:
+        minx, miny, maxx, maxy = bbox
+        x0, y1 = _project(minx, miny)
+        x1, y0 = _project(maxx, maxy)
+        z = max(0, math.floor(zoom))
+
+        if z > MAX_ZOOM:
+            cells = self._cells_in_view(
+                self.cell_points, _cell_size(MAX_ZOOM), x0, y0, x1, y1,
+            )
+            return [
+                self._marker(1, x, y, walk_pk, walk_id, None)
+                for _, points in cells
+                for x, y, walk_pk, walk_id in points
+                if x0 <= x <= x1 and y0 <= y <= y1
+            ]
+
+        markers = []
+        cells = self._cells_in_view(self.levels[z], _cell_size(z), x0, y0, x1, y1)
+        for cell, (count, sx, sy, walk_pk, walk_id) in cells:
+            x, y = sx / count, sy / count
+            if not (x0 <= x <= x1 and y0 <= y <= y1):
+                continue
+            markers.append(
+                self._marker(
+                    count,
+                    x,
+                    y,
+                    walk_pk if count == 1 else None,
+                    walk_id if count == 1 else None,
+                    self._expansion_zoom(z, cell) if count > 1 else None,
+                ),
+            )
+        return markers
+
+    @staticmethod
+    def _marker(count, x, y, walk_pk, walk_id, expansion_zoom) -> dict:
+        longitude, latitude = _unproject(x, y)
+        return {
+            "latitude": round(latitude, 6),
+            "longitude": round(longitude, 6),
+            "count": count,
+            "id": walk_pk,
+            "walk_id": walk_id,
+            "expansion_zoom": expansion_zoom,
+        }
+
+
+_index: ClusterIndex | None = None
+_index_version: str | None = None
+_index_lock = threading.Lock()
+
+
+def invalidate_cluster_index() -> None:
+    """Ask every worker to rebuild its index on next access."""
+    cache.set(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_cluster_index() -> ClusterIndex:
+    global _index, _index_version  # noqa: PLW0603
+
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        # Cold or evicted cache: agree on a token so workers stay in step.
+        cache.add(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(INDEX_VERSION_KEY)
+
+    if _index is not None and version == _index_version:
+        return _index
+
+    with _index_lock:
+        if _index is None or version != _index_version:
+            points = Walk.objects.order_by().values_list(
+                "id", "walk_id", "longitude", "latitude",
+            )
+            _index = ClusterIndex(points.iterator(chunk_size=2000))
+            _index_version = version
+    return _index
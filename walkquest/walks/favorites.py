@@ -0,0 +1,191 @@
+"""
+Walk favorites.
+
+Writes go straight to the ``Walk.favorites`` through table: one INSERT ...
+ON CONFLICT DO NOTHING for additions and one DELETE for removals. Both
+return the rows they actually changed, and only those move the walks'
+favorite counters (``walks.popularity``). The counters are moved once the
+write commits, in their own short UPDATE, so the walk row is never locked
+for the rest of the writer's transaction; users favoriting the same walk
+only queue on that single statement. Reads come from a per-user
+Redis set holding the user's favorite walk ids, loaded from the database on
+a miss and kept in step after each write commits.
+
+A sentinel member keeps a user with no favorites cached (Redis drops empty
+sets), and the mirroring script only touches sets that already exist, so a
+write never leaves a partial set behind. A set loaded from the database is
+only stored if the user's favorites version is unchanged since before the
+load, so a write committing mid-load cannot leave a stale set behind either.
+Without Redis the ids are cached as a list and dropped on every change.
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.db import transaction
+
+from walkquest.cache import redis_connection
+from walkquest.users.context import bump_favorites_version
+from walkquest.users.context import favorites_version
+from walkquest.users.context import favorites_version_key
+
+from .models import Walk
+from .popularity import adjust_counts
+
+FAVORITES_TTL = 60 * 60
+SENTINEL = "-"
+MAX_BATCH_SIZE = 500
+
+# Applies SADD/SREM only to a set that is already loaded.
+_MIRROR_SCRIPT = f"""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call(ARGV[1], KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], {FAVORITES_TTL})
+end
+"""
+
+# Stores a freshly loaded set unless the favorites version (KEYS[2]) has moved
+# since ARGV[1] was read, i.e. a write committed while the set was loading.
+_FILL_SCRIPT = f"""
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('SADD', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], {FAVORITES_TTL})
+return 1
+"""
+
+
+def favorites_key(user_id) -> str:
+    return f"walkquest:favorites:{user_id}"
+
+
+def _through():
+    return Walk.favorites.through
+
+
+def _load(user_id) -> set[str]:
+    return {
+        str(walk_id)
+        for walk_id in _through().objects.filter(user_id=user_id).values_list("walk_id", flat=True)
+    }
+
+
+def favorite_ids(user_id) -> set[str]:
+    """The ids (as strings) of the walks ``user_id`` has favorited."""
+    redis = redis_connection()
+    if redis is None:
+        ids = cache.get(favorites_key(user_id))
+        if ids is None:
+            version = favorites_version(user_id)
+            ids = _load(user_id)
+            if favorites_version(user_id) == version:
+                cache.set(favorites_key(user_id), list(ids), FAVORITES_TTL)
+        return set(ids)
+
+    members = redis.smembers(favorites_key(user_id))
+    if members:
+        return {member.decode() for member in members} - {SENTINEL}
+    version_key = cache.make_key(favorites_version_key(user_id))
+    version = redis.get(version_key) or b""
+    ids = _load(user_id)
+    fill = redis.register_script(_FILL_SCRIPT)
+    fill(keys=[favorites_key(user_id), version_key], args=[version, SENTINEL, *ids])
+    return ids
+
+
+def invalidate(user_id) -> None:
+    """Drop the cached set; the next read reloads it from the database."""
+    redis = redis_connection()
+    if redis is None:
+        cache.delete(favorites_key(user_id))
+    else:
+        redis.delete(favorites_key(user_id))
+
+
+def _mirror(user_id, added: set[str], removed: set[str]) -> None:
+    redis = redis_connection()
+    if redis is None:
+        cache.delete(favorites_key(user_id))
+    else:
+        mirror = redis.register_script(_MIRROR_SCRIPT)
+        if added:
+            mirror(keys=[favorites_key(user_id)], args=["SADD", *added])
+        if removed:
+            mirror(keys=[favorites_key(user_id)], args=["SREM", *removed])
+    bump_favorites_version(user_id)
+
+
+def _insert(user_id, walk_ids: set[str]) -> set[str]:
+    """Insert favorites; returns the walk ids that were not favorites yet."""
+    through = _through()
+    table = connection.ops.quote_name(through._meta.db_table)
+    values = ", ".join(["(%s, %s)"] * len(walk_ids))
+    params = [value for walk_id in walk_ids for value in (walk_id, user_id)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (walk_id, user_id) VALUES {values} "  # noqa: S608
+            "ON CONFLICT (walk_id, user_id) DO NOTHING RETURNING walk_id",
+            params,
+        )
+        return {str(row[0]) for row in cursor.fetchall()}
+
+
+def _delete(user_id, walk_ids: set[str]) -> set[str]:
+    """Delete favorites; returns the walk ids that were favorites."""
+    table = connection.ops.quote_name(_through()._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE user_id = %s AND walk_id = ANY(%s::uuid[]) "  # noqa: S608
+            "RETURNING walk_id",
+            [user_id, list(walk_ids)],
+        )
+        return {str(row[0]) for row in cursor.fetchall()}
+
+
+def _record_change(user_id, added: set[str], removed: set[str]) -> None:
+    """Move the walks' counters and mirror the change once it commits."""
+    if added or removed:
+        transaction.on_commit(lambda: adjust_counts(added, removed))
+        transaction.on_commit(lambda: _mirror(user_id, added, removed))
+
+
+def update_favorites(user_id, add=(), remove=()) -> set[str]:
+    """Add and remove favorites in one call; returns the user's favorite ids.
+
+    Raises ``ValueError`` for an id in both lists, too many ids, or unknown
+    walks to add.
+    """
+    add = {str(walk_id) for walk_id in add}
+    remove = {str(walk_id) for walk_id in remove}
+    if add & remove:
+        raise ValueError("A walk cannot be both added and removed")
+    if len(add) + len(remove) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} favorites can be changed at once")
+
+    added, removed = set(), set()
+    with transaction.atomic():
+        if add:
+            found = {str(pk) for pk in Walk.objects.filter(id__in=add).values_list("id", flat=True)}
+            if missing := add - found:
+                raise ValueError(f"Unknown walks: {', '.join(sorted(missing))}")
+            added = _insert(user_id, add)
+        if remove:
+            removed = _delete(user_id, remove)
+        _record_change(user_id, added, removed)
+    return (favorite_ids(user_id) | add) - remove
+
+
+def toggle_favorite(user_id, walk_id) -> bool:
+    """Flip one favorite; returns whether the walk is now a favorite.
+
+    Raises ``Walk.DoesNotExist`` for an unknown walk.
+    """
+    walk_id = str(walk_id)
+    with transaction.atomic():
+        if removed := _delete(user_id, {walk_id}):
+            _record_change(user_id, set(), removed)
+            return False
+        if not Walk.objects.filter(id=walk_id).exists():
+            raise Walk.DoesNotExist(f"Walk {walk_id} not found")
+        _record_change(user_id, _insert(user_id, {walk_id}), set())
+    return True
@@ -0,0 +1,24 @@
+"""Small geographic helpers shared by the walk endpoints."""
+
+
+def parse_bbox(value: str) -> tuple[float, float, float, float]:
+    """Parse a ``minx,miny,maxx,maxy`` string (WGS84 degrees)."""
+    try:
+        minx, miny, maxx, maxy = (float(part) for part in value.split(","))
+    except ValueError as err:
+        msg = "bbox must be four comma-separated numbers: minx,miny,maxx,maxy"
+        raise ValueError(msg) from err
+    return validate_bbox(minx, miny, maxx, maxy)
+
+
+def validate_bbox(minx: float, miny: float, maxx: float, maxy: float):
+    if not (-180 <= minx <= 180 and -180 <= maxx <= 180):
+        msg = "bbox longitudes must be between -180 and 180"
+        raise ValueError(msg)
+    if not (-90 <= miny <= 90 and -90 <= maxy <= 90):
+        msg = "bbox latitudes must be between -90 and 90"
+        raise ValueError(msg)
+    if not (minx < maxx and miny < maxy):
+        msg = "bbox minimums must be smaller than maximums"
+        raise ValueError(msg)
+    return minx, miny, maxx, maxy
@@ -0,0 +1,59 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from walkquest.walks.elevation import DEFAULT_SAMPLE_SPACING
+from walkquest.walks.elevation import compute_profiles_parallel
+from walkquest.walks.models import Walk
+
+
+class Command(BaseCommand):
+    help = "Sample walk elevation profiles from a local DEM raster"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dem",
+            default=None,
+            help="Path to the DEM GeoTIFF (defaults to WALKQUEST_DEM_PATH)",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every walk, not only those without a profile",
+        )
+        parser.add_argument("--spacing", type=float, default=DEFAULT_SAMPLE_SPACING)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes",
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        dem_path = options["dem"] or settings.WALKQUEST_DEM_PATH
+        if not dem_path or not os.path.exists(dem_path):
+            msg = "No DEM raster found; pass --dem or set WALKQUEST_DEM_PATH."
+            raise CommandError(msg)
+
+        walks = Walk.objects.order_by()
+        if not options["all"]:
+            walks = walks.filter(elevation_profile__isnull=True)
+        walk_ids = list(walks.values_list("id", flat=True))
+
+        processed = 0
+        for count in compute_profiles_parallel(
+            walk_ids,
+            dem_path=dem_path,
+            spacing=options["spacing"],
+            workers=options["workers"],
+            chunk_size=options["batch_size"],
+        ):
+            processed += count
+            self.stdout.write(f"{processed}/{len(walk_ids)} profiles computed")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Elevation profiles updated for {processed} walks."),
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from walkquest.walks.models import Walk
+from walkquest.walks.route_metrics import ROUTE_METRIC_FIELDS
+from walkquest.walks.route_metrics import compute_route_metrics
+
+
+class Command(BaseCommand):
+    help = "Recompute stored route metrics (length, bbox, start/end, loop) for walks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every walk, not only those missing metrics",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        walks = Walk.objects.only("id", "route_geometry").order_by()
+        if not options["all"]:
+            walks = walks.filter(route_length__isnull=True)
+
+        batch_size = options["batch_size"]
+        batch = []
+        processed = 0
+        for walk in walks.iterator(chunk_size=batch_size):
+            for field, value in compute_route_metrics(walk.route_geometry).as_fields().items():
+                setattr(walk, field, value)
+            batch.append(walk)
+            if len(batch) >= batch_size:
+                Walk.objects.bulk_update(batch, ROUTE_METRIC_FIELDS)
+                processed += len(batch)
+                batch = []
+        if batch:
+            Walk.objects.bulk_update(batch, ROUTE_METRIC_FIELDS)
+            processed += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Route metrics updated for {processed} walks."),
+        )
@@ -39,7 +39,7 @@ class Command(BaseCommand):
         "circular": {
             "priority": 7,
             "keywords": ["circular", "loop", "round trip"],
-            "route_check": lambda route: route and route.start_point.equals(route.end_point),
+            "property_check": lambda walk: walk.is_loop,
         },
         "scenic": {
             "priority": 8,
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from walkquest.walks.synthetic import SyntheticCatalogue
+from walkquest.walks.synthetic import delete_synthetic_catalogue
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic catalogue of walks, users and favorites for scale testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--walks", type=int, default=50_000)
+        parser.add_argument("--users", type=int, default=20_000)
+        parser.add_argument("--favorites", type=int, default=1_000_000)
+        parser.add_argument("--adventures", type=int, default=100_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--user-password",
+            help="Let the synthetic users sign in with this password (for load tests)",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete a previously generated catalogue first",
+        )
+        parser.add_argument(
+            "--clear-only",
+            action="store_true",
+            help="Delete the synthetic catalogue and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"] or options["clear_only"]:
+            delete_synthetic_catalogue()
+            self.stdout.write("Removed existing synthetic catalogue.")
+            if options["clear_only"]:
+                return
+
+        catalogue = SyntheticCatalogue(
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            progress=self.stdout.write,
+        )
+        catalogue.create_users(options["users"], password=options["user_password"])
+        catalogue.create_walks(options["walks"])
+        catalogue.create_favorites(options["favorites"])
+        catalogue.create_adventures(options["adventures"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synthetic catalogue (seed {options['seed']}) generated. "
+                "Run compute_elevation_profiles and ANALYZE before benchmarking.",
+            ),
+        )
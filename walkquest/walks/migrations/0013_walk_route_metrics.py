@@ -0,0 +1,75 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+from walkquest.walks.route_metrics import compute_route_metrics
+
+
+def backfill_route_metrics(apps, schema_editor):
+    Walk = apps.get_model("walks", "Walk")
+    batch = []
+    fields = [
+        "route_length",
+        "route_bbox",
+        "route_start",
+        "route_end",
+        "route_vertex_count",
+        "is_loop",
+    ]
+    for walk in Walk.objects.only("id", "route_geometry").iterator(chunk_size=500):
+        for field, value in compute_route_metrics(walk.route_geometry).as_fields().items():
+            setattr(walk, field, value)
+        batch.append(walk)
+        if len(batch) >= 500:
+            Walk.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Walk.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('walks', '0012_adventure_walks_adv_is_public_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='walk',
+            name='route_length',
+            field=models.FloatField(blank=True, editable=False, help_text='Geodesic length of the route in metres', null=True, verbose_name='Route length'),
+        ),
+        migrations.AddField(
+            model_name='walk',
+            name='route_bbox',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, editable=False, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='walk',
+            name='route_start',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, editable=False, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='walk',
+            name='route_end',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, editable=False, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='walk',
+            name='route_vertex_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='walk',
+            name='is_loop',
+            field=models.BooleanField(default=False, editable=False, help_text='Whether the route starts and finishes in the same place', verbose_name='Circular'),
+        ),
+        migrations.AddIndex(
+            model_name='walk',
+            index=models.Index(fields=['route_length'], name='walks_walk_route_len_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='walk',
+            index=models.Index(fields=['is_loop', 'route_length'], name='walks_walk_loop_len_idx'),
+        ),
+        migrations.RunPython(backfill_route_metrics, migrations.RunPython.noop),
+    ]
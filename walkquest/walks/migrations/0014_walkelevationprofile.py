@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('walks', '0013_walk_route_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalkElevationProfile',
+            fields=[
+                ('walk', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='elevation_profile', serialize=False, to='walks.walk')),
+                ('sample_spacing', models.FloatField(help_text='Distance between samples in metres')),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('samples', models.BinaryField(help_text='Delta-encoded elevations in decimetres')),
+                ('total_ascent', models.FloatField(default=0.0, verbose_name='Total ascent')),
+                ('total_descent', models.FloatField(default=0.0, verbose_name='Total descent')),
+                ('min_elevation', models.FloatField(blank=True, null=True)),
+                ('max_elevation', models.FloatField(blank=True, null=True)),
+                ('source', models.CharField(blank=True, help_text='DEM file the profile was sampled from', max_length=255)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'elevation profile',
+                'verbose_name_plural': 'elevation profiles',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('walks', '0014_walkelevationprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='walk',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Favorites'),
+        ),
+        migrations.AddField(
+            model_name='walk',
+            name='recent_favorites',
+            field=models.IntegerField(default=0, editable=False, help_text='Net favorites since the popularity score was last decayed'),
+        ),
+        migrations.AddField(
+            model_name='walk',
+            name='popularity_score',
+            field=models.FloatField(default=0.0, editable=False, verbose_name='Popularity'),
+        ),
+        migrations.AddIndex(
+            model_name='walk',
+            index=models.Index(fields=['-popularity_score', 'id'], name='walks_walk_popularity_idx'),
+        ),
+        # Existing favorites start with their full weight.
+        migrations.RunSQL(
+            sql="""
+                UPDATE walks_walk w
+                SET favorites_count = counts.total, popularity_score = counts.total
+                FROM (
+                    SELECT walk_id, COUNT(*) AS total FROM walks_walk_favorites GROUP BY walk_id
+                ) counts
+                WHERE counts.walk_id = w.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -4,6 +4,9 @@ from django.contrib.gis.db import models
 from django.utils.translation import gettext_lazy as _
 from tagulous.models import TagField, TagModel
 
+from .route_metrics import ROUTE_METRIC_FIELDS
+from .route_metrics import compute_route_metrics
+
 class WalkCategoryTag(TagModel):
     class TagMeta:
         # TagModel specific configuration
@@ -277,6 +280,39 @@ class Walk(models.Model):
         srid=4326,
         help_text=_("Geographic route of the walk"),
     )
+    # Derived from route_geometry on save; see walks.route_metrics.
+    route_length = models.FloatField(
+        _("Route length"),
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Geodesic length of the route in metres"),
+    )
+    route_bbox = models.PolygonField(
+        srid=4326,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    route_start = models.PointField(
+        srid=4326,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    route_end = models.PointField(
+        srid=4326,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    route_vertex_count = models.PositiveIntegerField(default=0, editable=False)
+    is_loop = models.BooleanField(
+        _("Circular"),
+        default=False,
+        editable=False,
+        help_text=_("Whether the route starts and finishes in the same place"),
+    )
     os_explorer_reference = models.CharField(
         _("OS Explorer Map"),
         max_length=255,
@@ -351,6 +387,15 @@ class Walk(models.Model):
         blank=True,
         help_text=_("Users who have favorited this walk")
     )
+    # Maintained by walks.favorites and walks.popularity; never aggregate
+    # the favorites table to read these.
+    favorites_count = models.PositiveIntegerField(_("Favorites"), default=0, editable=False)
+    recent_favorites = models.IntegerField(
+        default=0,
+        editable=False,
+        help_text=_("Net favorites since the popularity score was last decayed"),
+    )
+    popularity_score = models.FloatField(_("Popularity"), default=0.0, editable=False)
     has_stiles = models.BooleanField(default=False)
     has_cafe = models.BooleanField(default=False)
     has_bus_access = models.BooleanField(default=False)
@@ -372,6 +417,9 @@ class Walk(models.Model):
             models.Index(fields=["has_cafe"], name="walks_walk_has_cafe_idx"),
             models.Index(fields=["adventure"], name="walks_walk_adventure_idx"),
             models.Index(fields=["latitude", "longitude"], name="walks_walk_location_idx"),
+            models.Index(fields=["route_length"], name="walks_walk_route_len_idx"),
+            models.Index(fields=["is_loop", "route_length"], name="walks_walk_loop_len_idx"),
+            models.Index(fields=["-popularity_score", "id"], name="walks_walk_popularity_idx"),
         ]
 
     def __str__(self):
@@ -383,7 +431,36 @@ class Walk(models.Model):
     def get_steepness(self):
         return self.adventure.difficulty_level
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored route so save() only recomputes metrics when the
+        # geometry actually changes.
+        route = instance.__dict__.get("route_geometry")
+        instance._loaded_route_ewkb = bytes(route.ewkb) if route else None
+        return instance
+
+    def route_geometry_changed(self) -> bool:
+        route = self.__dict__.get("route_geometry")
+        if route is None and "route_geometry" not in self.__dict__:
+            return False  # Deferred and never loaded.
+        current = bytes(route.ewkb) if route else None
+        return self._state.adding or current != getattr(self, "_loaded_route_ewkb", None)
+
+    def update_route_metrics(self) -> None:
+        for field, value in compute_route_metrics(self.route_geometry).as_fields().items():
+            setattr(self, field, value)
+        self._loaded_route_ewkb = bytes(self.route_geometry.ewkb) if self.route_geometry else None
+
     def save(self, *args, **kwargs):
+        # Read by the post_save handler to refresh the elevation profile.
+        self._route_changed = self.route_geometry_changed()
+        if self._route_changed:
+            self.update_route_metrics()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *ROUTE_METRIC_FIELDS}
+
         # Update boolean fields based on categories
         # Check for 'pub' and 'cafe' in related_categories without using get_tag_list()
         try:
@@ -412,7 +489,9 @@ class Walk(models.Model):
         """Check if walk is favorited by given user"""
         if not user or not user.is_authenticated:
             return False
-        return self.favorites.filter(id=user.id).exists()
+        from .favorites import favorite_ids
+
+        return str(self.id) in favorite_ids(user.pk)
 
     @property
     def title(self):
@@ -439,3 +518,34 @@ class WalkFavorite(models.Model):
             models.Index(fields=['user', 'walk']),
             models.Index(fields=['created_at']),
         ]
+
+
+class WalkElevationProfile(models.Model):
+    """Elevation samples along a walk's route, taken from a DEM raster.
+
+    ``samples`` holds zigzag varint deltas of elevations in decimetres; see
+    ``walks.elevation`` for the encoding.
+    """
+
+    walk = models.OneToOneField(
+        Walk,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="elevation_profile",
+    )
+    sample_spacing = models.FloatField(help_text=_("Distance between samples in metres"))
+    sample_count = models.PositiveIntegerField(default=0)
+    samples = models.BinaryField(help_text=_("Delta-encoded elevations in decimetres"))
+    total_ascent = models.FloatField(_("Total ascent"), default=0.0)
+    total_descent = models.FloatField(_("Total descent"), default=0.0)
+    min_elevation = models.FloatField(null=True, blank=True)
+    max_elevation = models.FloatField(null=True, blank=True)
+    source = models.CharField(max_length=255, blank=True, help_text=_("DEM file the profile was sampled from"))
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("elevation profile")
+        verbose_name_plural = _("elevation profiles")
+
+    def __str__(self):
+        return f"Elevation profile for {self.walk_id}"
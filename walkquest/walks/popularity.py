@@ -0,0 +1,84 @@
+"""
+Denormalized favorite counts and a time-decayed popularity score.
+
+``adjust_counts`` is called once each favorites write commits: it moves
+``favorites_count`` and ``recent_favorites`` with ``F()`` UPDATEs, outside
+the writer's transaction so the walk rows are only locked for the UPDATE
+itself. A change lost between the commit and the UPDATE (a crashed worker)
+is repaired by the daily recount. ``decay_popularity`` (a Celery beat job) folds the recent
+favorites into ``popularity_score`` and decays it, so a favorite's weight
+halves every ``POPULARITY_HALF_LIFE_HOURS``:
+
+    score = score * 0.5 ** (interval / half_life) + recent_favorites
+
+``sort=popular`` then reads the score through its index without touching
+the favorites table. ``refresh_favorite_counts`` recounts from the table to
+repair any drift and runs daily.
+"""
+
+from collections import Counter
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Walk
+
+DECAY_INTERVAL_SECONDS = 60 * 60
+# Scores this small are rounded down to zero so decayed walks drop out of
+# the UPDATE in decay_popularity.
+MIN_SCORE = 0.01
+
+
+def adjust_counts(added, removed) -> None:
+    """Apply favorite additions and removals (walk ids, repeats allowed)."""
+    deltas = Counter(str(walk_id) for walk_id in added)
+    deltas.subtract(str(walk_id) for walk_id in removed)
+    by_delta = defaultdict(list)
+    for walk_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(walk_id)
+    for delta, walk_ids in by_delta.items():
+        Walk.objects.filter(id__in=walk_ids).update(
+            favorites_count=Greatest(F("favorites_count") + delta, 0),
+            recent_favorites=F("recent_favorites") + delta,
+        )
+
+
+def decay_factor() -> float:
+    half_life = settings.POPULARITY_HALF_LIFE_HOURS * 60 * 60
+    return 0.5 ** (DECAY_INTERVAL_SECONDS / half_life)
+
+
+def decay_popularity() -> int:
+    """Decay every score by one interval and add recent favorites; returns walks updated."""
+    score = F("popularity_score") * decay_factor() + F("recent_favorites")
+    # Walks with no score and nothing recent would not change; skipping them
+    # keeps the hourly UPDATE proportional to the walks people favorite.
+    updated = (
+        Walk.objects.exclude(popularity_score=0, recent_favorites=0)
+        .update(popularity_score=Greatest(score, 0.0), recent_favorites=0)
+    )
+    Walk.objects.filter(popularity_score__gt=0, popularity_score__lt=MIN_SCORE).update(popularity_score=0.0)
+    return updated
+
+
+def refresh_favorite_counts() -> int:
+    """Recount ``favorites_count`` from the favorites table; returns walks corrected."""
+    walks = connection.ops.quote_name(Walk._meta.db_table)
+    favorites = connection.ops.quote_name(Walk.favorites.through._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {walks} w
+            SET favorites_count = COALESCE(counts.total, 0)
+            FROM {walks} target
+            LEFT JOIN (
+                SELECT walk_id, COUNT(*) AS total FROM {favorites} GROUP BY walk_id
+            ) counts ON counts.walk_id = target.id
+            WHERE target.id = w.id AND w.favorites_count <> COALESCE(counts.total, 0)
+            """,  # noqa: S608
+        )
+        return cursor.rowcount
@@ -0,0 +1,96 @@
+"""
+Route metrics derived from ``Walk.route_geometry``.
+
+Length, bounding box, start/end points, vertex count and loop-ness are
+computed once whenever a route geometry changes and stored in indexed columns
+on the walk, so list and search queries filter on plain values instead of
+running geometry functions per row.
+"""
+
+from dataclasses import dataclass
+
+from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import Polygon
+from geopy.distance import geodesic
+
+# Start and end points closer than this make a walk circular. GPS traces of a
+# loop rarely close exactly, so an exact equality check misses most of them.
+LOOP_TOLERANCE_M = 75.0
+
+ROUTE_METRIC_FIELDS = (
+    "route_length",
+    "route_bbox",
+    "route_start",
+    "route_end",
+    "route_vertex_count",
+    "is_loop",
+)
+
+
+@dataclass(frozen=True)
+class RouteMetrics:
+    length: float
+    bbox: Polygon | None
+    start: Point | None
+    end: Point | None
+    vertex_count: int
+    is_loop: bool
+
+    def as_fields(self) -> dict:
+        return {
+            "route_length": self.length,
+            "route_bbox": self.bbox,
+            "route_start": self.start,
+            "route_end": self.end,
+            "route_vertex_count": self.vertex_count,
+            "is_loop": self.is_loop,
+        }
+
+
+def _line_coords(geometry):
+    """Yield the coordinate sequence of every line in ``geometry``."""
+    geom_type = geometry.geom_type
+    if geom_type in ("LineString", "LinearRing"):
+        yield geometry.coords
+    elif geom_type == "MultiLineString":
+        yield from geometry.coords
+    elif geom_type == "GeometryCollection":
+        for part in geometry:
+            yield from _line_coords(part)
+
+
+def _geodesic_length(coords) -> float:
+    return sum(
+        geodesic((lat1, lon1), (lat2, lon2)).meters
+        for (lon1, lat1, *_), (lon2, lat2, *_) in zip(coords, coords[1:], strict=False)
+    )
+
+
+def compute_route_metrics(geometry, length: float | None = None) -> RouteMetrics:
+    """Compute the stored metrics for a route geometry (SRID 4326).
+
+    ``length`` skips the geodesic measurement when the caller already knows
+    it, e.g. for generated routes.
+    """
+    lines = [coords for coords in _line_coords(geometry) if coords] if geometry else []
+    if not lines:
+        return RouteMetrics(0.0, None, None, None, 0, is_loop=False)
+
+    start = Point(*lines[0][0][:2], srid=4326)
+    end = Point(*lines[-1][-1][:2], srid=4326)
+    minx, miny, maxx, maxy = geometry.extent
+    if minx == maxx or miny == maxy:
+        # A polygon needs some area; pad degenerate (straight N-S / E-W) routes.
+        minx, miny, maxx, maxy = minx - 1e-6, miny - 1e-6, maxx + 1e-6, maxy + 1e-6
+    bbox = Polygon.from_bbox((minx, miny, maxx, maxy))
+    bbox.srid = 4326
+
+    gap = geodesic((start.y, start.x), (end.y, end.x)).meters
+    return RouteMetrics(
+        length=length if length is not None else sum(_geodesic_length(coords) for coords in lines),
+        bbox=bbox,
+        start=start,
+        end=end,
+        vertex_count=sum(len(coords) for coords in lines),
+        is_loop=gap <= LOOP_TOLERANCE_M,
+    )
@@ -88,6 +88,7 @@ class WalkOutSchema(Schema):
     longitude: float
     has_pub: bool
     has_cafe: bool
+    favorites_count: int = 0
     is_favorite: bool
     features: list[dict]
     categories: list[dict]
@@ -105,6 +106,29 @@ class WalkOutSchema(Schema):
     created_at: str
     updated_at: str
 
+class WalkCardSchema(Schema):
+    id: UUID
+    walk_id: str
+    walk_name: str
+    distance: float | None = None
+    latitude: float
+    longitude: float
+    steepness_level: str | None = None
+    has_pub: bool
+    has_cafe: bool
+
+class WalkCardPageSchema(Schema):
+    items: list[WalkCardSchema]
+    next_cursor: UUID | None = None
+
+class FavoritesSchema(Schema):
+    walk_ids: list[UUID]
+    version: int = 0
+
+class FavoritesBatchSchema(Schema):
+    add: list[UUID] = []
+    remove: list[UUID] = []
+
 class TagResponseSchema(Schema):
     name: str
     slug: str
@@ -144,8 +168,33 @@ class MarkerSchema(Schema):
     latitude: float
     longitude: float
 
+class ClusterMarkerSchema(Schema):
+    latitude: float
+    longitude: float
+    count: int
+    id: str | None = None
+    walk_id: str | None = None
+    expansion_zoom: int | None = None
+
 class FiltersResponseSchema(Schema):
     difficulties: list[str]
     footwear: list[str]
     categories: list[dict]
     features: list[dict]
+
+class OfflineBundleSchema(Schema):
+    region: dict
+    version: str
+    url: str
+    delta_url: str | None = None
+
+class ElevationProfileSchema(Schema):
+    walk_id: str
+    sample_spacing: float
+    sample_count: int
+    total_ascent: float
+    total_descent: float
+    min_elevation: float | None = None
+    max_elevation: float | None = None
+    unit: str = "dm"
+    deltas: list[int]
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from walkquest.users.context import bump_favorites_version
+
+from . import favorites
+from .bundles import mark_walks_deleted
+from .clustering import invalidate_cluster_index
+from .models import Walk
+from .popularity import adjust_counts
+from .tasks import compute_elevation_profiles
+
+
+@receiver(post_save, sender=Walk)
+@receiver(post_delete, sender=Walk)
+def walk_changed_handler(sender, instance, **kwargs):
+    """Rebuild map clusters once the change is visible to other workers."""
+    transaction.on_commit(invalidate_cluster_index)
+
+
+@receiver(post_delete, sender=Walk)
+def walk_deleted_handler(sender, instance, **kwargs):
+    """Deletions leave no updated_at behind; note them for the bundle refresh."""
+    transaction.on_commit(mark_walks_deleted)
+
+
+@receiver(post_save, sender=Walk)
+def walk_route_changed_handler(sender, instance, **kwargs):
+    """Resample the elevation profile when a walk's route changes."""
+    if not settings.WALKQUEST_DEM_PATH or not getattr(instance, "_route_changed", False):
+        return
+    walk_id = str(instance.pk)
+    transaction.on_commit(lambda: compute_elevation_profiles.delay([walk_id]))
+
+
+@receiver(m2m_changed, sender=Walk.favorites.through)
+def favorites_changed_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh caches and counters for favorites changed outside the favorites service."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    # user.favorite_walks.add(...) has the user as instance.
+    user_ids = [instance.pk] if reverse else list(pk_set or ())
+    if action != "post_clear":
+        # Django leaves already-present rows out of pk_set on add but not on
+        # remove (or clear), so the daily recount repairs any overshoot there.
+        walk_ids = list(pk_set) if reverse else [instance.pk] * len(pk_set)
+        if action == "post_add":
+            adjust_counts(walk_ids, [])
+        else:
+            adjust_counts([], walk_ids)
+    for user_id in user_ids:
+        favorites.invalidate(user_id)
+        bump_favorites_version(user_id)
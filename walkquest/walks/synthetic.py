@@ -0,0 +1,398 @@
+"""
+Deterministic synthetic catalogue for scale testing.
+
+Generates users, walks with plausible LINESTRING routes around Cornish towns,
+category/feature tags with a long-tailed (Zipf-like) distribution,
+favourites, adventures and achievements, all with bulk inserts. The same seed
+always produces the same rows, including primary keys, so query plans and
+benchmark numbers can be compared between runs.
+
+Every generated row is recognisable by its ``synthetic-`` prefix, so a
+catalogue can be removed again without touching real data.
+"""
+
+import datetime
+import logging
+import math
+import random
+import uuid
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import LineString
+from django.db import connection
+from django.db.models import Count
+from django.db.models import F
+from django.utils.text import slugify
+
+from walkquest.adventures.models import Achievement
+from walkquest.adventures.personal_bests import record_bests
+from walkquest.adventures.scoring import completion_xp
+from walkquest.adventures.scoring import logging_xp
+from walkquest.users import leaderboard
+
+from .models import Adventure
+from .models import Walk
+from .models import WalkCategoryTag
+from .models import WalkFeatureTag
+from .popularity import refresh_favorite_counts
+from .route_metrics import compute_route_metrics
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_PREFIX = "synthetic-"
+BASE_DATE = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+METRES_PER_DEGREE = 111_320
+
+# (name, longitude, latitude, weight): walks cluster around popular bases.
+TOWNS = [
+    ("St Ives", -5.4802, 50.2110, 8),
+    ("Penzance", -5.5375, 50.1188, 6),
+    ("Falmouth", -5.0714, 50.1526, 6),
+    ("Truro", -5.0510, 50.2632, 4),
+    ("Newquay", -5.0731, 50.4155, 6),
+    ("Padstow", -4.9389, 50.5420, 7),
+    ("Tintagel", -4.7516, 50.6636, 5),
+    ("Bude", -4.5435, 50.8297, 4),
+    ("Fowey", -4.6363, 50.3350, 5),
+    ("Looe", -4.4556, 50.3544, 3),
+    ("Bodmin", -4.7177, 50.4712, 3),
+    ("Helston", -5.2706, 50.1009, 4),
+    ("Launceston", -4.3597, 50.6370, 2),
+]
+
+CATEGORY_NAMES = [
+    "Circular walks",
+    "Coastal walks",
+    "Pub walks",
+    "Walks with a beach",
+    "Walks with a café",
+    "Walks with a fishing village",
+    "Walks with a lighthouse or daymark",
+    "Walks with mining/quarrying heritage",
+    "Walks with ancient monuments",
+    "Woodland walks",
+    "Walks with a shipwreck",
+    "Walks with a church or chapel",
+    "Moorland walks",
+    "Walks with a castle",
+    "Walks with a holy well",
+]
+
+NAME_PARTS = (
+    ["Cliffs", "Cove", "Creek", "Downs", "Head", "Moor", "Point", "Valley", "Woods", "Quay"],
+    ["Harbour", "Church", "Engine House", "Beacon", "Mill", "Castle", "Beach", "Tor"],
+)
+
+
+def _zipf_weights(count: int, exponent: float = 1.1) -> list[float]:
+    return [1 / (rank**exponent) for rank in range(1, count + 1)]
+
+
+def refresh_tag_counts() -> None:
+    """Bulk inserts bypass tagulous, so recount tag usage afterwards."""
+    for model, relation in (
+        (WalkCategoryTag, "categorized_walks"),
+        (WalkFeatureTag, "walks"),
+    ):
+        tags = list(model.objects.annotate(usage=Count(relation)))
+        for tag in tags:
+            tag.count = tag.usage
+        model.objects.bulk_update(tags, ["count"])
+
+
+class SyntheticCatalogue:
+    """Builds one synthetic catalogue from a seed.
+
+    Call the ``create_*`` methods in order; each one uses the rows created by
+    the previous ones.
+    """
+
+    def __init__(self, seed: int = 0, batch_size: int = 5000, progress=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.progress = progress or logger.info
+        self.user_ids: list[int] = []
+        self.walks: list[tuple[uuid.UUID, str, str]] = []
+        self.walk_popularity: list[float] = []
+        self.user_activity: list[float] = []
+
+    def _uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _date(self, days_back: int = 730) -> datetime.datetime:
+        return BASE_DATE - datetime.timedelta(seconds=self.rng.randrange(days_back * 86400))
+
+    def _bulk_create(self, model, objects, **kwargs) -> None:
+        for start in range(0, len(objects), self.batch_size):
+            model.objects.bulk_create(objects[start:start + self.batch_size], **kwargs)
+
+    def create_users(self, count: int, password: str | None = None) -> None:
+        """Create walkers; without ``password`` they cannot sign in."""
+        User = get_user_model()  # noqa: N806
+        # Hash once: every synthetic account shares the password.
+        hashed = make_password(password) if password else "!"
+        users = [
+            User(
+                username=f"{SYNTHETIC_PREFIX}user-{index:07d}",
+                email=f"{SYNTHETIC_PREFIX}user-{index:07d}@example.com",
+                name=f"Synthetic Walker {index}",
+                password=hashed,
+                date_joined=self._date(),
+            )
+            for index in range(count)
+        ]
+        self._bulk_create(User, users)
+        self.user_ids = list(
+            User.objects.filter(username__startswith=SYNTHETIC_PREFIX)
+            .order_by("username")
+            .values_list("id", flat=True),
+        )
+        # A few very active walkers and a long tail of occasional ones.
+        weights = _zipf_weights(len(self.user_ids), exponent=0.8)
+        self.rng.shuffle(weights)
+        self.user_activity = list(accumulate(weights))
+        self.progress(f"Created {len(self.user_ids)} users")
+
+    def _route(self, town, loop: bool):
+        """A meandering route of plausible length and vertex density."""
+        _, town_lon, town_lat, _ = town
+        lon = town_lon + self.rng.gauss(0, 0.08)
+        lat = town_lat + self.rng.gauss(0, 0.05)
+        length = min(max(self.rng.lognormvariate(math.log(7000), 0.5), 1500), 25000)
+        # GPS-traced routes carry a vertex every 10-40 m.
+        vertices = int(min(max(length / self.rng.uniform(10, 40), 20), 3000))
+        step = length / (vertices - 1)
+        metres_per_lon = METRES_PER_DEGREE * math.cos(math.radians(lat))
+
+        coords = [(round(lon, 6), round(lat, 6))]
+        heading = self.rng.uniform(0, 2 * math.pi)
+        start = coords[0]
+        for index in range(1, vertices):
+            if loop and index > vertices / 2:
+                # Steer back towards the start over the second half.
+                home = math.atan2(
+                    (start[1] - lat) * METRES_PER_DEGREE,
+                    (start[0] - lon) * metres_per_lon,
+                )
+                turn = (home - heading + math.pi) % (2 * math.pi) - math.pi
+                heading += turn * (index / vertices)
+            heading += self.rng.gauss(0, 0.3)
+            lon += step * math.cos(heading) / metres_per_lon
+            lat += step * math.sin(heading) / METRES_PER_DEGREE
+            coords.append((round(lon, 6), round(lat, 6)))
+        if loop:
+            coords[-1] = start
+
+        measured = sum(
+            math.hypot((x2 - x1) * metres_per_lon, (y2 - y1) * METRES_PER_DEGREE)
+            for (x1, y1), (x2, y2) in zip(coords, coords[1:], strict=False)
+        )
+        return LineString(coords, srid=4326), measured
+
+    def create_walks(self, count: int) -> None:
+        categories = [
+            WalkCategoryTag.objects.get_or_create(name=name)[0] for name in CATEGORY_NAMES
+        ]
+        features = [
+            WalkFeatureTag.objects.get_or_create(name=slug)[0]
+            for slug, _ in Walk.FEATURE_CHOICES
+        ]
+        category_weights = list(accumulate(_zipf_weights(len(categories))))
+        feature_weights = list(accumulate(_zipf_weights(len(features), exponent=0.7)))
+        town_weights = list(accumulate(town[3] for town in TOWNS))
+        difficulties = [choice[0] for choice in Walk.DIFFICULTY_CHOICES]
+        footwear = [choice[0] for choice in Walk.FOOTWEAR_CHOICES]
+
+        walks, category_links, feature_links = [], [], []
+        for index in range(count):
+            town = self.rng.choices(TOWNS, cum_weights=town_weights)[0]
+            loop = self.rng.random() < 0.45
+            route, length = self._route(town, loop)
+            walk_categories = {
+                *self.rng.choices(categories, cum_weights=category_weights, k=self.rng.randint(1, 4)),
+            }
+            walk_features = {
+                *self.rng.choices(features, cum_weights=feature_weights, k=self.rng.randint(0, 3)),
+            }
+            feature_slugs = {feature.name for feature in walk_features}
+            name = f"{town[0]} {self.rng.choice(NAME_PARTS[0])} and {self.rng.choice(NAME_PARTS[1])}"
+            start_lon, start_lat = route.coords[0]
+            walk = Walk(
+                id=self._uuid(),
+                walk_id=f"{SYNTHETIC_PREFIX}{index:07d}-{slugify(name)}",
+                walk_name=name,
+                latitude=start_lat,
+                longitude=start_lon,
+                highlights=f"A {length / 1000:.1f} km walk from {town[0]}.",
+                points_of_interest="; ".join(self.rng.sample(NAME_PARTS[1], 3)),
+                route_geometry=route,
+                distance=round(length / 1000, 1),
+                steepness_level=self.rng.choice(difficulties),
+                footwear_category=self.rng.choice(footwear),
+                has_pub="pub" in feature_slugs,
+                has_cafe="cafe" in feature_slugs,
+                has_stiles=self.rng.random() < 0.4,
+                has_bus_access=self.rng.random() < 0.3,
+                **compute_route_metrics(route, length=length).as_fields(),
+            )
+            walks.append(walk)
+            category_links.extend((walk.id, tag.id) for tag in walk_categories)
+            feature_links.extend((walk.id, tag.id) for tag in walk_features)
+            self.walks.append((walk.id, walk.walk_name, walk.steepness_level))
+
+        self._bulk_create(Walk, walks)
+        for through, links, field in (
+            (Walk.categories.through, category_links, "walkcategorytag_id"),
+            (Walk.related_categories.through, category_links, "walkcategorytag_id"),
+            (Walk.features.through, feature_links, "walkfeaturetag_id"),
+        ):
+            self._bulk_create(
+                through,
+                [through(walk_id=walk_id, **{field: tag_id}) for walk_id, tag_id in links],
+            )
+        refresh_tag_counts()
+
+        # Popularity is long-tailed and unrelated to creation order.
+        weights = _zipf_weights(len(self.walks), exponent=0.9)
+        self.rng.shuffle(weights)
+        self.walk_popularity = list(accumulate(weights))
+        self.progress(f"Created {len(walks)} walks")
+
+    def create_favorites(self, count: int) -> None:
+        """Favourite pairs drawn from walker activity and walk popularity.
+
+        At most half of all user/walk pairs are favourited. Once skewed draws
+        mostly hit pairs already taken, the rest are drawn uniformly, which
+        at that density needs about two draws per new pair.
+        """
+        if not self.user_ids or not self.walks:
+            return
+        count = min(count, len(self.user_ids) * len(self.walks) // 2)
+        through = Walk.favorites.through
+        existing = through.objects.count()
+        seen = set()
+        skewed = True
+        while len(seen) < count:
+            wanted = min(self.batch_size, count - len(seen))
+            if skewed:
+                users = self.rng.choices(range(len(self.user_ids)), cum_weights=self.user_activity, k=wanted)
+                walks = self.rng.choices(range(len(self.walks)), cum_weights=self.walk_popularity, k=wanted)
+            else:
+                users = self.rng.choices(range(len(self.user_ids)), k=wanted)
+                walks = self.rng.choices(range(len(self.walks)), k=wanted)
+            batch = []
+            for user_index, walk_index in zip(users, walks, strict=True):
+                if (user_index, walk_index) in seen:
+                    continue
+                seen.add((user_index, walk_index))
+                batch.append(
+                    through(user_id=self.user_ids[user_index], walk_id=self.walks[walk_index][0]),
+                )
+            skewed = skewed and len(batch) * 2 >= wanted
+            through.objects.bulk_create(batch, ignore_conflicts=True)
+        # Pairs that already existed are skipped by ignore_conflicts.
+        created = through.objects.count() - existing
+        # bulk_create bypasses the favorites service, so set the counters
+        # directly, scoring existing favorites at full weight as the
+        # popularity migration does.
+        refresh_favorite_counts()
+        Walk.objects.filter(walk_id__startswith=SYNTHETIC_PREFIX).update(
+            popularity_score=F("favorites_count"),
+            recent_favorites=0,
+        )
+        self.progress(f"Created {created} favorites")
+
+    def create_adventures(self, count: int) -> None:
+        """Logged adventures on popular walks, each with its achievement.
+
+        Personal bests, XP and completed quests are recorded as the adventure
+        services would, and the leaderboard is rebuilt afterwards.
+        """
+        if not self.user_ids or not self.walks:
+            return
+        adventures, achievements = [], []
+        awards = {}
+        for _ in range(count):
+            user_index = self.rng.choices(range(len(self.user_ids)), cum_weights=self.user_activity)[0]
+            walk_id, walk_name, difficulty = self.walks[
+                self.rng.choices(range(len(self.walks)), cum_weights=self.walk_popularity)[0]
+            ]
+            started = self._date()
+            duration = datetime.timedelta(minutes=self.rng.randint(45, 420))
+            adventure = Adventure(
+                id=self._uuid(),
+                title=f"{SYNTHETIC_PREFIX}{walk_name}",
+                description=f"Walked {walk_name}.",
+                start_date=started.date(),
+                end_date=(started + duration).date(),
+                start_time=started.time().replace(microsecond=0),
+                end_time=(started + duration).time().replace(microsecond=0),
+                difficulty_level=difficulty,
+                is_public=self.rng.random() < 0.7,
+            )
+            adventures.append(adventure)
+            status = self.rng.choices(
+                ["COMPLETED", "IN_PROGRESS", "ABANDONED"],
+                weights=[80, 15, 5],
+            )[0]
+            minutes = duration.total_seconds() / 60 if status == "COMPLETED" else None
+            user_id = self.user_ids[user_index]
+            achievements.append(
+                Achievement(
+                    user_id=user_id,
+                    adventure_id=adventure.id,
+                    walk_id=walk_id,
+                    conquered_date=started + duration,
+                    attempts=self.rng.randint(1, 3),
+                    best_time=minutes,
+                    completion_time=minutes,
+                    visibility="PUBLIC" if adventure.is_public else "PRIVATE",
+                    status=status,
+                ),
+            )
+            xp, quests = awards.get(user_id, (0, 0))
+            xp += logging_xp(difficulty)
+            if status == "COMPLETED":
+                xp, quests = xp + completion_xp(difficulty), quests + 1
+            awards[user_id] = (xp, quests)
+        self._bulk_create(Adventure, adventures)
+        self._bulk_create(Achievement, achievements)
+        # bulk_create sends no post_save, so personal bests are offered here.
+        for start in range(0, len(achievements), self.batch_size):
+            record_bests(achievements[start:start + self.batch_size])
+        self._award_xp(awards)
+        leaderboard.reconcile()
+        self.progress(f"Created {len(adventures)} adventures")
+
+    def _award_xp(self, awards: dict[int, tuple[int, int]]) -> None:
+        """Add XP and completed quests to many users with one UPDATE per batch."""
+        table = connection.ops.quote_name(get_user_model()._meta.db_table)
+        items = list(awards.items())
+        with connection.cursor() as cursor:
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start:start + self.batch_size]
+                cursor.execute(
+                    f"""
+                    UPDATE {table} u SET
+                        experience_points = u.experience_points + awards.xp,
+                        quests_completed = u.quests_completed + awards.quests
+                    FROM unnest(%s::bigint[], %s::int[], %s::int[])
+                        AS awards(id, xp, quests)
+                    WHERE u.id = awards.id
+                    """,  # noqa: S608
+                    [
+                        [user_id for user_id, _ in batch],
+                        [xp for _, (xp, _) in batch],
+                        [quests for _, (_, quests) in batch],
+                    ],
+                )
+
+
+def delete_synthetic_catalogue() -> None:
+    """Remove every row created by :class:`SyntheticCatalogue`."""
+    Adventure.objects.filter(title__startswith=SYNTHETIC_PREFIX).delete()
+    Walk.objects.filter(walk_id__startswith=SYNTHETIC_PREFIX).delete()
+    get_user_model().objects.filter(username__startswith=SYNTHETIC_PREFIX).delete()
+    refresh_tag_counts()
@@ -0,0 +1,68 @@
+from celery import shared_task
+from django.conf import settings
+
+from .bundles import BundleRegion
+from .bundles import stale_regions
+from .bundles import write_bundle
+from .elevation import compute_profiles
+from .models import Walk
+from .popularity import decay_popularity as apply_popularity_decay
+from .popularity import refresh_favorite_counts as recount_favorites
+
+
+@shared_task()
+def build_offline_bundle(bbox=None, category=None):
+    """Build (or refresh) the offline bundle for a bounding box and/or category."""
+    region = BundleRegion.parse(bbox=bbox, category=category)
+    manifest = write_bundle(region)
+    return {"region": region.key, "version": manifest["latest"]}
+
+
+@shared_task()
+def refresh_offline_bundles():
+    """Queue a rebuild of each region built before the latest walk change.
+
+    Each region is built by its own task so that a large number of regions
+    never has to fit inside a single ``CELERY_TASK_TIME_LIMIT``.
+    """
+    regions = stale_regions()
+    for region in regions:
+        build_offline_bundle.delay(**region.as_query())
+    return [region.key for region in regions]
+
+
+@shared_task()
+def compute_elevation_profiles(walk_ids):
+    """Sample elevation profiles for a batch of walks from the configured DEM."""
+    if not settings.WALKQUEST_DEM_PATH:
+        return 0
+    return compute_profiles(walk_ids)
+
+
+@shared_task()
+def refresh_elevation_profiles(batch_size=200):
+    """Fan out profile computation for walks without one, one task per batch.
+
+    Batches run concurrently across the Celery worker pool.
+    """
+    walk_ids = [
+        str(walk_id)
+        for walk_id in Walk.objects.filter(elevation_profile__isnull=True)
+        .order_by()
+        .values_list("id", flat=True)
+    ]
+    for start in range(0, len(walk_ids), batch_size):
+        compute_elevation_profiles.delay(walk_ids[start:start + batch_size])
+    return len(walk_ids)
+
+
+@shared_task()
+def decay_popularity():
+    """Fold the last hour's favorites into each walk's decayed popularity score."""
+    return apply_popularity_decay()
+
+
+@shared_task()
+def refresh_favorite_counts():
+    """Recount walks' favorite counters from the favorites table."""
+    return recount_favorites()
@@ -1,8 +1,41 @@
+import tempfile
 from datetime import date
+from unittest import mock
 
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import LineString
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import SimpleTestCase
 from django.test import TestCase
 
+from walkquest.adventures.models import Achievement
+from walkquest.adventures.models import PersonalBest
+from walkquest.users.context import bump_favorites_version
+from walkquest.users.tests.factories import UserFactory
+
+from . import favorites
+from .bundles import BundleRegion
+from .bundles import compute_delta
+from .bundles import describe_bundle
+from .bundles import load_manifest
+from .bundles import mark_requested
+from .bundles import stale_regions
+from .bundles import write_bundle
+from .clustering import ClusterIndex
+from .elevation import decode_profile
+from .elevation import encode_profile
+from .elevation import resample_route
+from .elevation import total_climb
+from .favorites import favorite_ids
 from .models import Adventure
+from .models import Walk
+from .popularity import decay_factor
+from .popularity import decay_popularity
+from .popularity import refresh_favorite_counts
+from .route_metrics import compute_route_metrics
+from .synthetic import SyntheticCatalogue
+from .synthetic import delete_synthetic_catalogue
 
 
 class AdventureModelTest(TestCase):
@@ -18,3 +51,330 @@ class AdventureModelTest(TestCase):
     def test_adventure_creation(self):
         assert self.adventure.title == "The Great Forest Traverse"
         assert self.adventure.difficulty_level == "LEGENDARY"
+
+
+class OfflineBundleTest(SimpleTestCase):
+    def test_region_key_is_stable(self):
+        region = BundleRegion.parse(bbox="-5.2,50.0,-4.9,50.3", category="Coastal")
+        assert region.key == "category-coastal--bbox--5.2000_50.0000_-4.9000_50.3000"
+        assert BundleRegion.parse().key == "all"
+
+    def test_region_snaps_to_the_grid(self):
+        region = BundleRegion.parse(bbox="-5.234,50.01,-4.901,50.0101")
+        assert region.bbox == (-5.3, 50.0, -4.9, 50.1)
+        assert BundleRegion.parse(**region.as_query()) == region
+
+    def test_region_rejects_inverted_bbox(self):
+        with self.assertRaises(ValueError):
+            BundleRegion.parse(bbox="-4.9,50.3,-5.2,50.0")
+
+    def test_delta_contains_only_changes(self):
+        old = {"a": {"walk_name": "A"}, "b": {"walk_name": "B"}}
+        new = {"a": {"walk_name": "A"}, "b": {"walk_name": "B2"}, "c": {"walk_name": "C"}}
+        delta = compute_delta(old, new)
+        assert set(delta["upserted"]) == {"b", "c"}
+        assert delta["removed"] == []
+        assert compute_delta(new, old)["removed"] == ["c"]
+
+
+class OfflineBundleBuildTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(self.settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        SyntheticCatalogue(seed=6, batch_size=10).create_walks(2)
+        self.walk = Walk.objects.order_by("walk_id").first()
+        self.region = BundleRegion.parse()
+
+    def rename_walk(self, name):
+        self.walk.walk_name = name
+        self.walk.save()
+
+    def test_every_retained_version_gets_a_delta(self):
+        first = write_bundle(self.region)["latest"]
+        self.rename_walk("Renamed once")
+        second = write_bundle(self.region)["latest"]
+        self.rename_walk("Renamed twice")
+        manifest = write_bundle(self.region)
+
+        latest = manifest["latest"]
+        assert manifest["deltas"] == {first: latest, second: latest}
+        assert describe_bundle(self.region, manifest, since=first)["delta_url"]
+
+    def test_regions_go_stale_after_walk_changes(self):
+        write_bundle(self.region)
+        mark_requested(self.region)
+        assert stale_regions() == []
+
+        self.rename_walk("Renamed")
+        assert stale_regions() == [self.region]
+
+    def test_idle_regions_are_deleted(self):
+        write_bundle(self.region)
+        self.rename_walk("Renamed")
+        assert stale_regions() == []
+        assert load_manifest(self.region) is None
+
+    def test_only_signed_in_users_queue_builds(self):
+        with mock.patch("walkquest.walks.api.build_offline_bundle.delay") as delay:
+            response = self.client.get("/api/offline-bundles")
+            assert response.status_code == 401
+
+            self.client.force_login(UserFactory())
+            response = self.client.get("/api/offline-bundles", {"category": "no-such"})
+            assert response.status_code == 400
+
+            response = self.client.get("/api/offline-bundles")
+            assert response.status_code == 202
+        delay.assert_called_once_with(bbox=None, category=None)
+
+
+class ClusterIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = ClusterIndex(
+            [
+                ("1", "st-ives-head", -5.4806, 50.2150),
+                ("2", "st-ives-harbour", -5.4790, 50.2120),
+                ("3", "lizard-point", -5.2060, 49.9590),
+            ],
+        )
+        self.cornwall = (-6.0, 49.8, -4.0, 50.9)
+
+    def test_low_zoom_merges_nearby_walks(self):
+        markers = self.index.query(self.cornwall, zoom=6)
+        assert sum(marker["count"] for marker in markers) == 3
+        assert len(markers) < 3
+
+    def test_high_zoom_returns_individual_walks(self):
+        markers = self.index.query(self.cornwall, zoom=18)
+        assert sorted(marker["walk_id"] for marker in markers) == [
+            "lizard-point",
+            "st-ives-harbour",
+            "st-ives-head",
+        ]
+
+    def test_viewport_limits_results(self):
+        markers = self.index.query((-5.3, 49.9, -5.1, 50.0), zoom=12)
+        assert [marker["walk_id"] for marker in markers] == ["lizard-point"]
+
+
+class RouteMetricsTest(SimpleTestCase):
+    def test_linear_route(self):
+        route = LineString((-5.05, 50.26), (-5.05, 50.27), (-5.04, 50.27), srid=4326)
+        metrics = compute_route_metrics(route)
+        assert metrics.vertex_count == 3
+        assert not metrics.is_loop
+        # ~1.11 km north then ~0.71 km east.
+        assert 1750 < metrics.length < 1900
+        assert metrics.start.coords == (-5.05, 50.26)
+        assert metrics.end.coords == (-5.04, 50.27)
+        assert metrics.bbox.extent == (-5.05, 50.26, -5.04, 50.27)
+
+    def test_loop_tolerates_gps_gap(self):
+        route = LineString(
+            (-5.05, 50.26), (-5.05, 50.27), (-5.04, 50.27), (-5.0502, 50.2601),
+            srid=4326,
+        )
+        assert compute_route_metrics(route).is_loop
+
+
+class ElevationProfileTest(SimpleTestCase):
+    def test_encoding_round_trip(self):
+        elevations = [12.3, 15.0, 14.1, 120.7, 0.0, -3.2]
+        encoded = encode_profile(elevations)
+        assert decode_profile(encoded) == elevations
+        # Small changes fit in a single byte each.
+        assert len(encode_profile([50.0, 50.5, 51.0, 50.8])) == 5
+
+    def test_resample_includes_both_ends(self):
+        route = LineString((-5.05, 50.26), (-5.05, 50.27), srid=4326)
+        points = resample_route(route, 100)
+        # ~1112 m of route: start, 11 samples, end.
+        assert len(points) == 13
+        assert points[0] == (-5.05, 50.26)
+        assert points[-1] == (-5.05, 50.27)
+
+    def test_climb_ignores_noise(self):
+        ascent, descent = total_climb([10, 11, 10, 11, 20, 15, 16, 5])
+        assert ascent == 10
+        assert descent == 15
+
+
+class SyntheticCatalogueTest(TestCase):
+    def test_generation_is_deterministic(self):
+        catalogue = SyntheticCatalogue(seed=7, batch_size=10)
+        catalogue.create_users(5)
+        catalogue.create_walks(20)
+        catalogue.create_favorites(30)
+        catalogue.create_adventures(10)
+        first = list(Walk.objects.order_by("walk_id").values_list("id", "route_length"))
+        assert len(first) == 20
+        assert Walk.favorites.through.objects.count() == 30
+        counts = Walk.objects.aggregate(favorites=Sum("favorites_count"), score=Sum("popularity_score"))
+        assert counts["favorites"] == Walk.favorites.through.objects.count() == counts["score"]
+        assert Achievement.objects.count() == 10
+        completed = Achievement.objects.filter(status="COMPLETED")
+        assert all(a.walk_id and a.best_time for a in completed)
+        pairs = {(a.user_id, a.walk_id) for a in completed}
+        assert set(PersonalBest.objects.values_list("user_id", "walk_id")) == pairs
+        users = get_user_model().objects.aggregate(
+            xp=Sum("experience_points"),
+            quests=Sum("quests_completed"),
+        )
+        assert users["quests"] == completed.count()
+        assert users["xp"] > 0
+
+        delete_synthetic_catalogue()
+        assert not Walk.objects.exists()
+
+        catalogue = SyntheticCatalogue(seed=7, batch_size=10)
+        catalogue.create_users(5)
+        catalogue.create_walks(20)
+        assert list(Walk.objects.order_by("walk_id").values_list("id", "route_length")) == first
+
+
+class AsyncWalkApiTest(TestCase):
+    def setUp(self):
+        SyntheticCatalogue(seed=3, batch_size=10).create_walks(3)
+        self.walk = Walk.objects.order_by("walk_id").first()
+
+    async def test_read_endpoints_run_on_the_async_client(self):
+        response = await self.async_client.get("/api/walks")
+        assert response.status_code == 200
+        assert len(response.json()) == 3
+
+        response = await self.async_client.get(f"/api/walks/{self.walk.walk_id}")
+        assert response.json()["id"] == str(self.walk.id)
+        assert response.json()["is_favorite"] is False
+
+        response = await self.async_client.get(f"/api/walks/{self.walk.id}/geometry")
+        assert response.json()["geometry"]["type"] == "LineString"
+
+    async def test_metadata_is_cached(self):
+        first = await self.async_client.get("/api/filters")
+        second = await self.async_client.get("/api/filters")
+        assert first.json() == second.json()
+
+
+class FavoritesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        SyntheticCatalogue(seed=4, batch_size=10).create_walks(3)
+        self.walk_ids = [str(pk) for pk in Walk.objects.order_by("walk_id").values_list("id", flat=True)]
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+
+    def test_batch_update_writes_through(self):
+        assert favorite_ids(self.user.pk) == set()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/me/favorites:batch",
+                {"add": self.walk_ids[:2]},
+                content_type="application/json",
+            )
+        assert sorted(response.json()["walk_ids"]) == sorted(self.walk_ids[:2])
+        assert Walk.favorites.through.objects.filter(user=self.user).count() == 2
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/me/favorites:batch",
+                {"add": [self.walk_ids[2]], "remove": [self.walk_ids[0]]},
+                content_type="application/json",
+            )
+        response = self.client.get("/api/me/favorites")
+        assert sorted(response.json()["walk_ids"]) == sorted(self.walk_ids[1:])
+        assert response.json()["version"] == 2
+
+    def test_toggle_and_is_favorite(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/walks/{self.walk_ids[0]}/favorite")
+        assert response.json()["is_favorite"] is True
+        walk = Walk.objects.get(id=self.walk_ids[0])
+        assert walk.is_favorite_of(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/walks/{self.walk_ids[0]}/favorite")
+        assert response.json()["is_favorite"] is False
+        assert not walk.is_favorite_of(self.user)
+
+    def test_set_loaded_during_a_write_is_not_cached(self):
+        load = favorites._load
+
+        def load_then_write(user_id):
+            ids = load(user_id)
+            bump_favorites_version(user_id)
+            return ids
+
+        with mock.patch.object(favorites, "_load", side_effect=load_then_write):
+            favorite_ids(self.user.pk)
+        assert cache.get(favorites.favorites_key(self.user.pk)) is None
+
+    def test_unknown_walk_is_rejected(self):
+        response = self.client.post(
+            "/api/me/favorites:batch",
+            {"add": ["00000000-0000-0000-0000-000000000000"]},
+            content_type="application/json",
+        )
+        assert response.status_code == 400
+
+
+class PopularityTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        SyntheticCatalogue(seed=5, batch_size=10).create_walks(3)
+        self.walks = list(Walk.objects.order_by("walk_id"))
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+
+    def test_toggle_moves_counters_on_commit(self):
+        walk = self.walks[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/walks/{walk.id}/favorite")
+            walk.refresh_from_db()
+            assert (walk.favorites_count, walk.recent_favorites) == (0, 0)
+        walk.refresh_from_db()
+        assert (walk.favorites_count, walk.recent_favorites) == (1, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/walks/{walk.id}/favorite")
+        walk.refresh_from_db()
+        assert (walk.favorites_count, walk.recent_favorites) == (0, 0)
+
+    def test_repeated_add_is_counted_once(self):
+        walk_id = str(self.walks[0].id)
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    "/api/me/favorites:batch",
+                    {"add": [walk_id]},
+                    content_type="application/json",
+                )
+        assert Walk.objects.get(id=walk_id).favorites_count == 1
+
+    def test_decay_folds_in_recent_favorites(self):
+        walk = self.walks[0]
+        Walk.objects.filter(id=walk.id).update(popularity_score=10.0, recent_favorites=2)
+        decay_popularity()
+        walk.refresh_from_db()
+        assert walk.recent_favorites == 0
+        assert abs(walk.popularity_score - (10.0 * decay_factor() + 2)) < 1e-6
+
+    def test_refresh_repairs_drift(self):
+        walk = self.walks[0]
+        walk.favorites.add(self.user)
+        Walk.objects.filter(id=walk.id).update(favorites_count=7)
+        assert refresh_favorite_counts() == 1
+        walk.refresh_from_db()
+        assert walk.favorites_count == 1
+
+    def test_sort_popular(self):
+        Walk.objects.filter(id=self.walks[1].id).update(popularity_score=5.0)
+        Walk.objects.filter(id=self.walks[2].id).update(popularity_score=1.0)
+        response = self.client.get("/api/walks", {"sort": "popular"})
+        ids = [walk["id"] for walk in response.json()]
+        assert ids[:2] == [str(self.walks[1].id), str(self.walks[2].id)]
+
+        response = self.client.get("/api/walks", {"sort": "popular", "limit": 1})
+        assert [walk["id"] for walk in response.json()] == [str(self.walks[1].id)]
+
+    def test_unknown_sort_is_rejected(self):
+        assert self.client.get("/api/walks", {"sort": "newest"}).status_code == 400
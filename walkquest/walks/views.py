@@ -35,6 +35,7 @@ from django.http import HttpResponse, Http404, JsonResponse
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
 from django.views import View
 from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_protect
@@ -43,6 +44,7 @@ from django.views.generic import ListView
 from tagulous.models.tagged import TaggedManager
 from tagulous.views import autocomplete
 
+from walkquest.walks import favorites
 from walkquest.walks.models import Walk
 from walkquest.walks.models import WalkCategoryTag
 from walkquest.walks.models import WalkFeatureTag
@@ -148,6 +150,14 @@ class HomePageView(ListView):
 
         return stats
 
+    @cached_property
+    def favorite_ids(self) -> set[str]:
+        """The requesting user's favorite walk ids, loaded once per request."""
+        user = getattr(getattr(self, "request", None), "user", None)
+        if user is None or not user.is_authenticated:
+            return set()
+        return favorites.favorite_ids(user.pk)
+
     def serialize_walk(self, walk: Walk) -> dict[str, Any]:
         """Serialize walk instance with proper tag handling."""
         try:
@@ -177,7 +187,7 @@ class HomePageView(ListView):
                 "has_bus_access": bool(walk.has_bus_access),
                 "has_stiles": bool(walk.has_stiles),
                 "created_at": walk.created_at.isoformat() if walk.created_at else None,
-                "is_favorite": walk.is_favorite_of(self.request.user)
+                "is_favorite": str(walk.id) in self.favorite_ids
             }
         except Exception as e:
             logger.exception(f"Walk serialization error for walk ID {walk.id}: {str(e)}")
@@ -552,24 +562,19 @@ def toggle_favorite(request, walk_id):
     """Toggle a walk as favorite for the current user."""
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
-    
-    walk = get_object_or_404(Walk, id=walk_id)
-    
-    # Check if the walk is already favorited
-    is_favorite = walk.is_favorite_of(request.user)
-    
-    # Toggle the favorite status
-    if is_favorite:
-        walk.favorites.remove(request.user)
-        is_favorite = False
-    else:
-        walk.favorites.add(request.user)
-        is_favorite = True
-    
+
+    walk = get_object_or_404(
+        Walk.objects.only("id", "walk_id", "walk_name"),
+        id=walk_id,
+    )
+    is_favorite = favorites.toggle_favorite(request.user.pk, walk.id)
+
     # Return updated walk data
-    return JsonResponse({
-        "id": str(walk.id),
-        "walk_id": walk.walk_id,
-        "walk_name": walk.walk_name,
-        "is_favorite": is_favorite
-    })
+    return JsonResponse(
+        {
+            "id": str(walk.id),
+            "walk_id": walk.walk_id,
+            "walk_name": walk.walk_name,
+            "is_favorite": is_favorite,
+        },
+    )